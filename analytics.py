@@ -0,0 +1,172 @@
+"""
+Vectorized journal analytics.
+
+The journal is loaded once into NumPy arrays (one element per trade, in date order) and every
+statistic below is a handful of whole-array operations, so analysing a million trades costs a few
+passes over contiguous memory instead of a Python loop per trade.
+"""
+import numpy as np
+
+TRADING_DAYS_PER_YEAR = 252
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+class Journal:
+    """
+    Column arrays for the whole trade history:
+    day (int32 days since 1970-01-01, ascending), profit (float64), symbol (int32 codes into `symbols`)
+    and r (float64 R-multiple, NaN for trades without a stop loss).
+    """
+
+    def __init__(self, base, day, profit, symbol, symbols, r=None):
+        self.base = float(base)
+        self.day = day
+        self.profit = profit
+        self.symbol = symbol
+        self.symbols = symbols
+        self.r = np.full(len(day), np.nan) if r is None else r
+
+    @classmethod
+    def from_rows(cls, base, rows):
+        """rows: (epoch_day, profit, symbol, r_multiple) tuples ordered by date."""
+        n = len(rows)
+        codes = {}
+        day = np.fromiter((r[0] for r in rows), dtype=np.int32, count=n)
+        profit = np.fromiter((r[1] for r in rows), dtype=np.float64, count=n)
+        symbol = np.fromiter((codes.setdefault(r[2], len(codes)) for r in rows), dtype=np.int32, count=n)
+        r = np.fromiter((np.nan if r[3] is None else r[3] for r in rows), dtype=np.float64, count=n)
+        return cls(base, day, profit, symbol, list(codes), r)
+
+    def __len__(self):
+        return len(self.day)
+
+    @property
+    def nbytes(self):
+        return self.day.nbytes + self.profit.nbytes + self.symbol.nbytes + self.r.nbytes
+
+def _as_dates(days):
+    return days.astype("datetime64[D]").tolist()
+
+def _ratio(num, den):
+    return float(num / den) if den else None
+
+def _downsample(n, points):
+    """Indices of at most `points` evenly spaced samples, always keeping the first and last."""
+    if n <= points:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, points).round().astype(np.int64))
+
+def sparkline(values, width=1000, height=160, pad=4):
+    """SVG polyline points for `values` scaled into a width x height box."""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return ""
+    lo, hi = values.min(), values.max()
+    span = (hi - lo) or 1.0
+    x = np.linspace(pad, width - pad, len(values)) if len(values) > 1 else np.array([width / 2])
+    y = height - pad - (values - lo) / span * (height - 2 * pad)
+    return " ".join(f"{a:.1f},{b:.1f}" for a, b in zip(x, y))
+
+def _breakdown(codes, groups, profit, labels, r):
+    """Per-group trade count, P/L, win rate, profit factor, expectancy and average R via bincount."""
+    wins = profit > 0
+    count = np.bincount(codes, minlength=groups)
+    total = np.bincount(codes, weights=profit, minlength=groups)
+    won = np.bincount(codes, weights=wins, minlength=groups)
+    gross_win = np.bincount(codes, weights=np.where(wins, profit, 0.0), minlength=groups)
+    gross_loss = -np.bincount(codes, weights=np.where(profit < 0, profit, 0.0), minlength=groups)
+    has_r = ~np.isnan(r)
+    r_count = np.bincount(codes[has_r], minlength=groups)
+    r_total = np.bincount(codes[has_r], weights=r[has_r], minlength=groups)
+    rows = []
+    for i in np.flatnonzero(count):
+        rows.append({
+            "key": labels[i],
+            "trades": int(count[i]),
+            "pl": round(float(total[i]), 2),
+            "win_rate": float(won[i] / count[i]),
+            "profit_factor": _ratio(gross_win[i], gross_loss[i]),
+            "expectancy": round(float(total[i] / count[i]), 2),
+            "avg_r": round(float(r_total[i] / r_count[i]), 2) if r_count[i] else None,
+        })
+    return rows
+
+def analyze(journal, sharpe_window=20, curve_points=400):
+    """All statistics for the /analytics page, or None for an empty journal."""
+    if not len(journal):
+        return None
+    day, profit = journal.day, journal.profit
+
+    # daily P/L: trades are date-ordered, so each day is one contiguous run
+    starts = np.flatnonzero(np.r_[True, day[1:] != day[:-1]])
+    dates = day[starts]
+    daily_pl = np.add.reduceat(profit, starts)
+    equity = journal.base + np.cumsum(daily_pl)
+    prev_equity = np.r_[journal.base, equity[:-1]]
+
+    # drawdown against the running peak (the starting balance counts as the first peak)
+    peak = np.maximum.accumulate(np.r_[journal.base, equity])[1:]
+    drawdown = equity - peak
+    trough = int(drawdown.argmin())
+    drawdown_pct = np.divide(drawdown, peak, out=np.zeros_like(drawdown), where=peak > 0)
+    # longest stretch (calendar days) between new equity highs, including a drawdown still open today
+    highs = np.r_[dates[0], dates[drawdown >= 0], dates[-1]]
+    longest_underwater = int(np.diff(highs).max())
+
+    # daily returns on the balance carried into each day; Sharpe annualized, risk-free rate 0
+    returns = np.divide(daily_pl, prev_equity, out=np.zeros_like(daily_pl), where=prev_equity > 0)
+    sharpe = _ratio(returns.mean() * np.sqrt(TRADING_DAYS_PER_YEAR), returns.std(ddof=1)) if len(returns) > 1 else None
+    rolling = np.empty(0)
+    if len(returns) >= sharpe_window > 1:
+        s1 = np.cumsum(np.r_[0.0, returns])
+        s2 = np.cumsum(np.r_[0.0, returns * returns])
+        mean = (s1[sharpe_window:] - s1[:-sharpe_window]) / sharpe_window
+        var = ((s2[sharpe_window:] - s2[:-sharpe_window]) - sharpe_window * mean * mean) / (sharpe_window - 1)
+        std = np.sqrt(np.maximum(var, 0.0))
+        rolling = np.divide(mean, std, out=np.zeros_like(mean), where=std > 1e-12) * np.sqrt(TRADING_DAYS_PER_YEAR)
+
+    wins, losses = profit > 0, profit < 0
+    gross_win = float(profit[wins].sum())
+    gross_loss = float(-profit[losses].sum())
+    r = journal.r[~np.isnan(journal.r)]
+    curve = _downsample(len(equity), curve_points)
+    rolling_curve = _downsample(len(rolling), curve_points)
+
+    return {
+        "trades": len(journal),
+        "days": len(dates),
+        "first_date": _as_dates(dates[:1])[0],
+        "last_date": _as_dates(dates[-1:])[0],
+        "starting_balance": journal.base,
+        "ending_balance": round(float(equity[-1]), 2),
+        "net_pl": round(float(equity[-1] - journal.base), 2),
+        "win_rate": float(wins.mean()),
+        "avg_win": round(gross_win / int(wins.sum()), 2) if wins.any() else None,
+        "avg_loss": round(-gross_loss / int(losses.sum()), 2) if losses.any() else None,
+        "profit_factor": _ratio(gross_win, gross_loss),
+        "expectancy": round(float(profit.mean()), 2),
+        "r_trades": len(r),
+        "avg_r": round(float(r.mean()), 2) if len(r) else None,
+        "total_r": round(float(r.sum()), 2) if len(r) else None,
+        "best_day": round(float(daily_pl.max()), 2),
+        "worst_day": round(float(daily_pl.min()), 2),
+        "max_drawdown": round(float(drawdown[trough]), 2),
+        "max_drawdown_pct": float(drawdown_pct.min()),
+        "max_drawdown_date": _as_dates(dates[trough:trough + 1])[0],
+        "longest_drawdown_days": longest_underwater,
+        "sharpe": sharpe,
+        "sharpe_window": sharpe_window,
+        "rolling_sharpe": float(rolling[-1]) if len(rolling) else None,
+        "equity_curve": {
+            "dates": _as_dates(dates[curve]),
+            "equity": equity[curve].round(2).tolist(),
+            "drawdown": drawdown[curve].round(2).tolist(),
+        },
+        "rolling_sharpe_curve": {
+            "dates": _as_dates(dates[sharpe_window - 1:][rolling_curve]) if len(rolling) else [],
+            "sharpe": rolling[rolling_curve].round(3).tolist(),
+        },
+        "by_symbol": sorted(_breakdown(journal.symbol, len(journal.symbols), profit, journal.symbols, journal.r),
+                            key=lambda r: r["pl"], reverse=True),
+        # 1970-01-01 was a Thursday: (day + 3) % 7 gives Monday = 0
+        "by_weekday": _breakdown((day + 3) % 7, 7, profit, WEEKDAYS, journal.r),
+    }
@@ -1,45 +1,1958 @@
+import atexit
+import base64
+import cProfile
+import csv
+import functools
+import gzip
+import hashlib
+import heapq
+import io
+import itertools
+import json
+import math
 import os
-from datetime import date, datetime, timedelta
+import pstats
+import queue
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from decimal import Decimal, ROUND_HALF_UP
 from zoneinfo import ZoneInfo
 
-from flask import Flask, render_template, request, redirect, url_for, flash
+import click
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, g, has_app_context, jsonify, session
+import numpy as np
 import pymysql
+from pymysql.constants import SERVER_STATUS
 from dotenv import load_dotenv
 
+try:
+    import brotli
+except ImportError:  # optional: cached pages are then precompressed with gzip only
+    brotli = None
+
+import analytics
+import storage
+
 load_dotenv()
 
+# the storage engine (DB_BACKEND); _connect opens one raw connection to it
+db_backend = storage.backend_from_env()
+_connect = db_backend.connect
+
+class ConnectionPool:
+    """
+    Thread-safe pool of pymysql connections.
+    - at most `size` connections exist at once; borrowers wait up to `timeout` seconds for one
+    - connections idle for more than `ping_interval` seconds are pinged on borrow and replaced if dead
+    - connections older than `max_lifetime` seconds are closed and replaced on borrow/release
+    """
+
+    def __init__(self, connect, size=5, max_lifetime=3600, ping_interval=5, timeout=10):
+        self._connect = connect
+        self.size = size
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._meta = {}  # id(conn) -> [created_at, last_used_at]
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = self._connect()
+        now = time.monotonic()
+        with self._lock:
+            self._meta[id(conn)] = [now, now]
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            self._meta.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise RuntimeError(f"Timed out after {self.timeout}s waiting for a DB connection (pool size {self.size})")
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._open()
+
+                created_at, last_used_at = self._meta.get(id(conn), (0, 0))
+                now = time.monotonic()
+                if self.max_lifetime and now - created_at > self.max_lifetime:
+                    self._discard(conn)
+                    continue
+                if now - last_used_at > self.ping_interval:
+                    try:
+                        conn.ping(reconnect=False)
+                    except Exception:
+                        self._discard(conn)
+                        continue
+                return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        try:
+            if not conn.open:
+                self._discard(conn)
+                return
+            if conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS or not conn.get_autocommit():
+                # never hand out a connection in the middle of someone else's transaction; get_autocommit()
+                # alone misses a begin() on an autocommit connection, the server's IN_TRANS flag doesn't
+                conn.rollback()
+                conn.autocommit(True)
+            meta = self._meta.get(id(conn))
+            now = time.monotonic()
+            if meta is None or (self.max_lifetime and now - meta[0] > self.max_lifetime):
+                self._discard(conn)
+                return
+            meta[1] = now
+            self._idle.put(conn)
+        except Exception:
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def stats(self):
+        with self._lock:
+            open_count = len(self._meta)
+        return {"open": open_count, "idle": self._idle.qsize()}
+
+class PooledConnection:
+    """
+    Proxy handed out by get_db(). close() gives the connection back instead of closing it;
+    when bound to the request (g), close() is a no-op and the teardown hook releases it.
+    """
+
+    def __init__(self, pool, conn, request_bound=False):
+        self._pool = pool
+        self._conn = conn
+        self._request_bound = request_bound
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        if self._request_bound or self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        self._pool.release(conn)
+
+    def release(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                connect = _connect
+                if os.getenv("SQL_INSTRUMENTATION", "1") == "1":
+                    connect = functools.partial(_connect, cursorclass=InstrumentedCursor)
+                _pool = ConnectionPool(
+                    connect,
+                    size=int(os.getenv("MYSQL_POOL_SIZE", "10")),
+                    max_lifetime=int(os.getenv("MYSQL_POOL_RECYCLE", "3600")),
+                    ping_interval=int(os.getenv("MYSQL_POOL_PING_INTERVAL", "5")),
+                    timeout=int(os.getenv("MYSQL_POOL_TIMEOUT", "10")),
+                )
+    return _pool
+
 def get_db():
-    conn = pymysql.connect(
-        host=os.getenv("MYSQL_HOST", "127.0.0.1"),
-        port=int(os.getenv("MYSQL_PORT", "3306")),
-        user=os.getenv("MYSQL_USER", "root"),
-        password=os.getenv("MYSQL_PASSWORD", ""),
-        database=os.getenv("MYSQL_DB", "tradingview"),
-        autocommit=True,
-        client_flag=pymysql.constants.CLIENT.MULTI_STATEMENTS,
-        charset="utf8mb4",
-        cursorclass=pymysql.cursors.DictCursor,
-    )
-    return conn
+    """
+    Return a pooled connection. Inside an app/request context the same connection is reused
+    for the whole request and released on teardown; elsewhere (threads, scripts) the caller
+    owns it until close().
+    """
+    if has_app_context():
+        conn = g.get("db")
+        if conn is None:
+            conn = g.db = PooledConnection(get_pool(), get_pool().acquire(), request_bound=True)
+        return conn
+    return PooledConnection(get_pool(), get_pool().acquire())
+
+# Locks one account's days from a date onwards (next-key locks, so new days in the range wait too).
+# Every ledger write takes it before touching days/weeks/months, always in ascending index order.
+_LOCK_DAYS_SQL = "SELECT COUNT(*) AS locked FROM days WHERE account_id = %s AND `date` >= %s FOR UPDATE"
+
+class UnitOfWork:
+    """
+    One ledger write: its statements run through `cur` inside a single transaction, and its
+    in-memory side effects (balance index, caches, ledger version, recompute scheduling) are
+    queued with after_commit() so they only happen once COMMIT succeeded.
+    """
+
+    def __init__(self, cur):
+        self.cur = cur
+        self._after_commit = []
+
+    def after_commit(self, fn, *args, **kwargs):
+        self._after_commit.append((fn, args, kwargs))
+
+    def committed(self):
+        callbacks, self._after_commit = self._after_commit, []
+        for fn, args, kwargs in callbacks:
+            fn(*args, **kwargs)
+
+# QueryStats collecting for the current request/job; None outside of one
+_query_stats = ContextVar("query_stats", default=None)
+# extra observers called as listener(sql, seconds, rows) for every statement, e.g. the benchmark round-trip counter
+query_listeners = []
+
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:%s\s*,\s*)*%s\s*\)")
+_REPEATED_LISTS = re.compile(r"\(%s, \.\.\.\)(?:\s*,\s*\(%s, \.\.\.\))+")
+
+def _statement_shape(sql):
+    """Normalize a statement template so that only the number of placeholders differs between calls."""
+    shape = " ".join(sql.split())
+    shape = _PLACEHOLDER_LIST.sub("(%s, ...)", shape)
+    return _REPEATED_LISTS.sub("(%s, ...), ...", shape)
+
+class QueryStats:
+    """
+    SQL issued inside one request or background job: statement count, time waiting on MySQL,
+    rows returned, the slowest statements and how often each statement shape ran.
+    Statements are also recorded on `parent`, so a recompute run inside a request counts towards both.
+    """
+
+    def __init__(self, parent=None, keep_slowest=5):
+        self.parent = parent
+        self.count = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.shapes = Counter()
+        self._keep = keep_slowest
+        self._slowest = []  # min-heap of (seconds, seq, sql)
+        self._seq = itertools.count()
+
+    def record(self, sql, seconds, rows):
+        self.count += 1
+        self.seconds += seconds
+        self.rows += rows
+        self.shapes[_statement_shape(sql)] += 1
+        item = (seconds, next(self._seq), sql)
+        if len(self._slowest) < self._keep:
+            heapq.heappush(self._slowest, item)
+        elif item > self._slowest[0]:
+            heapq.heapreplace(self._slowest, item)
+        if self.parent is not None:
+            self.parent.record(sql, seconds, rows)
+
+    def slowest(self):
+        return [(seconds, sql) for seconds, _, sql in sorted(self._slowest, reverse=True)]
+
+    def repeated(self, threshold):
+        """Statement shapes run more than `threshold` times: the N+1 pattern."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > threshold]
+
+    def server_timing(self, total_seconds):
+        def desc(text):
+            text = " ".join(text.split()).replace("\\", "").replace('"', "'")
+            return text.encode("ascii", "replace").decode()[:80]
+
+        parts = [
+            f'db;dur={self.seconds * 1000:.1f};desc="{self.count} queries, {self.rows} rows"',
+            f"app;dur={max(total_seconds - self.seconds, 0) * 1000:.1f}",
+        ]
+        for i, (seconds, sql) in enumerate(self.slowest()[:3], 1):
+            parts.append(f'sql{i};dur={seconds * 1000:.1f};desc="{desc(sql)}"')
+        return ", ".join(parts)
+
+class _InstrumentedExecute:
+    """Cursor mixin that reports every statement to the active QueryStats and to query_listeners."""
+
+    @staticmethod
+    def record(query, seconds, rows):
+        # also called directly by storage.SQLiteCursor for connections opened with these cursor classes
+        stats = _query_stats.get()
+        if stats is not None:
+            stats.record(query, seconds, rows)
+        for listener in query_listeners:
+            listener(query, seconds, rows)
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            self.record(query, time.perf_counter() - started, len(self._rows) if self._rows else 0)
+
+class InstrumentedCursor(_InstrumentedExecute, pymysql.cursors.DictCursor):
+    pass
+
+class InstrumentedTupleCursor(_InstrumentedExecute, pymysql.cursors.Cursor):
+    """Tuple rows, for bulk reads where building a dict per row would dominate."""
+
+class InstrumentedSSCursor(_InstrumentedExecute, pymysql.cursors.SSCursor):
+    """Unbuffered tuple rows, read from the socket as they are fetched (exports)."""
+
+@contextmanager
+def track_queries(stats=None):
+    """Collect the statements run in this block (and still report them to any enclosing scope)."""
+    stats = stats or QueryStats(parent=_query_stats.get())
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+class Metrics:
+    """Process-wide counters per endpoint/job, rendered in Prometheus text format at /debug/metrics."""
+
+    COUNTERS = {
+        "requests_total": "Requests and background jobs handled",
+        "request_seconds_total": "Wall time spent handling them",
+        "errors_total": "Requests and jobs that raised",
+        "db_queries_total": "SQL statements executed",
+        "db_seconds_total": "Time spent waiting on MySQL",
+        "db_rows_total": "Rows returned by MySQL",
+        "n_plus_one_total": "Requests and jobs that repeated one statement shape more than N_PLUS_ONE_THRESHOLD times",
+    }
+
+    def __init__(self, prefix="tradingview"):
+        self.prefix = prefix
+        self._values = {name: Counter() for name in self.COUNTERS}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, stats, seconds, failed=False, n_plus_one=False):
+        with self._lock:
+            self._values["requests_total"][endpoint] += 1
+            self._values["request_seconds_total"][endpoint] += seconds
+            self._values["errors_total"][endpoint] += int(failed)
+            self._values["db_queries_total"][endpoint] += stats.count
+            self._values["db_seconds_total"][endpoint] += stats.seconds
+            self._values["db_rows_total"][endpoint] += stats.rows
+            self._values["n_plus_one_total"][endpoint] += int(n_plus_one)
+
+    def render(self, gauges=None):
+        lines = []
+        with self._lock:
+            for name, help_text in self.COUNTERS.items():
+                metric = f"{self.prefix}_{name}"
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+                for endpoint, value in sorted(self._values[name].items()):
+                    lines.append(f'{metric}{{endpoint="{endpoint}"}} {value:g}')
+        for name, (help_text, value) in (gauges or {}).items():
+            metric = f"{self.prefix}_{name}"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge", f"{metric} {value:g}"]
+        return "\n".join(lines) + "\n"
+
+class LedgerVersion:
+    """
+    Generation counter for the ledger. Every write path bumps it; anything cached from the
+    ledger (balances, rendered views, ETags) is only valid for the generation it was built at.
+    Writes are scoped to an account, so one account's edits leave the others' caches warm;
+    an unscoped bump invalidates every account.
+    """
+
+    def __init__(self):
+        self._value = 0
+        self._global = 0  # generation of the last unscoped bump
+        self._scoped = {}  # account id -> generation of its last write
+        self._lock = threading.Lock()
+
+    @property
+    def value(self):
+        return self._value
+
+    def get(self, scope=None):
+        if scope is None:
+            return self._global
+        return max(self._scoped.get(scope, 0), self._global)
+
+    def bump(self, scope=None):
+        with self._lock:
+            self._value += 1
+            if scope is None:
+                self._global = self._value
+            else:
+                self._scoped[scope] = self._value
+            return self._value
+
+ledger_version = LedgerVersion()
+
+# TraderInfo.id of the account used when none is selected; every account_id column defaults to it
+DEFAULT_ACCOUNT = 1
+
+class LedgerCache:
+    """
+    Caches values derived from the ledger until ledger_version moves on for their scope (account).
+    ttl (seconds, 0 = never) additionally expires entries, to pick up writes made directly in MySQL.
+    """
+
+    def __init__(self, version, ttl=0):
+        self._version = version
+        self.ttl = ttl
+        self._entries = {}  # key -> (version, stored_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, loader, scope=None):
+        key = (scope, key)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        current = self._version.get(scope)
+        if entry is not None:
+            version, stored_at, value = entry
+            if version == current and not (self.ttl and now - stored_at > self.ttl):
+                return value
+        value = loader()
+        with self._lock:
+            self._entries[key] = (current, now, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class BalanceIndex:
+    """
+    In-memory cumulative P/L over calendar days (a Fenwick tree of cents), so the balance at any
+    date is base + prefix sum: O(log n) to read or to change, instead of rewriting every later
+    days/weeks row. Also tracks how many trades each day has, to know which days exist.
+    Dates outside the current span trigger an O(n log n) rebuild with a wider span.
+
+    Load as: token = index.token(); read the rows; index.load(base, rows, token). A trade write
+    brackets its transaction and its add() with begin_write()/end_write(); each of those, add() and
+    set_base() move the token on. load() refuses rows when the token moved or a write is still open,
+    since they may or may not include that write's commit: applying its add() on top would count the
+    trade twice, skipping it would lose it.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.loaded_at = 0.0
+        self._generation = 0  # bumped by every change, see token()
+        self._writes = 0  # trade writes between begin_write() and end_write()
+        self._base = 0  # TraderInfo.starting_balance, in cents
+        self._origin = 0  # ordinal of tree slot 1
+        self._tree = [0]
+        self._days = {}  # ordinal -> [pl_cents, trade_count]
+        self._trades = 0
+
+    def token(self):
+        return self._generation
+
+    def begin_write(self):
+        with self._lock:
+            self._writes += 1
+            self._generation += 1
+
+    def end_write(self):
+        with self._lock:
+            self._writes -= 1
+            self._generation += 1
+
+    def invalidate(self):
+        """Reload on the next read, e.g. after a bulk rewrite (the object stays: writers may hold it)."""
+        with self._lock:
+            self.loaded = False
+            self._generation += 1
+
+    def load(self, base, rows, token=None):
+        """
+        rows: iterable of (date, day_pl, trade_count). Returns False (and keeps nothing) if the token
+        went stale or a write is open.
+        """
+        with self._lock:
+            if token is not None and (token != self._generation or self._writes):
+                return False
+            self._base = _cents(base)
+            self._days = {d.toordinal(): [_cents(pl), int(n)] for d, pl, n in rows}
+            self._trades = sum(n for _, n in self._days.values())
+            self._resize(self._days.keys())
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+            return True
+
+    def fresh(self, ttl=0):
+        """Loaded, and (with a ttl in seconds) loaded recently enough to trust."""
+        return self.loaded and not (ttl and time.monotonic() - self.loaded_at > ttl)
+
+    def _resize(self, ordinals):
+        ordinals = list(ordinals) or [date.today().toordinal()]
+        lo, hi = min(ordinals), max(ordinals)
+        self._origin = lo - 366
+        self._tree = [0] * (hi - self._origin + 2 * 366 + 1)
+        for o, (pl, _) in self._days.items():
+            self._tree_add(o, pl)
+
+    def _tree_add(self, ordinal, cents):
+        i = ordinal - self._origin + 1
+        while i < len(self._tree):
+            self._tree[i] += cents
+            i += i & -i
+
+    def _prefix(self, ordinal):
+        """Sum of day P/L for every day <= ordinal."""
+        i = min(ordinal - self._origin + 1, len(self._tree) - 1)
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def add(self, d, pl_delta, trades_delta=0):
+        with self._lock:
+            self._generation += 1
+            if not self.loaded:
+                return  # a load in flight can't tell whether its rows include this write
+            o = d.toordinal()
+            day = self._days.setdefault(o, [0, 0])
+            day[0] += _cents(pl_delta)
+            day[1] += trades_delta
+            self._trades += trades_delta
+            if not self._origin < o < self._origin + len(self._tree) - 1:
+                self._resize(list(self._days.keys()))
+            else:
+                self._tree_add(o, _cents(pl_delta))
+            if day[1] <= 0 and day[0] == 0:
+                del self._days[o]  # no trades left: the days row is gone too
+
+    def set_base(self, base):
+        with self._lock:
+            self._generation += 1
+            self._base = _cents(base)
+
+    def _money(self, cents):
+        return cents / 100
+
+    @property
+    def base(self):
+        return self._money(self._base)
+
+    def has_day(self, d):
+        day = self._days.get(d.toordinal())
+        return day is not None and day[1] > 0
+
+    def day_pl(self, d):
+        day = self._days.get(d.toordinal())
+        return self._money(day[0]) if day else 0.0
+
+    def balance_at(self, d):
+        """current_balance at the end of day d."""
+        with self._lock:
+            return self._money(self._base + self._prefix(d.toordinal()))
+
+    def balance_before(self, d):
+        """entry_balance of day d (balance at the end of the previous day)."""
+        with self._lock:
+            return self._money(self._base + self._prefix(d.toordinal() - 1))
+
+    def risk10_at(self, d):
+        return float(_to_cents(Decimal(self._base + self._prefix(d.toordinal() - 1)) / 1000))
+
+    def week_starting_balance(self, sunday):
+        return self.balance_before(sunday)
+
+    def week_pl(self, sunday):
+        with self._lock:
+            o = sunday.toordinal()
+            return self._money(self._prefix(o + 6) - self._prefix(o - 1))
+
+    def has_week(self, sunday):
+        return any(self.has_day(sunday + timedelta(days=i)) for i in range(7))
+
+    def latest_balance(self):
+        """Balance after the last day, or None when there are no days (callers fall back to base)."""
+        with self._lock:
+            if not self._days:
+                return None
+            return self._money(self._base + self._prefix(max(self._days)))
+
+    def memory_days(self):
+        return len(self._days)
+
+    def trade_count(self):
+        return self._trades
+
+_NULL_I8 = -2**63
+
+class JournalSnapshot:
+    """
+    One account's dated trades held in process as parallel typed arrays sorted by (trade_date, id):
+    an int64 key packing the date ordinal above the id, int32 codes into `symbols`, sizes and prices
+    in 1/10000 and profit and risk metrics in hundredths (int64, _NULL_I8 for NULL), plus the ids
+    sorted with their dates to find a trade's key. A page or a lookup is a bisect plus one dict per
+    returned row; each write replaces just its trade. 96 bytes per trade.
+    """
+
+    PRICES = ("position_size", "entry_price", "exit_price", "stop_loss", "take_profit")  # DECIMAL(16, 4)
+    HUNDREDTHS = ("profit", "risk_at_entry", "r_multiple", "reward_risk")
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.loaded_at = 0.0
+        self._clear()
+
+    def _clear(self):
+        self._keys = array("q")
+        self._symbol = array("i")
+        self._values = [array("q") for _ in self.PRICES + self.HUNDREDTHS]
+        self._scales = [10000] * len(self.PRICES) + [100] * len(self.HUNDREDTHS)
+        self._ids = array("q")  # every trade id, ascending ...
+        self._id_days = array("i")  # ... and its date ordinal
+        self.symbols = []
+        self._codes = {}
+
+    @staticmethod
+    def _key(ordinal, trade_id):
+        return ordinal << 32 | trade_id
+
+    def _code(self, symbol):
+        code = self._codes.get(symbol)
+        if code is None:
+            code = self._codes[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return code
+
+    def load(self, rows):
+        """rows: (id, date ordinal, symbol, *PRICES, *HUNDREDTHS) as _SNAPSHOT_COLUMNS, in (trade_date, id) order."""
+        with self._lock:
+            self._clear()
+            ids = []
+            for row in rows:
+                self._keys.append(self._key(row[1], row[0]))
+                self._symbol.append(self._code(row[2]))
+                for column, value in zip(self._values, row[3:]):
+                    column.append(_NULL_I8 if value is None else value)
+                ids.append((row[0], row[1]))
+            ids.sort()
+            self._ids = array("q", (trade_id for trade_id, _ in ids))
+            self._id_days = array("i", (ordinal for _, ordinal in ids))
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+
+    def fresh(self, ttl=0):
+        """Loaded, and (with a ttl in seconds) loaded recently enough to trust."""
+        return self.loaded and not (ttl and time.monotonic() - self.loaded_at > ttl)
+
+    def _find(self, trade_id):
+        """Position of trade_id in the id columns, or None."""
+        i = bisect_left(self._ids, trade_id)
+        return i if i < len(self._ids) and self._ids[i] == trade_id else None
+
+    def remove(self, trade_id):
+        with self._lock:
+            i = self._find(trade_id)
+            if i is None:
+                return
+            pos = bisect_left(self._keys, self._key(self._id_days[i], trade_id))
+            del self._ids[i], self._id_days[i], self._keys[pos], self._symbol[pos]
+            for column in self._values:
+                del column[pos]
+
+    def put(self, row):
+        """Insert or replace one trade (a _SNAPSHOT_COLUMNS row)."""
+        key = self._key(row[1], row[0])
+        values = [_NULL_I8 if value is None else value for value in row[3:]]
+        with self._lock:
+            self.remove(row[0])
+            pos = bisect_left(self._keys, key)
+            self._keys.insert(pos, key)
+            self._symbol.insert(pos, self._code(row[2]))
+            for column, value in zip(self._values, values):
+                column.insert(pos, value)
+            i = bisect_left(self._ids, row[0])
+            self._ids.insert(i, row[0])
+            self._id_days.insert(i, row[1])
+
+    def _row(self, pos):
+        """The trade at pos as a dict with the keys of _TRADES_COLUMNS."""
+        key = self._keys[pos]
+        row = {"id": key & 0xFFFFFFFF, "trade_date": date.fromordinal(key >> 32),
+               "symbol": self.symbols[self._symbol[pos]]}
+        for name, column, scale in zip(self.PRICES + self.HUNDREDTHS, self._values, self._scales):
+            value = column[pos]
+            row[name] = None if value == _NULL_I8 else value / scale
+        return row
+
+    def get(self, trade_id):
+        with self._lock:
+            i = self._find(trade_id)
+            if i is None:
+                return None
+            return self._row(bisect_left(self._keys, self._key(self._id_days[i], trade_id)))
+
+    def page(self, per_page, after_key=None, before_key=None):
+        """The rows _trades_page_query would return (same order, at most per_page + 1), for _trades_listing."""
+        with self._lock:
+            if before_key:
+                lo = bisect_right(self._keys, self._key(before_key[0].toordinal(), before_key[1]))
+                positions = range(lo, min(lo + per_page + 1, len(self._keys)))
+            else:
+                hi = len(self._keys)
+                if after_key:
+                    hi = bisect_left(self._keys, self._key(after_key[0].toordinal(), after_key[1]))
+                positions = range(hi - 1, max(hi - per_page - 1, 0) - 1, -1)
+            return [self._row(pos) for pos in positions]
+
+    def __len__(self):
+        return len(self._keys)
+
+    @property
+    def nbytes(self):
+        columns = [self._keys, self._symbol, self._ids, self._id_days, *self._values]
+        return sum(column.itemsize * len(column) for column in columns)
+
+class RecomputeScheduler:
+    """
+    Deferred, coalescing ledger recompute.
+    Writers call schedule(start_date) and return immediately; only the earliest dirty date per key
+    (account) is kept, so a burst of edits collapses into one recompute. A daemon worker waits
+    `delay` seconds after the first edit of a burst before running. flush() runs whatever is
+    pending in the calling thread and returns once the ledger has settled.
+    A recompute that raises stays queued (from the earlier of its date and any newer one), flush()
+    returns it as a failure, and the worker retries it with a doubling delay up to `max_retry_delay`.
+    With deferred=False, schedule() recomputes synchronously (the pre-scheduler behaviour).
+    recompute is called as recompute(start_date, key).
+    """
+
+    def __init__(self, recompute, deferred=True, delay=0.25, max_retry_delay=60.0):
+        self._recompute = recompute
+        self.deferred = deferred
+        self.delay = delay
+        self.max_retry_delay = max_retry_delay
+        self._dirty = {}  # key -> earliest date still to recompute
+        self._cond = threading.Condition()
+        self._work_lock = threading.Lock()  # one recompute at a time, worker or flush()
+        self._busy = False
+        self._thread = None
+
+    def schedule(self, start_date, key=None):
+        if isinstance(start_date, str):
+            start_date = date.fromisoformat(start_date[:10])
+        with self._cond:
+            self._mark_dirty(key, start_date)
+            if self.deferred:
+                self._ensure_worker()
+                self._cond.notify()
+        if not self.deferred and self.flush():
+            with self._cond:
+                self._ensure_worker()  # the failed recompute is retried in the background
+
+    def _mark_dirty(self, key, start_date):
+        current = self._dirty.get(key)
+        self._dirty[key] = start_date if current is None else min(current, start_date)
+
+    def discard(self, key=None):
+        """Drop `key`'s pending recompute, e.g. once a full rebuild of that account has superseded it."""
+        with self._cond:
+            self._dirty.pop(key, None)
+
+    def settling(self, key=None):
+        """True while a recompute is pending or running (for `key`, or for any key when None)."""
+        with self._cond:
+            return self._busy or (key in self._dirty if key is not None else bool(self._dirty))
+
+    def flush(self):
+        """
+        Run every pending recompute once; returns [(key, start_date, error)] for those that failed,
+        which stay queued. An empty list means the ledger has settled.
+        """
+        failed = {}
+        with self._work_lock:
+            while True:
+                with self._cond:
+                    keys = [k for k in self._dirty if k not in failed]
+                    if not keys:
+                        self._busy = False
+                        return [(key, start_date, e) for key, (start_date, e) in failed.items()]
+                    key = keys[0]
+                    start_date = self._dirty.pop(key)
+                    self._busy = True
+                try:
+                    self._recompute(start_date, key)
+                except Exception as e:
+                    print(f"⚠️ Failed to recompute from {start_date}{f' (account {key})' if key is not None else ''}: {e}")
+                    with self._cond:
+                        self._mark_dirty(key, start_date)  # keep it, merged with anything scheduled meanwhile
+                    failed[key] = (start_date, e)
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="ledger-recompute", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        retries = 0
+        while True:
+            with self._cond:
+                while not self._dirty:
+                    self._cond.wait()
+            # let the rest of a burst of edits land first; back off while a recompute keeps failing
+            time.sleep(min(max(self.delay, 1.0) * 2 ** (retries - 1), self.max_retry_delay) if retries else self.delay)
+            retries = retries + 1 if self.flush() else 0
+
+def _encode_cursor(row):
+    """Opaque pagination token for a trades row's (trade_date, id) sort key."""
+    raw = f"{row['trade_date'].isoformat()}|{row['id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(token):
+    """Inverse of _encode_cursor; returns (date, id) or None for a missing/garbled token."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        d, trade_id = raw.split("|")
+        return date.fromisoformat(d), int(trade_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+# profit and the risk metrics are STORED generated columns, so views read them as they are
+_TRADES_COLUMNS = ("id, trade_date, symbol, position_size, entry_price, exit_price, stop_loss, take_profit, "
+                   "profit, risk_at_entry, r_multiple, reward_risk")
+
+# bounded count: stops after LIMIT rows of the (account_id, trade_date, id) index
+_TRADES_COUNT_SQL = """
+    SELECT COUNT(*) AS cnt FROM (
+        SELECT 1 FROM trades
+        WHERE account_id = %s AND trade_date IS NOT NULL
+        LIMIT %s
+    ) t
+"""
+
+# the symbols rollup: one row per account and symbol, adjusted by delta on every trade write (wins/losses as
+# in analytics: profit > 0 / < 0). Removing a trade re-reads the symbol's latest trade_date, one backward
+# dive of (symbol_id, trade_date, id).
+_SYMBOL_ID_SQL = "SELECT id FROM symbols WHERE account_id = %s AND symbol = %s"
+_SYMBOL_INSERT_SQL = "INSERT INTO symbols (account_id, symbol) VALUES (%s, %s) ON DUPLICATE KEY UPDATE symbol = symbol"
+_SYMBOL_ADD_SQL = """
+    UPDATE symbols
+    SET trades = trades + 1, total_pl = total_pl + %s, wins = wins + %s, losses = losses + %s,
+        last_trade_date = GREATEST(COALESCE(last_trade_date, %s), %s)
+    WHERE id = %s
+"""
+_SYMBOL_REMOVE_SQL = """
+    UPDATE symbols
+    SET trades = trades - 1, total_pl = total_pl - %s, wins = wins - %s, losses = losses - %s,
+        last_trade_date = (SELECT MAX(trade_date) FROM trades WHERE symbol_id = %s)
+    WHERE id = %s
+"""
+_SYMBOL_STATS_SQL = """
+    SELECT id, symbol, trades, total_pl, wins, losses, last_trade_date
+    FROM symbols
+    WHERE account_id = %s AND trades > 0
+"""
+
+def _symbol_add_args(symbol_id, profit, trade_date):
+    """_SYMBOL_ADD_SQL parameters for one trade joining the symbol."""
+    return (profit, int(profit > 0), int(profit < 0), trade_date, trade_date, symbol_id)
+
+def _symbol_remove_args(symbol_id, profit):
+    """_SYMBOL_REMOVE_SQL parameters for one trade leaving the symbol (run after the trade was moved/deleted)."""
+    return (profit, int(profit > 0), int(profit < 0), symbol_id, symbol_id)
+
+def _symbol_id(cur, account_id, symbol):
+    """The account's symbols.id for symbol, adding the row on first use."""
+    cur.execute(_SYMBOL_ID_SQL, (account_id, symbol))
+    row = cur.fetchone()
+    if row is None:
+        cur.execute(_SYMBOL_INSERT_SQL, (account_id, symbol))
+        cur.execute(_SYMBOL_ID_SQL, (account_id, symbol))
+        row = cur.fetchone()
+    return row["id"]
+
+# trades in JournalSnapshot's layout, as plain integers: loading one parses no DECIMAL or DATE
+_SNAPSHOT_COLUMNS = ", ".join(
+    ["id", "TO_DAYS(trade_date) - 365", "symbol"]  # TO_DAYS - 365 = Python's date.toordinal()
+    + [f"CAST(ROUND({c} * 10000) AS SIGNED)" for c in JournalSnapshot.PRICES]
+    + [f"CAST(ROUND({c} * 100) AS SIGNED)" for c in JournalSnapshot.HUNDREDTHS]
+)
+_SNAPSHOT_ALL_SQL = f"""
+    SELECT account_id, {_SNAPSHOT_COLUMNS} FROM trades
+    WHERE trade_date IS NOT NULL
+    ORDER BY account_id, trade_date, id
+"""
+_SNAPSHOT_ACCOUNT_SQL = f"""
+    SELECT {_SNAPSHOT_COLUMNS} FROM trades
+    WHERE account_id = %s AND trade_date IS NOT NULL
+    ORDER BY trade_date, id
+"""
+_SNAPSHOT_TRADE_SQL = f"SELECT {_SNAPSHOT_COLUMNS} FROM trades WHERE id = %s AND trade_date IS NOT NULL"
+
+def _trades_page_query(account_id, per_page, after_key=None, before_key=None, symbol_id=None):
+    """
+    (sql, args) for one keyset page of trades; one extra row tells whether another page exists.
+    With symbol_id (a symbols row, so already one account's) the page walks (symbol_id, trade_date, id) instead.
+    """
+    scope, key = ("symbol_id", symbol_id) if symbol_id is not None else ("account_id", account_id)
+    if after_key:
+        return f"""
+            SELECT {_TRADES_COLUMNS} FROM trades
+            WHERE {scope} = %s AND (trade_date < %s OR (trade_date = %s AND id < %s))
+            ORDER BY trade_date DESC, id DESC LIMIT %s
+        """, (key, after_key[0], after_key[0], after_key[1], per_page + 1)
+    if before_key:
+        return f"""
+            SELECT {_TRADES_COLUMNS} FROM trades
+            WHERE {scope} = %s AND (trade_date > %s OR (trade_date = %s AND id > %s))
+            ORDER BY trade_date ASC, id ASC LIMIT %s
+        """, (key, before_key[0], before_key[0], before_key[1], per_page + 1)
+    return f"""
+        SELECT {_TRADES_COLUMNS} FROM trades
+        WHERE {scope} = %s AND trade_date IS NOT NULL
+        ORDER BY trade_date DESC, id DESC LIMIT %s
+    """, (key, per_page + 1)
+
+def _trades_listing(rows, per_page, after_key, before_key, total, total_exact):
+    """The trades page (rows from _trades_page_query) with its cursors and total."""
+    more = len(rows) > per_page
+    rows = list(rows[:per_page])
+    if before_key:
+        rows.reverse()
+        has_prev, has_next = more, True
+    else:
+        has_prev, has_next = bool(after_key), more
+
+    return {
+        "trades": rows,
+        "total": total,
+        "total_exact": total_exact,
+        "next_cursor": _encode_cursor(rows[-1]) if rows and has_next else None,
+        "prev_cursor": _encode_cursor(rows[0]) if rows and has_prev else None,
+    }
+
+def _grid_range(year, month):
+    """First (Sunday) and last cell of the 6x7 calendar grid for a month."""
+    # Python weekday(): Monday=0..Sunday=6. To get Sunday as start, compute days to subtract
+    first_day = date(year, month, 1)
+    start_grid = first_day - timedelta(days=(first_day.weekday() + 1) % 7)
+    return start_grid, start_grid + timedelta(days=41)  # inclusive last cell (6*7 - 1)
+
+_CALENDAR_DAYS_SQL = """
+    SELECT date, day_pl, risk10, entry_balance, current_balance
+    FROM days
+    WHERE account_id = %s AND date BETWEEN %s AND %s
+"""
+
+# weeks are Sunday..Saturday and the grid starts on a Sunday, so the weeks overlapping the grid are
+# exactly those starting inside it: a range on uq_weeks_account_start
+_CALENDAR_WEEKS_SQL = """
+    SELECT id, start_date, end_date, week_pl, starting_balance
+    FROM weeks
+    WHERE account_id = %s AND start_date BETWEEN %s AND %s
+"""
+
+# the reads behind BalanceIndex.load and _compute_ledger (start_date is a Sunday or date.min, and weeks
+# are Sunday..Saturday, so "week ends before/after it" is "week starts before/after it")
+_BALANCE_INDEX_SQL = """
+    SELECT d.`date`, d.day_pl, COUNT(t.id) AS trades
+    FROM days d
+    LEFT JOIN trades t ON t.day_id = d.id
+    WHERE d.account_id = %s
+    GROUP BY d.id, d.`date`, d.day_pl
+"""
+
+_LEDGER_SEED_SQL = """
+    SELECT
+        (SELECT current_balance FROM days
+         WHERE account_id = %s AND `date` < %s ORDER BY `date` DESC LIMIT 1) AS prev_balance,
+        (SELECT starting_balance + week_pl FROM weeks
+         WHERE account_id = %s AND start_date < %s ORDER BY start_date DESC LIMIT 1) AS prev_week_balance,
+        (SELECT starting_balance FROM TraderInfo WHERE id = %s) AS trader_balance
+"""
+
+_LEDGER_DAYS_SQL = """
+    SELECT d.id, d.`date`, d.week_id, d.entry_balance, d.day_pl, d.current_balance, d.risk10,
+           COALESCE(t.s, 0) AS trades_pl
+    FROM days d
+    LEFT JOIN (
+        SELECT t2.day_id, SUM(t2.profit) AS s
+        FROM trades t2
+        JOIN days d2 ON d2.id = t2.day_id
+        WHERE d2.account_id = %s AND d2.`date` >= %s
+        GROUP BY t2.day_id
+    ) t ON t.day_id = d.id
+    WHERE d.account_id = %s AND d.`date` >= %s
+    ORDER BY d.`date` ASC
+"""
+
+_LEDGER_WEEKS_SQL = """
+    SELECT id, start_date, starting_balance, week_pl
+    FROM weeks
+    WHERE account_id = %s AND start_date >= %s
+    ORDER BY start_date ASC
+"""
+
+# rebuild_ledger: one chunk of an account's ledger, [lo, hi) on Sundays, recomputed in the database.
+# Each table gets one statement: a running SUM() OVER the chunk on top of the balance carried into it
+# (the parameters before the account id), joined back by id and written only where a value differs.
+# The weeks statement reads the day_pl the days statement just wrote.
+_REBUILD_DAYS_SQL = """
+    UPDATE days d
+    JOIN (
+        SELECT x.id,
+               ROUND(x.day_pl, 2) AS day_pl,
+               ROUND(%s + x.running - x.day_pl, 2) AS entry_balance,
+               ROUND(%s + x.running, 2) AS current_balance
+        FROM (
+            SELECT d2.id, COALESCE(t.s, 0) AS day_pl,
+                   SUM(COALESCE(t.s, 0)) OVER (ORDER BY d2.`date` ROWS UNBOUNDED PRECEDING) AS running
+            FROM days d2
+            LEFT JOIN (
+                SELECT t2.day_id, SUM(t2.profit) AS s
+                FROM trades t2
+                JOIN days d3 ON d3.id = t2.day_id
+                WHERE d3.account_id = %s AND d3.`date` >= %s AND d3.`date` < %s
+                GROUP BY t2.day_id
+            ) t ON t.day_id = d2.id
+            WHERE d2.account_id = %s AND d2.`date` >= %s AND d2.`date` < %s
+        ) x
+    ) v ON v.id = d.id
+    SET d.entry_balance = v.entry_balance, d.day_pl = v.day_pl, d.current_balance = v.current_balance,
+        d.risk10 = ROUND(v.entry_balance * 0.10, 2)
+    WHERE d.entry_balance <> v.entry_balance OR d.day_pl <> v.day_pl
+       OR d.current_balance <> v.current_balance OR d.risk10 <> ROUND(v.entry_balance * 0.10, 2)
+"""
+
+_REBUILD_WEEKS_SQL = """
+    UPDATE weeks w
+    JOIN (
+        SELECT x.id,
+               ROUND(x.week_pl, 2) AS week_pl,
+               ROUND(%s + x.running - x.week_pl, 2) AS starting_balance
+        FROM (
+            SELECT w2.id, COALESCE(p.s, 0) AS week_pl,
+                   SUM(COALESCE(p.s, 0)) OVER (ORDER BY w2.start_date ROWS UNBOUNDED PRECEDING) AS running
+            FROM weeks w2
+            LEFT JOIN (
+                SELECT d2.week_id, SUM(d2.day_pl) AS s
+                FROM days d2
+                WHERE d2.account_id = %s AND d2.`date` >= %s AND d2.`date` < %s
+                GROUP BY d2.week_id
+            ) p ON p.week_id = w2.id
+            WHERE w2.account_id = %s AND w2.start_date >= %s AND w2.start_date < %s
+        ) x
+    ) v ON v.id = w.id
+    SET w.starting_balance = v.starting_balance, w.week_pl = v.week_pl
+    WHERE w.starting_balance <> v.starting_balance OR w.week_pl <> v.week_pl
+"""
+
+# the Sunday `chunk_weeks` weeks after lo, where the next chunk starts (none: this is the last one)
+_REBUILD_CHUNK_END_SQL = """
+    SELECT start_date FROM weeks
+    WHERE account_id = %s AND start_date >= %s
+    ORDER BY start_date
+    LIMIT 1 OFFSET %s
+"""
+
+def _calendar_cells_from_rows(year, month, day_rows, weeks):
+    """The 6x7 grid (Sunday first) from the month's days rows and the weeks overlapping the grid."""
+    default_risk = 10
+    start_grid, end_grid = _grid_range(year, month)
+
+    day_pl_map = { 
+        r["date"]: {
+            "day_pl": float(r["day_pl"]),
+            "risk10": r["risk10"],
+            "entry_balance": float(r["entry_balance"]),
+            "current_balance": r["current_balance"],
+        } for r in day_rows
+    }
+
+    # Map each date in the visible grid to its week data (starting_balance and week_pl)
+    week_date_map = {}
+    saturday_weekpl = {}
+    for w in weeks:
+        w_start = w["start_date"]
+        w_end = w["end_date"]
+        # overlap with visible grid
+        start = max(w_start, start_grid)
+        end = min(w_end, end_grid)
+        sb = float(w["starting_balance"])
+        wp = float(w["week_pl"])
+        # assign week data to each date in this week's overlap with the grid
+        d_iter = start
+        while d_iter <= end:
+            week_date_map[d_iter] = {"starting_balance": sb, "week_pl": wp}
+            d_iter += timedelta(days=1)
+        # compute saturday for display of week total on Saturday cell
+        # w_start is the week's start_date (now Sunday); Saturday is +6 days
+        saturday = w_start + timedelta(days=6)
+        if start_grid <= saturday <= end_grid:
+            saturday_weekpl[saturday] = wp
+
+    # Build the 6x7 grid
+    cells = []
+    d = start_grid
+    for _ in range(6*7):
+        day_pl = day_pl_map.get(d)
+        weekinfo = week_date_map.get(d)
+
+        cells.append({
+            "date": d,
+            "in_month": d.month == month,
+            "day_pl": day_pl["day_pl"] if day_pl else None,
+            # show week total only on Saturday cell when available
+            "week_pl": saturday_weekpl.get(d) if d.weekday() == 5 else None,
+            "risk10": day_pl["risk10"] if day_pl else None,
+            # calculate daily risk from the week data: ((starting_balance + week_pl) * default_risk) / 100
+            "daily_risk": ((weekinfo["starting_balance"] + weekinfo["week_pl"]) * default_risk) / 100 if weekinfo else None,
+        })
+        d += timedelta(days=1)
+    return cells
+
+def _build_calendar_cells_from_index(index, year, month):
+    """Same grid as _calendar_cells_from_rows, answered from the BalanceIndex without queries."""
+    default_risk = 10
+    start_grid, _ = _grid_range(year, month)
+    cells = []
+    for i in range(6*7):
+        d = start_grid + timedelta(days=i)
+        sunday = _week_start(d)
+        has_week = index.has_week(sunday)
+        daily_risk = None
+        if has_week:
+            week_end_balance = index.week_starting_balance(sunday) + index.week_pl(sunday)
+            daily_risk = (week_end_balance * default_risk) / 100
+        has_day = index.has_day(d) and d.month == month
+        cells.append({
+            "date": d,
+            "in_month": d.month == month,
+            "day_pl": index.day_pl(d) if has_day else None,
+            # show week total only on Saturday cell when available
+            "week_pl": index.week_pl(sunday) if d.weekday() == 5 and has_week else None,
+            "risk10": index.risk10_at(d) if has_day else None,
+            "daily_risk": daily_risk,
+        })
+    return cells
+
+MONTH_NAMES = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+def _heat_level(value, scale):
+    """-4..4 shade for a P/L value relative to the largest absolute value shown (0 = flat or no data)."""
+    if not value or not scale:
+        return 0
+    level = min(4, int(abs(value) / scale * 4) + 1)
+    return level if value > 0 else -level
+
+def _heatmap_weeks(first, last, day_pl):
+    """
+    Week columns (Sunday first, like the calendar) covering first..last, each 7 cells of
+    {"date", "pl", "level"}; days outside the range are None. day_pl maps date -> P/L.
+    """
+    scale = max((abs(v) for v in day_pl.values()), default=0)
+    weeks = []
+    d = _week_start(first)
+    while d <= last:
+        week = []
+        for _ in range(7):
+            if first <= d <= last:
+                pl = day_pl.get(d)
+                week.append({"date": d, "pl": pl, "level": _heat_level(pl, scale)})
+            else:
+                week.append(None)
+            d += timedelta(days=1)
+        weeks.append(week)
+    return weeks
+
+class MonthGridCache:
+    """
+    Bounded LRU of computed calendar grids keyed by (account, year, month), shared by all accounts.
+    Like LedgerCache, a grid is only served at the ledger_version of its account it was built at, and
+    within ttl seconds (0 = no expiry) so direct or other-process writes show up. invalidate_from()
+    additionally evicts an account's grids from a date onwards, for rewrites that don't bump the version.
+
+    Build a missing grid as: token = cache.token(scope); cells = build(); cache.put(..., token). A put
+    whose token went stale during the build (a write or an eviction in between) is dropped, so a grid
+    read before a commit can't be stored after the eviction that commit triggered.
+    """
+
+    def __init__(self, version, max_size=120, ttl=0):
+        self._version = version
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (account, year, month) -> (version, stored_at, cells)
+        self._evictions = 0  # bumped by every invalidate/clear, so builds that straddle one are dropped
+        self._lock = threading.Lock()
+
+    def token(self, scope=None):
+        return self._version.get(scope), self._evictions
+
+    def get(self, year, month, scope=None):
+        key = (scope, year, month)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            version, stored_at, cells = entry
+            if version != self._version.get(scope) or (self.ttl and time.monotonic() - stored_at > self.ttl):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return cells
+
+    def put(self, year, month, cells, scope=None, token=None):
+        with self._lock:
+            current = self.token(scope)
+            if token is not None and token != current:
+                return
+            self._entries[(scope, year, month)] = (current[0], time.monotonic(), cells)
+            self._entries.move_to_end((scope, year, month))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_from(self, start_date, scope=None):
+        """Evict grids reaching start_date or later, for one account or (scope None) for all."""
+        with self._lock:
+            self._evictions += 1
+            stale = [k for k in self._entries
+                     if (scope is None or k[0] == scope) and _grid_range(*k[1:])[1] >= start_date]
+            for key in stale:
+                del self._entries[key]
+
+    def clear_scope(self, scope):
+        with self._lock:
+            self._evictions += 1
+            for key in [k for k in self._entries if k[0] == scope]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._evictions += 1
+            self._entries.clear()
+
+class CachedPage:
+    """
+    One rendered page at one ledger ETag, with its body already compressed in every encoding
+    on offer (brotli when installed, gzip, identity), so serving it is a dict lookup.
+    """
+
+    def __init__(self, etag, html):
+        self.etag = etag
+        self.modified = datetime.now(timezone.utc).replace(microsecond=0)
+        body = html.encode("utf-8")
+        self.bodies = {}
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(body, quality=5)
+        self.bodies["gzip"] = gzip.compress(body, 6, mtime=0)
+        self.bodies["identity"] = body
+        self.nbytes = sum(len(b) for b in self.bodies.values())
+
+    def response(self, response_class, req):
+        """
+        This page as a response_class (Flask's or Quart's Response) for req: 304 when the client's
+        copy is current, else the best encoding it accepts (br, then gzip). Each encoding has its own ETag.
+        """
+        encoding = req.accept_encodings.best_match(list(self.bodies)) or "identity"
+        etag = self.etag if encoding == "identity" else f"{self.etag}-{encoding}"
+        if req.if_none_match.contains(etag) or (
+            not req.if_none_match and req.if_modified_since and req.if_modified_since >= self.modified
+        ):
+            resp = response_class("", status=304)
+        else:
+            resp = response_class(self.bodies[encoding], mimetype="text/html")
+            if encoding != "identity":
+                resp.headers["Content-Encoding"] = encoding
+        resp.set_etag(etag)
+        resp.last_modified = self.modified
+        # the page depends on the session's account, and must be revalidated after every ledger write
+        resp.headers["Cache-Control"] = "private, no-cache"
+        resp.headers["Vary"] = "Cookie, Accept-Encoding"
+        return resp
+
+class PageCache:
+    """
+    Bounded LRU of rendered HTML pages, keyed by route, query args and account. An entry is only
+    served while its ETag matches the current one (which moves with the account's ledger version),
+    and is replaced in place when it doesn't. Bounded by entry count and by compressed+raw bytes.
+    """
+
+    def __init__(self, max_size=256, max_bytes=64 * 2**20):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> CachedPage
+        self._lock = threading.Lock()
+
+    def get(self, key, etag):
+        with self._lock:
+            page = self._entries.get(key)
+            if page is None or page.etag != etag:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return page
+
+    def put(self, key, etag, html):
+        page = CachedPage(etag, html)  # compress outside the lock
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._entries[key] = page
+            self.nbytes += page.nbytes
+            while self._entries and (len(self._entries) > self.max_size or self.nbytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return page
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+def _page_key(req, account_id, today, settling):
+    """PageCache key of a GET: route, its query args (minus ?account/?profile), account, today and the settling flag."""
+    args = tuple(sorted((k, v) for k, v in req.args.items(multi=True) if k not in ("account", "profile")))
+    return (req.endpoint, args, account_id, today, settling)
+
+def _json_value(value):
+    """Make a view value JSON-friendly (ISO dates, floats for DECIMAL)."""
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+def _columnar(rows, columns):
+    """Column-oriented form of a list of dicts: {column: [values...]}."""
+    return {c: [_json_value(r[c]) for r in rows] for c in columns}
+
+def _week_start(d):
+    """Sunday of the (Sun..Sat) week containing d, matching the weeks table."""
+    return d - timedelta(days=min((d.weekday() + 1) % 7, d.toordinal() - 1))
+
+def _to_cents(value):
+    """Round a DECIMAL/float/None to a 2-place Decimal, the way MySQL stores DECIMAL(12,2)."""
+    if value is None:
+        return Decimal("0.00")
+    return Decimal(str(value)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+def _cents(value):
+    """DECIMAL/float/None money amount -> integer cents."""
+    return int(_to_cents(value) * 100)
+
+def _bulk_update(cur, table, columns, rows, chunk_size=500):
+    """
+    Apply many single-row updates keyed by id with as few statements as possible.
+    rows are tuples of (id, *values) matching columns; each chunk becomes one
+    UPDATE ... JOIN over a derived table of literal rows.
+    """
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i:i + chunk_size]
+        first = "SELECT %s AS id, " + ", ".join(f"%s AS {c}" for c in columns)
+        rest = "SELECT %s, " + ", ".join(["%s"] * len(columns))
+        derived = " UNION ALL ".join([first] + [rest] * (len(chunk) - 1))
+        assignments = ", ".join(f"t.{c} = v.{c}" for c in columns)
+        params = [value for row in chunk for value in row]
+        cur.execute(f"UPDATE {table} t JOIN ({derived}) v ON v.id = t.id SET {assignments}", params)
+
+def _iter_csv_records(stream):
+    """Yield one dict per CSV row from a text stream (header row required)."""
+    yield from csv.DictReader(stream)
+
+def _iter_json_records(stream, chunk_size=65536):
+    """
+    Yield objects from a JSON array or from JSON Lines without loading the whole document:
+    objects are decoded one at a time as the stream is read.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    eof = False
+    while True:
+        pos = 0
+        while True:
+            # skip separators between objects: whitespace, array brackets and commas
+            while pos < len(buf) and buf[pos] in " \t\r\n,[]":
+                pos += 1
+            if pos >= len(buf):
+                break
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                break  # partial object; read more
+            yield obj
+            pos = end
+        buf = buf[pos:]
+        if eof:
+            return
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf += chunk
+
+# Compact binary columnar format ("tcol") written by the exports and accepted by import-trades:
+#   b"TCOL2\n", one JSON line {"columns": [{"name", "type", "scale"?}, ...]},
+#   then blocks of b"B" + uint32 row count + one packed array per column, and a final b"E".
+#   date -> days since 1970-01-01, decimal -> integer scaled by 10**scale, int as is; each block stores
+#   these as uint8/16/32/64 steps from a base (uint8 flags|width, int64 base, uint64 step, then the
+#   array). Flag 0x80: non-decreasing, NULL-free column stored as steps from the previous value.
+#   Otherwise NULL is the width's maximum. str -> a per-block dictionary (uint32 count, uint32 byte
+#   lengths, UTF-8 bytes) followed by the codes packed like an int column.
+_TCOL_MAGIC = b"TCOL2\n"
+_TCOL_END = b"E"
+_TCOL_DELTA = 0x80
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def _tcol_header(columns):
+    return _TCOL_MAGIC + json.dumps({"columns": columns}).encode() + b"\n"
+
+def _tcol_pack_ints(ints):
+    """One column of ints (None for NULL) in the narrowest width its range in this block allows."""
+    present = [v for v in ints if v is not None]
+    delta = len(ints) > 1 and len(present) == len(ints) and all(a <= b for a, b in zip(ints, ints[1:]))
+    if delta:
+        base = ints[0]
+        offsets = [0] + [b - a for a, b in zip(ints, ints[1:])]
+    else:
+        base = min(present, default=0)
+        offsets = [None if v is None else v - base for v in ints]
+    step = math.gcd(*(o for o in offsets if o)) or 1
+    top = max((o // step for o in offsets if o is not None), default=0)
+    width = next((w for w in (1, 2, 4, 8) if top < 2 ** (8 * w) - 1), None)  # the maximum is NULL
+    if width is None:
+        raise ValueError("tcol column spans the whole int64 range")
+    null = 2 ** (8 * width) - 1
+    packed = np.array([null if o is None else o // step for o in offsets], dtype=f"<u{width}")
+    return struct.pack("<BqQ", width | (_TCOL_DELTA if delta else 0), base, step) + packed.tobytes()
+
+def _tcol_pack_strs(values):
+    codes = {}
+    for v in values:
+        if v is not None:
+            codes.setdefault(str(v), len(codes))
+    encoded = [s.encode() for s in codes]
+    return b"".join([
+        struct.pack("<I", len(encoded)),
+        np.array([len(b) for b in encoded], dtype="<u4").tobytes(),
+        b"".join(encoded),
+        _tcol_pack_ints([None if v is None else codes[str(v)] for v in values]),
+    ])
+
+def _tcol_block(columns, rows):
+    parts = [b"B", struct.pack("<I", len(rows))]
+    for i, col in enumerate(columns):
+        values = [r[i] for r in rows]
+        if col["type"] == "date":
+            parts.append(_tcol_pack_ints([None if v is None else v.toordinal() - _EPOCH_ORDINAL for v in values]))
+        elif col["type"] == "decimal":
+            scale = col["scale"]
+            parts.append(_tcol_pack_ints([None if v is None else int(Decimal(v).scaleb(scale)) for v in values]))
+        elif col["type"] == "int":
+            parts.append(_tcol_pack_ints(values))
+        else:
+            parts.append(_tcol_pack_strs(values))
+    return b"".join(parts)
+
+def _read_exact(stream, n):
+    data = stream.read(n)
+    while len(data) < n:
+        more = stream.read(n - len(data))
+        if not more:
+            raise ValueError("truncated tcol stream")
+        data += more
+    return data
+
+def _tcol_unpack_ints(stream, n):
+    flags, base, step = struct.unpack("<BqQ", _read_exact(stream, 17))
+    width = flags & ~_TCOL_DELTA
+    if width not in (1, 2, 4, 8):
+        raise ValueError("corrupt tcol stream")
+    raw = np.frombuffer(_read_exact(stream, width * n), dtype=f"<u{width}").tolist()
+    if flags & _TCOL_DELTA:
+        return [base + total * step for total in itertools.accumulate(raw)]
+    null = 2 ** (8 * width) - 1
+    return [None if o == null else base + o * step for o in raw]
+
+def _tcol_unpack_strs(stream, n):
+    (count,) = struct.unpack("<I", _read_exact(stream, 4))
+    lengths = np.frombuffer(_read_exact(stream, 4 * count), dtype="<u4").tolist()
+    blob = _read_exact(stream, sum(lengths))
+    entries, pos = [], 0
+    for length in lengths:
+        entries.append(blob[pos:pos + length].decode())
+        pos += length
+    return [None if c is None else entries[c] for c in _tcol_unpack_ints(stream, n)]
+
+def _iter_tcol_records(stream):
+    """Yield one dict per row from a binary tcol stream, one block in memory at a time."""
+    magic = _read_exact(stream, len(_TCOL_MAGIC))
+    if magic == b"TCOL1\n":
+        raise ValueError("tcol version 1 files are no longer read; export the journal again")
+    if magic != _TCOL_MAGIC:
+        raise ValueError("not a tcol file")
+    columns = json.loads(stream.readline())["columns"]
+    names = [c["name"] for c in columns]
+    while True:
+        tag = _read_exact(stream, 1)
+        if tag == _TCOL_END:
+            return
+        if tag != b"B":
+            raise ValueError("corrupt tcol stream")
+        (n,) = struct.unpack("<I", _read_exact(stream, 4))
+        decoded = []
+        for col in columns:
+            if col["type"] == "str":
+                decoded.append(_tcol_unpack_strs(stream, n))
+                continue
+            raw = _tcol_unpack_ints(stream, n)
+            if col["type"] == "date":
+                decoded.append([None if v is None else date.fromordinal(v + _EPOCH_ORDINAL) for v in raw])
+            elif col["type"] == "decimal":
+                decoded.append([None if v is None else Decimal(v).scaleb(-col["scale"]) for v in raw])
+            else:
+                decoded.append(raw)
+        for row in zip(*decoded):
+            yield dict(zip(names, row))
+
+_EXPORT_COLUMNS = {
+    "trades": [
+        {"name": "id", "type": "int"},
+        {"name": "trade_date", "type": "date"},
+        {"name": "symbol", "type": "str"},
+        {"name": "position_size", "type": "decimal", "scale": 4},
+        {"name": "entry_price", "type": "decimal", "scale": 4},
+        {"name": "exit_price", "type": "decimal", "scale": 4},
+        {"name": "stop_loss", "type": "decimal", "scale": 4},
+        {"name": "take_profit", "type": "decimal", "scale": 4},
+        {"name": "profit", "type": "decimal", "scale": 2},
+    ],
+    "days": [
+        {"name": "date", "type": "date"},
+        {"name": "week_start", "type": "date"},
+        {"name": "entry_balance", "type": "decimal", "scale": 2},
+        {"name": "day_pl", "type": "decimal", "scale": 2},
+        {"name": "current_balance", "type": "decimal", "scale": 2},
+        {"name": "risk10", "type": "decimal", "scale": 2},
+        {"name": "week_pl", "type": "decimal", "scale": 2},
+    ],
+}
+
+def _export_query(kind, account_id, start=None, end=None, symbol=None):
+    """SQL and args for an export; rows come back in _EXPORT_COLUMNS[kind] order."""
+    if kind == "trades":
+        where, args = ["account_id = %s"], [account_id]
+        if start:
+            where.append("trade_date >= %s")
+            args.append(start)
+        if end:
+            where.append("trade_date <= %s")
+            args.append(end)
+        if symbol:
+            where.append("symbol = %s")
+            args.append(symbol)
+        columns = ", ".join(c["name"] for c in _EXPORT_COLUMNS["trades"])
+        return f"""
+            SELECT {columns} FROM trades
+            WHERE {" AND ".join(where)}
+            ORDER BY trade_date, id
+        """, args
+    where, args = ["d.account_id = %s"], [account_id]
+    if start:
+        where.append("d.`date` >= %s")
+        args.append(start)
+    if end:
+        where.append("d.`date` <= %s")
+        args.append(end)
+    return f"""
+        SELECT d.`date`, w.start_date AS week_start, d.entry_balance, d.day_pl, d.current_balance, d.risk10, w.week_pl
+        FROM days d
+        LEFT JOIN weeks w ON w.id = d.week_id
+        WHERE {" AND ".join(where)}
+        ORDER BY d.`date`
+    """, args
+
+def _csv_chunk(rows):
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue().encode()
+
+def _stream_export(kind, fmt, account_id, start=None, end=None, symbol=None, compress=False, chunk_size=2000):
+    """
+    Yield an export as bytes, chunk_size rows at a time, from an unbuffered query on a connection of
+    its own (a streaming response outlives the request's connection). Memory stays flat whatever the
+    journal size. If the consumer stops early the connection is closed instead of draining the rest.
+    """
+    columns = _EXPORT_COLUMNS[kind]
+    sql, args = _export_query(kind, account_id, start, end, symbol)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits 31 = gzip container
+
+    def out(data):
+        return compressor.compress(data) if compressor else data
+
+    pool = get_pool()
+    conn = pool.acquire()
+    finished = False
+    try:
+        db_backend.prepare_unbuffered(conn)
+        cur = conn.cursor(InstrumentedSSCursor)
+        cur.execute(sql, args)
+        names = [c["name"] for c in columns]
+        yield out(_tcol_header(columns) if fmt == "tcol" else _csv_chunk([names]))
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            data = out(_tcol_block(columns, rows) if fmt == "tcol" else _csv_chunk(rows))
+            if data:
+                yield data
+        if fmt == "tcol":
+            yield out(_TCOL_END)
+        if compressor:
+            yield compressor.flush()
+        cur.close()
+        finished = True
+    finally:
+        if not finished:
+            conn.close()
+        pool.release(conn)
+
+def _parse_trade_record(rec, n):
+    """Validate one imported record into an INSERT-ready tuple. n is the 1-based record number."""
+    rec = {k.strip().lower(): v for k, v in rec.items() if k}
+    symbol = str(rec.get("symbol") or "").strip().upper()
+    if not symbol:
+        raise ValueError(f"record {n}: symbol is required")
+    try:
+        trade_date = date.fromisoformat(str(rec.get("trade_date") or "").strip()[:10])
+    except ValueError:
+        raise ValueError(f"record {n}: trade_date must be YYYY-MM-DD")
+    values = []
+    for field in ("position_size", "entry_price", "exit_price", "stop_loss", "take_profit"):
+        raw = rec.get(field)
+        if raw is None or str(raw).strip() == "":
+            if field in ("stop_loss", "take_profit"):
+                values.append(None)
+                continue
+            raise ValueError(f"record {n}: {field} is required")
+        try:
+            values.append(float(raw))
+        except (TypeError, ValueError):
+            raise ValueError(f"record {n}: {field} must be a number")
+    return (symbol, *values, trade_date)
+
+def _optional_prices(form):
+    """(stop_loss, take_profit) from a trade form; blank fields are None. Raises ValueError."""
+    return tuple(float(form[f]) if (form.get(f) or "").strip() else None for f in ("stop_loss", "take_profit"))
+
+MIGRATIONS_DIR = db_backend.migrations_dir  # migrations/, or migrations/sqlite/ for DB_BACKEND=sqlite
+_MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+_SCHEMA_MIGRATIONS_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        name VARCHAR(128) NOT NULL,
+        checksum CHAR(40) NOT NULL,
+        applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci
+"""
+
+def _migrations():
+    """[(version, name, path, sha1)] for every migrations/NNNN_name.sql, in version order."""
+    found = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        m = _MIGRATION_FILE.match(filename)
+        if not m:
+            continue
+        path = os.path.join(MIGRATIONS_DIR, filename)
+        with open(path, "rb") as f:
+            checksum = hashlib.sha1(f.read()).hexdigest()
+        found.append((int(m.group(1)), m.group(2), path, checksum))
+    return found
+
+# what 0001_initial creates, checked before an existing database is recorded as being at 0001
+_BASELINE_SHAPE = {
+    "TraderInfo": ("id", "name", "starting_balance"),
+    "weeks": ("account_id", "start_date", "end_date", "starting_balance", "week_pl"),
+    "days": ("account_id", "date", "week_id", "entry_balance", "day_pl", "current_balance", "risk10", "trade_id"),
+    "trades": ("account_id", "day_id", "symbol", "trade_date", "profit"),
+    "months": ("account_id", "year", "month", "month_pl"),
+}
+
+def _missing_baseline_parts(cur):
+    """['table' or 'table.column', ...] of _BASELINE_SHAPE that the database lacks."""
+    missing = []
+    for table, columns in _BASELINE_SHAPE.items():
+        if not db_backend.table_exists(cur, table):
+            missing.append(table)
+            continue
+        missing += [f"{table}.{column}" for column in columns if not db_backend.column_exists(cur, table, column)]
+    return missing
+
+def _split_sql_statements(sql):
+    """
+    The statements of a .sql script. `DELIMITER $$` ... `DELIMITER ;` switch the terminator around
+    trigger bodies, as in the mysql client; whole-line `--` comments are dropped.
+    """
+    statements = []
+    delimiter = ";"
+    buffer = ""
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if stripped.upper().startswith("DELIMITER"):
+            delimiter = stripped.split()[1]
+            continue
+        if not buffer.strip() and (not stripped or stripped.startswith("--")):
+            continue
+        buffer += line + "\n"
+        if buffer.rstrip().endswith(delimiter):
+            statement = buffer.rstrip()[:-len(delimiter)].strip()
+            if statement:
+                statements.append(statement)
+            buffer = ""
+    if buffer.strip():
+        statements.append(buffer.strip())
+    return statements
+
+def _hot_queries(account_id, day):
+    """(name, sql, args) for the statements behind the hot paths, with arguments around `day`."""
+    start_grid, end_grid = _grid_range(day.year, day.month)
+    sunday = _week_start(day)
+    return [
+        ("calendar days", _CALENDAR_DAYS_SQL, (account_id, day.replace(day=1), end_grid)),
+        ("calendar weeks", _CALENDAR_WEEKS_SQL, (account_id, start_grid, end_grid)),
+        ("trades first page", *_trades_page_query(account_id, 50)),
+        ("trades deep page", *_trades_page_query(account_id, 50, after_key=(day, 2 ** 31 - 1))),
+        ("trades count", _TRADES_COUNT_SQL, (account_id, 100001)),
+        ("balance index load", _BALANCE_INDEX_SQL, (account_id,)),
+        ("journal snapshot load", _SNAPSHOT_ACCOUNT_SQL, (account_id,)),
+        ("ledger lock", _LOCK_DAYS_SQL, (account_id, sunday)),
+        ("recompute seed", _LEDGER_SEED_SQL, (account_id, sunday, account_id, sunday, account_id)),
+        ("recompute days", _LEDGER_DAYS_SQL, (account_id, sunday, account_id, sunday)),
+        ("recompute weeks", _LEDGER_WEEKS_SQL, (account_id, sunday)),
+        ("day of a trade", "SELECT id FROM days WHERE account_id = %s AND `date` = %s LIMIT 1", (account_id, day)),
+        ("week of a day", "SELECT id FROM weeks WHERE account_id = %s AND start_date = %s", (account_id, sunday)),
+        ("day P/L (trigger)", "SELECT SUM(profit) FROM trades WHERE day_id = %s", (1,)),
+        ("week P/L (trigger)", "SELECT SUM(day_pl) FROM days WHERE week_id = %s", (1,)),
+        ("months rollup", "SELECT `year`, `month`, month_pl FROM months WHERE account_id = %s ORDER BY `year`, `month`",
+         (account_id,)),
+        ("symbols rollup", _SYMBOL_STATS_SQL, (account_id,)),
+        ("symbol of a trade", _SYMBOL_ID_SQL, (account_id, "")),
+        ("symbol trades page", *_trades_page_query(account_id, 50, symbol_id=1)),
+        ("symbol last trade", "SELECT MAX(trade_date) FROM trades WHERE symbol_id = %s", (1,)),
+    ]
 
 def create_app():
     app = Flask(__name__)
     app.secret_key = os.getenv("FLASK_SECRET_KEY", "dev-secret")
     app.config["TZ"] = os.getenv("TZ", "America/Sao_Paulo")
+    # "triggers": MySQL triggers keep days/weeks in step and the app recomputes forward after each write.
+    # "app": no triggers; every write applies O(1) profit deltas itself (see _apply_pl_delta).
+    app.config["LEDGER_MODE"] = os.getenv("LEDGER_MODE", "triggers")
+    if app.config["LEDGER_MODE"] == "triggers" and not db_backend.supports_triggers:
+        print(f"ℹ️ {db_backend.describe()}: no ledger triggers on this engine, using LEDGER_MODE=app.")
+        app.config["LEDGER_MODE"] = "app"
+    # read balances from the in-memory BalanceIndex instead of the denormalized days/weeks columns; opt-in,
+    # since it only sees this process's writes (with several processes, pair it with BALANCE_CACHE_TTL)
+    app.config["BALANCE_INDEX"] = os.getenv("BALANCE_INDEX", "0") == "1"
+    # answer trade pages and trade lookups from an in-process JournalSnapshot, warm-loaded at startup
+    app.config["JOURNAL_SNAPSHOT"] = os.getenv("JOURNAL_SNAPSHOT", "0") == "1"
+    app.config["TRADES_EXACT_COUNT_LIMIT"] = int(os.getenv("TRADES_EXACT_COUNT_LIMIT", "100000"))
+    # each trade/balance write locks the account's days from its date onwards (SELECT ... FOR UPDATE)
+    app.config["LEDGER_ROW_LOCKS"] = os.getenv("LEDGER_ROW_LOCKS", "1") == "1"
+
+    # instrumentation: warn when one request/job runs the same statement shape more than this many times
+    app.config["N_PLUS_ONE_THRESHOLD"] = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+    app.config["SLOW_REQUEST_MS"] = float(os.getenv("SLOW_REQUEST_MS", "500"))
+    # PROFILE_REQUESTS=1 lets ?profile=1 run a request under cProfile and dump it to PROFILE_DIR
+    app.config["PROFILE_REQUESTS"] = os.getenv("PROFILE_REQUESTS", "0") == "1"
+    app.config["PROFILE_DIR"] = os.getenv("PROFILE_DIR", "profiles")
+
+    @app.teardown_appcontext
+    def release_db(exc):
+        conn = g.pop("db", None)
+        if conn is not None:
+            conn.release()
+
+    metrics = Metrics()
+    app.extensions["metrics"] = metrics
+
+    def _report_queries(name, stats, seconds, failed=False):
+        """Log N+1 patterns and slow runs, then add the run to /debug/metrics."""
+        repeated = stats.repeated(app.config["N_PLUS_ONE_THRESHOLD"])
+        for shape, n in repeated:
+            print(f"⚠️ N+1 in {name}: {n}× {shape[:160]}")
+        if seconds * 1000 >= app.config["SLOW_REQUEST_MS"]:
+            print(f"🐢 {name} took {seconds * 1000:.0f} ms ({stats.count} queries, {stats.seconds * 1000:.0f} ms in MySQL)")
+            for statement_seconds, sql in stats.slowest():
+                print(f"    {statement_seconds * 1000:8.1f} ms  {' '.join(sql.split())[:160]}")
+        metrics.observe(name, stats, seconds, failed=failed, n_plus_one=bool(repeated))
+
+    @contextmanager
+    def _tracked_job(name):
+        started = time.perf_counter()
+        failed = False
+        with track_queries() as stats:
+            try:
+                yield stats
+            except Exception:
+                failed = True
+                raise
+            finally:
+                _report_queries(name, stats, time.perf_counter() - started, failed)
+
+    @contextmanager
+    def _unit_of_work():
+        """
+        Run one write as a single transaction on the request's connection (one COMMIT, one fsync);
+        any exception rolls it back. The UnitOfWork's after_commit callbacks run once it committed.
+        """
+        conn = get_db()
+        try:
+            conn.begin()
+            with conn.cursor() as cur:
+                uow = UnitOfWork(cur)
+                yield uow
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        uow.committed()
+
+    def _lock_ledger(cur, account_id, since):
+        """Lock the account's days from the week of `since` onwards until the transaction ends (LEDGER_ROW_LOCKS)."""
+        if not app.config["LEDGER_ROW_LOCKS"]:
+            return
+        if isinstance(since, str):
+            since = date.fromisoformat(since[:10])
+        cur.execute(_LOCK_DAYS_SQL, (account_id, _week_start(since)))
+
+    @app.before_request
+    def start_request_stats():
+        g.request_started = time.perf_counter()
+        g.query_stats = QueryStats()
+        g.query_stats_token = _query_stats.set(g.query_stats)
+        if app.config["PROFILE_REQUESTS"] and request.args.get("profile") == "1":
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def add_server_timing(response):
+        stats = g.get("query_stats")
+        if stats is not None:
+            response.headers["Server-Timing"] = stats.server_timing(time.perf_counter() - g.request_started)
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(app.config["PROFILE_DIR"], exist_ok=True)
+            path = os.path.join(app.config["PROFILE_DIR"],
+                                f"{request.endpoint or 'request'}-{datetime.now():%Y%m%d-%H%M%S-%f}.prof")
+            profiler.dump_stats(path)
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(15)
+            print(f"🔬 Profiled {request.method} {request.full_path} -> {path}\n{out.getvalue()}")
+        return response
+
+    @app.teardown_request
+    def finish_request_stats(exc):
+        token = g.pop("query_stats_token", None)
+        if token is None:
+            return
+        _query_stats.reset(token)
+        stats = g.pop("query_stats")
+        _report_queries(request.endpoint or "unmatched", stats,
+                        time.perf_counter() - g.request_started, failed=exc is not None)
+
+    account_cache = LedgerCache(ledger_version, ttl=float(os.getenv("BALANCE_CACHE_TTL", "0")))
+
+    def _accounts(reload=False):
+        """
+        {id: name} for every account (one TraderInfo row each); refreshed by unscoped ledger bumps and
+        BALANCE_CACHE_TTL. reload=True rereads it, for an id another process may just have created.
+        """
+        if reload:
+            account_cache.clear()
+        def load():
+            conn = get_db()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT id, name FROM TraderInfo ORDER BY id")
+                    return {r["id"]: r["name"] for r in cur.fetchall()}
+            finally:
+                conn.close()
+        return account_cache.get("accounts", load)
+
+    def _current_account():
+        return g.get("account_id", DEFAULT_ACCOUNT)
+
+    @app.before_request
+    def select_account():
+        """
+        The account for this request: ?account=<id> (remembered in the session), else the session's,
+        else DEFAULT_ACCOUNT. Every route reads and writes only this account's rows.
+        """
+        requested = request.args.get("account")
+        account_id = session.get("account_id", DEFAULT_ACCOUNT)
+        if requested:
+            try:
+                account_id = int(requested)
+            except ValueError:
+                account_id = None
+        if account_id not in _accounts() and (account_id is None or account_id not in _accounts(reload=True)):
+            if requested:
+                if request.path.startswith(("/api/", "/export/")):
+                    return jsonify({"error": f"unknown account {requested}"}), 404
+                flash(f"Unknown account {requested}.", "error")
+            account_id = DEFAULT_ACCOUNT
+            session.pop("account_id", None)
+        elif requested:
+            session["account_id"] = account_id
+        g.account_id = account_id
 
-    def _get_current_balance(starting_balance: bool = False):
+    @app.context_processor
+    def inject_accounts():
+        return {"accounts": _accounts(), "account_id": _current_account()}
+
+    def _load_current_balance(account_id, starting_balance: bool = False):
         current_balance = None
         conn = get_db()
         try:
             with conn.cursor() as cur:
                 if not starting_balance:
-                    cur.execute("SELECT current_balance FROM days ORDER BY date DESC LIMIT 1")
+                    cur.execute("""
+                        SELECT current_balance FROM days WHERE account_id = %s ORDER BY date DESC LIMIT 1
+                    """, (account_id,))
                     row = cur.fetchone()
                     if row and row.get("current_balance") is not None:
                         return float(row["current_balance"])
 
                 # fallback to TraderInfo.starting_balance
-                cur.execute("SELECT starting_balance FROM TraderInfo LIMIT 1")
+                cur.execute("SELECT starting_balance FROM TraderInfo WHERE id = %s", (account_id,))
                 trow = cur.fetchone()
                 if trow and trow.get("starting_balance") is not None:
                     return float(trow["starting_balance"])
@@ -47,256 +1960,922 @@ def create_app():
             conn.close()
         return current_balance
 
-    @app.context_processor
-    def inject_current_balance():
-        return {"current_balance": _get_current_balance()}
-
-    def _recompute_week_starting_balances_from(start_week_start_date):
+    balance_cache = LedgerCache(ledger_version, ttl=float(os.getenv("BALANCE_CACHE_TTL", "0")))
+    count_cache = LedgerCache(ledger_version, ttl=float(os.getenv("BALANCE_CACHE_TTL", "0")))
+    calendar_cache = MonthGridCache(ledger_version, int(os.getenv("CALENDAR_CACHE_SIZE", "120")),
+                                    ttl=float(os.getenv("BALANCE_CACHE_TTL", "0")))
+    # rendered calendar/trades HTML, precompressed (PAGE_CACHE_SIZE=0 renders every request)
+    page_cache = PageCache(int(os.getenv("PAGE_CACHE_SIZE", "256")), int(os.getenv("PAGE_CACHE_MB", "64")) * 2**20)
+
+    analytics_cache = LedgerCache(ledger_version, ttl=float(os.getenv("BALANCE_CACHE_TTL", "0")))
+    heatmap_cache = LedgerCache(ledger_version, ttl=float(os.getenv("BALANCE_CACHE_TTL", "0")))
+
+    # one BalanceIndex per account, each loaded on the account's first read
+    balance_indexes = {}
+    balance_indexes_lock = threading.Lock()
+
+    def _account_index(account_id):
+        """The account's BalanceIndex object, loaded or not; None if disabled."""
+        if not app.config["BALANCE_INDEX"]:
+            return None
+        with balance_indexes_lock:
+            return balance_indexes.setdefault(account_id, BalanceIndex())
+
+    @contextmanager
+    def _index_writes(account_id):
         """
-        Recompute weeks.starting_balance forward from the week that starts at
-        'start_week_start_date'. Assumes weeks.week_pl is already up to date.
+        Wrap a trade write's transaction and its after-commit index_trade_change: a load of the account's
+        BalanceIndex overlapping any of it is retried, see BalanceIndex.
         """
-        conn = get_db()
+        index = _account_index(account_id)
+        if index is None:
+            yield
+            return
+        index.begin_write()
         try:
-            with conn.cursor() as cur:
-                # Find the earliest week >= start_week_start_date
-                cur.execute("""
-                    SELECT id, start_date, end_date, starting_balance, week_pl
-                    FROM weeks
-                    WHERE start_date >= %s
-                    ORDER BY start_date ASC
-                """, (start_week_start_date,))
-                weeks = cur.fetchall()
-
-                if not weeks:
-                    return  # nothing to do
-
-                # Determine the running starting balance before the first affected week
-                first_week = weeks[0]
+            yield
+        finally:
+            index.end_write()
 
-                # Look up the previous week (if any) to seed the running balance
-                cur.execute("""
-                    SELECT id, start_date, end_date, starting_balance, week_pl
-                    FROM weeks
-                    WHERE end_date < %s
-                    ORDER BY start_date DESC
-                    LIMIT 1
-                """, (first_week["start_date"],))
-                prev = cur.fetchone()
-
-                if prev:
-                    running_sb = float(prev["starting_balance"]) + float(prev["week_pl"])
-                else:
-                    # No previous week: use TraderInfo.starting_balance (canonical baseline)
-                    cur.execute("SELECT starting_balance FROM TraderInfo LIMIT 1")
+    def _balance_index(account_id, attempts=3):
+        """
+        The account's loaded BalanceIndex, (re)built on first use and after BALANCE_CACHE_TTL; None if
+        disabled, or if writes kept landing during the load (the caller then reads the tables instead).
+        """
+        index = _account_index(account_id)
+        if index is None:
+            return None
+        for _ in range(attempts):
+            if index.fresh(balance_cache.ttl):
+                return index
+            token = index.token()
+            conn = get_db()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT starting_balance FROM TraderInfo WHERE id = %s", (account_id,))
                     trow = cur.fetchone()
-                    running_sb = float(trow["starting_balance"]) if (trow and trow.get("starting_balance") is not None) else 0.0
-
-                # Now propagate forward
-                for i, w in enumerate(weeks):
-                    if i == 0:
-                        # First affected week starts from the running baseline we just computed
-                        new_sb = running_sb
-                    else:
-                        # For subsequent weeks, baseline is previous baseline + previous week_pl
-                        prev_w = weeks[i-1]
-                        new_sb = running_sb + float(prev_w["week_pl"])
-
-                    # Update DB if changed
-                    if abs(new_sb - float(w["starting_balance"])) > 1e-9:
-                        cur.execute("UPDATE weeks SET starting_balance = %s WHERE id = %s", (new_sb, w["id"]))
-
-                    running_sb = new_sb
+                    cur.execute(_BALANCE_INDEX_SQL, (account_id,))
+                    rows = [(r["date"], r["day_pl"], r["trades"]) for r in cur.fetchall()]
+            finally:
+                conn.close()
+            if index.load(trow["starting_balance"] if trow else 0, rows, token):
+                return index
+        print(f"⚠️ Balance index for account {account_id} kept changing while loading; reading the tables.")
+        return None
+
+    # one JournalSnapshot per account, all warm-loaded at startup (JOURNAL_SNAPSHOT=1)
+    journal_snapshots = {}
+    journal_snapshots_lock = threading.Lock()
+
+    def _journal_snapshot(account_id):
+        """The account's loaded JournalSnapshot, reloaded when missing or older than BALANCE_CACHE_TTL; None if disabled."""
+        if not app.config["JOURNAL_SNAPSHOT"]:
+            return None
+        with journal_snapshots_lock:
+            snapshot = journal_snapshots.setdefault(account_id, JournalSnapshot())
+        if not snapshot.fresh(balance_cache.ttl):
+            conn = get_db()
+            try:
+                with conn.cursor(InstrumentedTupleCursor) as cur:
+                    cur.execute(_SNAPSHOT_ACCOUNT_SQL, (account_id,))
+                    snapshot.load(cur.fetchall())
+            finally:
+                conn.close()
+        return snapshot
+
+    def _warm_journal_snapshots():
+        """Load every account's JournalSnapshot from one streamed query, ordered by account."""
+        started = time.perf_counter()
+        loaded = {}
+        conn = get_db()
+        try:
+            with conn.cursor(InstrumentedSSCursor) as cur:
+                cur.execute(_SNAPSHOT_ALL_SQL)
+                for account_id, rows in itertools.groupby(cur, key=lambda row: row[0]):
+                    loaded[account_id] = JournalSnapshot()
+                    loaded[account_id].load(row[1:] for row in rows)
         finally:
             conn.close()
+        for account_id in _accounts():
+            if account_id not in loaded:
+                loaded[account_id] = JournalSnapshot()
+                loaded[account_id].load(())
+        with journal_snapshots_lock:
+            journal_snapshots.update(loaded)
+        trades = sum(len(snapshot) for snapshot in loaded.values())
+        megabytes = sum(snapshot.nbytes for snapshot in loaded.values()) / 2**20
+        print(f"✅ Journal snapshot: {trades:,} trades in {len(loaded)} accounts, {megabytes:.1f} MB, "
+              f"loaded in {time.perf_counter() - started:.2f}s.")
+
+    def _snapshot_apply(account_id, trade_id, row):
+        """Put a trade's committed _SNAPSHOT_COLUMNS row (None: it is gone) into the account's loaded snapshot."""
+        snapshot = journal_snapshots.get(account_id)
+        if snapshot is None or not snapshot.loaded:
+            return
+        if row is None:
+            snapshot.remove(trade_id)
+        else:
+            snapshot.put(row)
+
+    def _snapshot_trade_write(uow, account_id, trade_id, deleted=False):
+        """Queue a written trade for the account's loaded snapshot, read back inside the transaction."""
+        snapshot = journal_snapshots.get(account_id)
+        if snapshot is None or not snapshot.loaded:
+            return
+        row = None
+        if not deleted:
+            uow.cur.execute(_SNAPSHOT_TRADE_SQL, (trade_id,))
+            found = uow.cur.fetchone()
+            row = tuple(found.values()) if found else None
+        uow.after_commit(_snapshot_apply, account_id, trade_id, row)
+
+    def _invalidate_index(account_id):
+        index = balance_indexes.get(account_id)
+        if index is not None:
+            index.invalidate()
+
+    def _index_trade_change(account_id, trade_date, profit, trades_delta):
+        """Keep the account's BalanceIndex in step with a trade write (O(log n)) and evict the affected grids."""
+        if isinstance(trade_date, str):
+            trade_date = date.fromisoformat(trade_date[:10])
+        index = balance_indexes.get(account_id)
+        if index is not None:
+            index.add(trade_date, profit, trades_delta)
+        calendar_cache.invalidate_from(_week_start(trade_date), account_id)
+
+    def _get_current_balance(account_id, starting_balance: bool = False):
+        """Latest days.current_balance (or TraderInfo.starting_balance), cached per ledger version."""
+        index = _balance_index(account_id)
+        if index is not None:
+            if starting_balance:
+                return index.base
+            latest = index.latest_balance()
+            return index.base if latest is None else latest
+        return balance_cache.get(starting_balance, lambda: _load_current_balance(account_id, starting_balance),
+                                 scope=account_id)
 
-    def recompute_from_date(start_date):
+    @app.context_processor
+    def inject_current_balance():
+        return {"current_balance": _get_current_balance(_current_account())}
+
+    def _compute_ledger(cur, account_id, start_date):
+        """
+        Work out what every day/week of one account from start_date onwards should hold, from a
+        handful of bulk reads that only touch that account's rows (via the account_id-leading keys).
+        start_date must be a Sunday, or None for the whole history.
+        Returns (day_updates, week_updates): only the rows whose stored values differ, as
+        (id, entry_balance, day_pl, current_balance, risk10) and (id, starting_balance, week_pl).
+        """
+        since = start_date or date.min
+
+        # 1) Seed: the last balance before the affected range, and the canonical baseline
+        cur.execute(_LEDGER_SEED_SQL, (account_id, since, account_id, since, account_id))
+        seed = cur.fetchone() or {}
+
+        # 2) All affected days with their trade sums in one pass
+        cur.execute(_LEDGER_DAYS_SQL, (account_id, since, account_id, since))
+        days = cur.fetchall()
+
+        # 3) All affected weeks (the first one is the earliest week any affected day belongs to)
+        cur.execute(_LEDGER_WEEKS_SQL, (account_id, since))
+        weeks = cur.fetchall()
+
+        trader_balance = _to_cents(seed.get("trader_balance"))
+        if seed.get("prev_week_balance") is not None:
+            week_running = _to_cents(seed["prev_week_balance"])
+        else:
+            week_running = trader_balance
+
+        # Day P/L from trades, rolled up per week
+        day_pls = [_to_cents(d["trades_pl"]) for d in days]
+        week_pl = {}
+        for d, day_pl in zip(days, day_pls):
+            if d["week_id"] is not None:
+                week_pl[d["week_id"]] = week_pl.get(d["week_id"], Decimal("0.00")) + day_pl
+
+        # Week chain: week[i].starting_balance = week[i-1].starting_balance + week[i-1].week_pl
+        week_updates = []
+        week_sb = {}
+        for w in weeks:
+            new_pl = week_pl.get(w["id"], Decimal("0.00"))
+            new_sb = week_running
+            week_sb[w["id"]] = new_sb
+            if (new_sb, new_pl) != (w["starting_balance"], w["week_pl"]):
+                week_updates.append((w["id"], new_sb, new_pl))
+            week_running = new_sb + new_pl
+
+        # Day chain: entry = previous day's current_balance, falling back to the week's baseline
+        day_updates = []
+        running = _to_cents(seed["prev_balance"]) if seed.get("prev_balance") is not None else None
+        for d, day_pl in zip(days, day_pls):
+            if running is None:
+                running = week_sb.get(d["week_id"], Decimal("0.00"))
+            entry_balance = running
+            current_balance = entry_balance + day_pl
+            risk10 = _to_cents(entry_balance * Decimal("0.10"))
+            running = current_balance
+
+            if (entry_balance, day_pl, current_balance, risk10) != (
+                d["entry_balance"], d["day_pl"], d["current_balance"], d["risk10"]
+            ):
+                day_updates.append((d["id"], entry_balance, day_pl, current_balance, risk10))
+
+        return day_updates, week_updates
+
+    def _refresh_months(cur, account_id, since):
+        """
+        Rebuild the account's months rollup from the month containing `since` (None = all history)
+        with one grouped read of days. Trade writes keep it current by delta; this resyncs it
+        after a recompute has rewritten day_pl.
+        """
+        if since is None:
+            cur.execute("DELETE FROM months WHERE account_id = %s", (account_id,))
+            since = date.min
+        else:
+            cur.execute("""
+                DELETE FROM months
+                WHERE account_id = %s AND (`year` > %s OR (`year` = %s AND `month` >= %s))
+            """, (account_id, since.year, since.year, since.month))
+        cur.execute("""
+            INSERT INTO months (account_id, `year`, `month`, month_pl)
+            SELECT account_id, YEAR(`date`), MONTH(`date`), SUM(day_pl)
+            FROM days
+            WHERE account_id = %s AND `date` >= %s
+            GROUP BY account_id, YEAR(`date`), MONTH(`date`)
+        """, (account_id, since.replace(day=1)))
+
+    def _refresh_symbols(cur, account_id, symbol_ids=None):
+        """
+        Resync the account's symbols rollup (or just symbol_ids) from trades with one grouped read. Trade
+        writes keep it current by delta; imports and rebuild_ledger resync it in bulk instead.
         """
-        Recompute entry_balance, day_pl, current_balance and risk10 for all days from start_date onwards,
-        update affected weeks' week_pl, and then propagate weeks.starting_balance forward so that:
+        only = ""
+        args = [account_id]
+        if symbol_ids is not None:
+            if not symbol_ids:
+                return
+            only = f" AND s2.id IN ({','.join(['%s'] * len(symbol_ids))})"
+            args += sorted(symbol_ids)
+        cur.execute(f"""
+            UPDATE symbols s
+            JOIN (
+                SELECT s2.id, COUNT(t.id) AS trades, ROUND(COALESCE(SUM(t.profit), 0), 2) AS total_pl,
+                       COUNT(CASE WHEN t.profit > 0 THEN 1 END) AS wins,
+                       COUNT(CASE WHEN t.profit < 0 THEN 1 END) AS losses,
+                       MAX(t.trade_date) AS last_trade_date
+                FROM symbols s2
+                LEFT JOIN trades t ON t.symbol_id = s2.id
+                WHERE s2.account_id = %s{only}
+                GROUP BY s2.id
+            ) v ON v.id = s.id
+            SET s.trades = v.trades, s.total_pl = v.total_pl, s.wins = v.wins, s.losses = v.losses,
+                s.last_trade_date = v.last_trade_date
+        """, args)
+
+    def recompute_from_date(start_date, account_id=DEFAULT_ACCOUNT):
+        """
+        Recompute entry_balance, day_pl, current_balance and risk10 for all of the account's days from start_date onwards,
+        update affected weeks' week_pl and the months rollup, and then propagate weeks.starting_balance forward so that:
             week[i].starting_balance = week[i-1].starting_balance + week[i-1].week_pl
         The first affected week is seeded by the previous week's (sb + week_pl), or TraderInfo.starting_balance
         if no previous week exists.
         start_date may be a date or a 'YYYY-MM-DD' string.
+
+        The whole chain is computed in memory from a handful of bulk reads and written back with
+        chunked UPDATE ... JOIN statements, so the number of round trips does not grow with the
+        number of days/weeks after start_date.
+        """
+        if isinstance(start_date, str):
+            start_date = date.fromisoformat(start_date[:10])
+        # Start from the Sunday of the affected week so week_pl sums see every day of that week.
+        start_date = _week_start(start_date)
+
+        try:
+            with _unit_of_work() as uow:
+                # read the chain under the same locks as the writes, so a concurrent edit can't interleave
+                _lock_ledger(uow.cur, account_id, start_date)
+                day_updates, week_updates = _compute_ledger(uow.cur, account_id, start_date)
+
+                # Write back only what changed, all in one commit
+                _bulk_update(uow.cur, "days", ("entry_balance", "day_pl", "current_balance", "risk10"), day_updates)
+                _bulk_update(uow.cur, "weeks", ("starting_balance", "week_pl"), week_updates)
+                if day_updates:
+                    _refresh_months(uow.cur, account_id, start_date)
+                if day_updates or week_updates:
+                    uow.after_commit(ledger_version.bump, account_id)
+        finally:
+            # the triggers may already have written some of these rows, so evict even if nothing changed here
+            calendar_cache.invalidate_from(start_date, account_id)
+
+    def rebuild_ledger(account_id=DEFAULT_ACCOUNT, chunk_weeks=0):
+        """
+        Rebuild every days/weeks balance of the account, and its months and symbols rollups, from its trades: the
+        database recomputes the chains with window functions (_REBUILD_DAYS_SQL / _REBUILD_WEEKS_SQL),
+        so no rows travel to Python and the work does not depend on how far the chain has drifted.
+        With chunk_weeks the history is rebuilt chunk_weeks weeks per transaction, oldest first, each
+        chunk seeded from the one before it, so writers are only held up for one chunk at a time.
+        Returns (days_changed, weeks_changed, seconds).
+        """
+        started = time.perf_counter()
+        days_changed = weeks_changed = 0
+        lo = date.min
+        while True:
+            # one tracked job per chunk: the chunks repeat the same statements by design, not as an N+1
+            with _tracked_job("ledger_rebuild"), _unit_of_work() as uow:
+                cur = uow.cur
+                hi = None
+                if chunk_weeks:
+                    cur.execute(_REBUILD_CHUNK_END_SQL, (account_id, lo, chunk_weeks))
+                    row = cur.fetchone()
+                    hi = row["start_date"] if row else None
+                _lock_ledger(cur, account_id, lo)
+
+                # the balances carried into the chunk, as _compute_ledger seeds them
+                cur.execute(_LEDGER_SEED_SQL, (account_id, lo, account_id, lo, account_id))
+                seed = cur.fetchone() or {}
+                if seed.get("prev_week_balance") is not None:
+                    week_seed = _to_cents(seed["prev_week_balance"])
+                else:
+                    week_seed = _to_cents(seed.get("trader_balance"))
+                day_seed = _to_cents(seed["prev_balance"]) if seed.get("prev_balance") is not None else week_seed
+
+                end = hi or date.max
+                cur.execute(_REBUILD_DAYS_SQL, (day_seed, day_seed, account_id, lo, end, account_id, lo, end))
+                chunk_days = cur.rowcount
+                cur.execute(_REBUILD_WEEKS_SQL, (week_seed, account_id, lo, end, account_id, lo, end))
+                chunk_weeks_changed = cur.rowcount
+                if hi is None:
+                    # cheap (one grouped read each) and also repairs rollups that drifted on their own
+                    _refresh_months(cur, account_id, None)
+                    _refresh_symbols(cur, account_id)
+                if chunk_days:
+                    uow.after_commit(_invalidate_index, account_id)
+                uow.after_commit(calendar_cache.invalidate_from, lo, account_id)
+                uow.after_commit(ledger_version.bump, account_id)
+            days_changed += chunk_days
+            weeks_changed += chunk_weeks_changed
+            if hi is None:
+                return days_changed, weeks_changed, time.perf_counter() - started
+            lo = hi
+
+    def _ensure_day(cur, account_id, trade_date):
         """
+        App-maintained ledger: find or create the account's days row (and its Sun..Sat week) for
+        trade_date, seeding balances the way trg_bi_days_fill_week_and_balances does. Returns days.id.
+        """
+        if isinstance(trade_date, str):
+            trade_date = date.fromisoformat(trade_date[:10])
+        cur.execute("SELECT id FROM days WHERE account_id = %s AND `date` = %s LIMIT 1", (account_id, trade_date))
+        row = cur.fetchone()
+        if row:
+            return row["id"]
+
+        sunday = _week_start(trade_date)
+        cur.execute("""
+            SELECT
+                (SELECT id FROM weeks WHERE account_id = %s AND start_date = %s LIMIT 1) AS week_id,
+                (SELECT starting_balance + week_pl FROM weeks
+                 WHERE account_id = %s AND start_date < %s ORDER BY start_date DESC LIMIT 1) AS prev_week_balance,
+                (SELECT current_balance FROM days
+                 WHERE account_id = %s AND `date` < %s ORDER BY `date` DESC LIMIT 1) AS prev_balance,
+                (SELECT starting_balance FROM TraderInfo WHERE id = %s) AS trader_balance
+        """, (account_id, sunday, account_id, sunday, account_id, trade_date, account_id))
+        seed = cur.fetchone() or {}
+
+        week_id = seed.get("week_id")
+        if week_id is None:
+            week_sb = seed.get("prev_week_balance")
+            if week_sb is None:
+                week_sb = seed.get("trader_balance")
+            cur.execute("""
+                INSERT INTO weeks (account_id, start_date, end_date, starting_balance, week_pl)
+                VALUES (%s, %s, %s, %s, 0.00)
+            """, (account_id, sunday, sunday + timedelta(days=6), _to_cents(week_sb)))
+            week_id = cur.lastrowid
+
+        entry_balance = seed.get("prev_balance")
+        if entry_balance is None:
+            cur.execute("SELECT starting_balance FROM weeks WHERE id = %s", (week_id,))
+            entry_balance = cur.fetchone()["starting_balance"]
+        entry_balance = _to_cents(entry_balance)
+        cur.execute("""
+            INSERT INTO days (account_id, `date`, week_id, entry_balance, day_pl, current_balance, risk10)
+            VALUES (%s, %s, %s, %s, 0.00, %s, %s)
+        """, (account_id, trade_date, week_id, entry_balance, entry_balance,
+              _to_cents(entry_balance * Decimal("0.10"))))
+        return cur.lastrowid
+
+    def _shift_balances(cur, account_id, delta, after=None):
+        """Add delta to every balance of the account strictly after the date `after` (or to all of them)."""
+        where_days = "WHERE account_id = %s" + (" AND `date` > %s" if after else "")
+        where_weeks = "WHERE account_id = %s" + (" AND start_date > %s" if after else "")
+        scope = (account_id, after) if after else (account_id,)
+        params = (delta, delta, delta, *scope)
+        # risk10 is assigned first so it reads the pre-update entry_balance on every engine
+        cur.execute(f"""
+            UPDATE days
+            SET risk10 = ROUND((entry_balance + %s) * 0.10, 2),
+                entry_balance = entry_balance + %s,
+                current_balance = current_balance + %s
+            {where_days}
+        """, params)
+        cur.execute(f"UPDATE weeks SET starting_balance = starting_balance + %s {where_weeks}", (delta, *scope))
+
+    def _apply_pl_delta(uow, account_id, day_id, delta, trade_id=None):
+        """
+        App-maintained ledger: fold a trade's profit change into its day and week, then shift
+        every later balance with one range UPDATE per table. O(1) statements however old the day is.
+        """
+        cur = uow.cur
+        delta = _to_cents(delta)
+        cur.execute("""
+            UPDATE days
+            SET day_pl = day_pl + %s,
+                current_balance = current_balance + %s,
+                trade_id = COALESCE(%s, trade_id)
+            WHERE id = %s
+        """, (delta, delta, trade_id, day_id))
+        if not delta:
+            return
+        cur.execute("SELECT `date`, week_id FROM days WHERE id = %s", (day_id,))
+        day = cur.fetchone()
+        if day["week_id"] is not None:
+            cur.execute("UPDATE weeks SET week_pl = week_pl + %s WHERE id = %s", (delta, day["week_id"]))
+        cur.execute("""
+            INSERT INTO months (account_id, `year`, `month`, month_pl) VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE month_pl = month_pl + %s
+        """, (account_id, day["date"].year, day["date"].month, delta, delta))
+        # one statement per table, so it stays in the transaction even when the BalanceIndex serves the reads
+        _shift_balances(cur, account_id, delta, after=day["date"])
+        uow.after_commit(calendar_cache.invalidate_from, _week_start(day["date"]), account_id)
+
+    def _ledger_mismatches(account_id):
+        """Compare the account's stored ledger against a full in-memory recompute; returns (day_updates, week_updates)."""
         conn = get_db()
         try:
             with conn.cursor() as cur:
-                # 1) Get all days to recompute
-                cur.execute("""
-                    SELECT id, `date`, week_id
-                    FROM days
-                    WHERE `date` >= %s
-                    ORDER BY `date` ASC
-                """, (start_date,))
-                days = cur.fetchall()
-
-                if not days:
-                    return  # nothing to do
-
-                affected_weeks = set()
-
-                # 2) Recompute each day's balances from trades + previous day/week
-                for d in days:
-                    d_id = d["id"]
-                    d_date = d["date"]
-                    w_id = d.get("week_id")
-                    affected_weeks.add(w_id)
-
-                    # previous balance: most recent current_balance for date < d_date
-                    cur.execute("""
-                        SELECT current_balance
-                        FROM days
-                        WHERE `date` < %s
-                        ORDER BY `date` DESC
-                        LIMIT 1
-                    """, (d_date,))
-                    prev = cur.fetchone()
-
-                    if prev and prev.get("current_balance") is not None:
-                        prev_balance = float(prev["current_balance"])
-                    else:
-                        # fallback to week's starting_balance, or 0 if none
-                        prev_balance = 0.0
-                        if w_id is not None:
-                            cur.execute("SELECT starting_balance FROM weeks WHERE id = %s", (w_id,))
-                            wrow = cur.fetchone()
-                            if wrow and wrow.get("starting_balance") is not None:
-                                prev_balance = float(wrow["starting_balance"])
-
-                    # sum day P/L from trades
-                    cur.execute("SELECT COALESCE(SUM(profit), 0) AS s FROM trades WHERE day_id = %s", (d_id,))
-                    srow = cur.fetchone()
-                    day_pl = float(srow["s"]) if srow and srow.get("s") is not None else 0.0
-
-                    entry_balance = prev_balance
-                    current_balance = entry_balance + day_pl
-                    risk10 = round(entry_balance * 0.10, 2)
+                return _compute_ledger(cur, account_id, None)
+        finally:
+            conn.close()
 
-                    cur.execute("""
-                        UPDATE days
-                        SET entry_balance = %s,
-                            day_pl = %s,
-                            current_balance = %s,
-                            risk10 = %s
-                        WHERE id = %s
-                    """, (entry_balance, day_pl, current_balance, risk10, d_id))
-
-                # 3) Recompute week_pl for affected weeks
-                for w in affected_weeks:
-                    if w is None:
-                        continue
-                    cur.execute("""
-                        UPDATE weeks
-                        SET week_pl = COALESCE((
-                            SELECT SUM(d2.day_pl) FROM days d2 WHERE d2.week_id = weeks.id
-                        ), 0)
-                        WHERE id = %s
-                    """, (w,))
-
-                # 4) Propagate weeks.starting_balance forward from the earliest affected week
-                #    Find earliest affected week's start_date
-                ids = tuple(w for w in affected_weeks if w is not None)
-                min_start = None
-                if ids:
-                    # MySQL needs a tuple for IN; handle single-element case too
-                    in_clause = ids if len(ids) > 1 else (ids[0], ids[0])  # harmless duplicate to keep IN valid
-                    cur.execute(f"""
-                        SELECT MIN(start_date) AS min_start
-                        FROM weeks
-                        WHERE id IN ({",".join(["%s"] * len(in_clause))})
-                    """, in_clause)
-                    row = cur.fetchone()
-                    if row and row.get("min_start"):
-                        min_start = row["min_start"]
+    def _tracked_recompute(start_date, account_id):
+        with _tracked_job("ledger_recompute"):
+            recompute_from_date(start_date, DEFAULT_ACCOUNT if account_id is None else account_id)
 
-                if min_start:
-                    # Seed running baseline using the week immediately before min_start, if any.
-                    cur.execute("""
-                        SELECT id, start_date, end_date, starting_balance, week_pl
-                        FROM weeks
-                        WHERE end_date < %s
-                        ORDER BY start_date DESC
-                        LIMIT 1
-                    """, (min_start,))
-                    prev_week = cur.fetchone()
+    recompute_scheduler = RecomputeScheduler(
+        _tracked_recompute,
+        deferred=os.getenv("LEDGER_RECOMPUTE", "deferred") != "sync",
+        delay=float(os.getenv("LEDGER_RECOMPUTE_DELAY", "0.25")),
+    )
+    app.extensions["recompute_scheduler"] = recompute_scheduler
+    atexit.register(recompute_scheduler.flush)
 
-                    if prev_week:
-                        running_sb = float(prev_week["starting_balance"]) + float(prev_week["week_pl"])
-                    else:
-                        # No previous week => use TraderInfo as canonical baseline
-                        cur.execute("SELECT starting_balance FROM TraderInfo LIMIT 1")
-                        trow = cur.fetchone()
-                        running_sb = float(trow["starting_balance"]) if (trow and trow.get("starting_balance") is not None) else 0.0
+    @app.context_processor
+    def inject_ledger_settling():
+        return {"ledger_settling": recompute_scheduler.settling(_current_account())}
 
-                    # Fetch all weeks from min_start onward and update their starting_balance
-                    cur.execute("""
-                        SELECT id, start_date, end_date, starting_balance, week_pl
-                        FROM weeks
-                        WHERE start_date >= %s
-                        ORDER BY start_date ASC
-                    """, (min_start,))
-                    forward_weeks = cur.fetchall()
+    def import_trades(records, account_id=DEFAULT_ACCOUNT, batch_size=1000):
+        """
+        Insert trades for one account from an iterable of dicts in a single transaction.
+        Each batch pre-creates its missing weeks/days with multi-row INSERTs and then inserts its
+        trades (already attached to their day and symbol) with one multi-row INSERT. The ledger is
+        recomputed once, from the earliest imported date, after the commit; the imported symbols'
+        aggregates are resynced once, before it.
+        Returns (rows_imported, seconds).
+        """
+        started = time.perf_counter()
+        day_ids = {}  # date -> days.id, filled as batches go
+        symbol_ids = {}  # symbol -> symbols.id, likewise
+        earliest = None
+        total = 0
 
-                    prev_week_pl = None
-                    for i, w in enumerate(forward_weeks):
-                        if i == 0:
-                            new_sb = running_sb
+        with _unit_of_work() as uow:
+            batch = []
+            for n, rec in enumerate(records, start=1):
+                batch.append(_parse_trade_record(rec, n))
+                if len(batch) >= batch_size:
+                    first = _import_batch(uow.cur, account_id, batch, day_ids, symbol_ids)
+                    earliest = first if earliest is None else min(earliest, first)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                first = _import_batch(uow.cur, account_id, batch, day_ids, symbol_ids)
+                earliest = first if earliest is None else min(earliest, first)
+                total += len(batch)
+            _refresh_symbols(uow.cur, account_id, set(symbol_ids.values()))
+
+        if total:
+            _invalidate_index(account_id)  # rebuilt from days on next read
+            journal_snapshots.pop(account_id, None)  # and reloaded from trades
+            ledger_version.bump(account_id)
+            recompute_scheduler.schedule(earliest, key=account_id)
+        return total, time.perf_counter() - started
+
+    def _import_batch(cur, account_id, batch, day_ids, symbol_ids):
+        """Insert one batch of parsed trades; returns the batch's earliest trade_date."""
+        symbols = {r[0] for r in batch} - symbol_ids.keys()
+        if symbols:
+            placeholders = ",".join(["%s"] * len(symbols))
+            select_symbols = f"SELECT id, symbol FROM symbols WHERE account_id = %s AND symbol IN ({placeholders})"
+            cur.execute(select_symbols, (account_id, *symbols))
+            symbol_ids.update((row["symbol"], row["id"]) for row in cur.fetchall())
+            missing = sorted(symbols - symbol_ids.keys())
+            if missing:
+                # aggregates start at zero; import_trades resyncs them once all batches are in
+                cur.execute(
+                    "INSERT INTO symbols (account_id, symbol) VALUES " + ",".join(["(%s, %s)"] * len(missing))
+                    + " ON DUPLICATE KEY UPDATE symbol = symbol",
+                    [v for sym in missing for v in (account_id, sym)],
+                )
+                cur.execute(select_symbols, (account_id, *symbols))
+                symbol_ids.update((row["symbol"], row["id"]) for row in cur.fetchall())
+
+        dates = {r[-1] for r in batch} - day_ids.keys()
+        if dates:
+            placeholders = ",".join(["%s"] * len(dates))
+            cur.execute(f"SELECT id, `date` FROM days WHERE account_id = %s AND `date` IN ({placeholders})",
+                        (account_id, *dates))
+            for row in cur.fetchall():
+                day_ids[row["date"]] = row["id"]
+            missing = sorted(dates - day_ids.keys())
+
+            if missing:
+                # weeks first, so the days trigger only has to look them up
+                sundays = sorted({_week_start(d) for d in missing})
+                placeholders = ",".join(["%s"] * len(sundays))
+                select_weeks = f"SELECT id, start_date FROM weeks WHERE account_id = %s AND start_date IN ({placeholders})"
+                cur.execute(select_weeks, (account_id, *sundays))
+                week_ids = {row["start_date"]: row["id"] for row in cur.fetchall()}
+                new_weeks = [s for s in sundays if s not in week_ids]
+                if new_weeks:
+                    # balances are placeholders; the recompute after the import sets them
+                    cur.execute(
+                        "INSERT INTO weeks (account_id, start_date, end_date, starting_balance, week_pl) VALUES "
+                        + ",".join(["(%s, %s, %s, 0.00, 0.00)"] * len(new_weeks)),
+                        [v for s in new_weeks for v in (account_id, s, s + timedelta(days=6))],
+                    )
+                    cur.execute(select_weeks, (account_id, *sundays))
+                    week_ids = {row["start_date"]: row["id"] for row in cur.fetchall()}
+
+                # week_id is set explicitly so this also works without the days trigger (LEDGER_MODE=app)
+                cur.execute(
+                    "INSERT INTO days (account_id, `date`, week_id) VALUES " + ",".join(["(%s, %s, %s)"] * len(missing)),
+                    [v for d in missing for v in (account_id, d, week_ids[_week_start(d)])],
+                )
+                placeholders = ",".join(["%s"] * len(missing))
+                cur.execute(f"SELECT id, `date` FROM days WHERE account_id = %s AND `date` IN ({placeholders})",
+                            (account_id, *missing))
+                for row in cur.fetchall():
+                    day_ids[row["date"]] = row["id"]
+
+        cur.execute(
+            """
+            INSERT INTO trades (account_id, day_id, symbol_id, symbol, position_size, entry_price, exit_price, stop_loss, take_profit, trade_date)
+            VALUES """ + ",".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(batch)),
+            [v for r in batch for v in (account_id, day_ids[r[-1]], symbol_ids[r[0]], *r)],
+        )
+        return min(r[-1] for r in batch)
+
+    def _records_from(stream, fmt):
+        if fmt == "csv":
+            return _iter_csv_records(stream)
+        if fmt == "json":
+            return _iter_json_records(stream)
+        if fmt == "tcol":
+            return _iter_tcol_records(stream)
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+    def _format_from_name(name):
+        name = (name or "").lower().removesuffix(".gz")
+        if name.endswith(".csv"):
+            return "csv"
+        if name.endswith(".tcol"):
+            return "tcol"
+        return "json"
+
+    @app.cli.command("import-trades")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", "fmt", type=click.Choice(["csv", "json", "tcol"]), default=None,
+                  help="Input format (default: from the file extension).")
+    @click.option("--batch-size", default=1000, show_default=True, help="Rows per multi-row INSERT.")
+    @click.option("--account", "account_id", default=DEFAULT_ACCOUNT, show_default=True, help="Account id to import into.")
+    def import_trades_command(path, fmt, batch_size, account_id):
+        """Bulk-import trades from a CSV, JSON/JSON Lines or tcol file (optionally .gz) in one transaction."""
+        _require_account(account_id)
+        fmt = fmt or _format_from_name(path)
+        opener = gzip.open if path.lower().endswith(".gz") else open
+        f = opener(path, "rb") if fmt == "tcol" else opener(path, "rt", encoding="utf-8-sig", newline="")
+        with f:
+            try:
+                rows, seconds = import_trades(_records_from(f, fmt), account_id, batch_size=batch_size)
+            except ValueError as e:
+                print(f"Import aborted, nothing was written: {e}")
+                raise SystemExit(1)
+        rate = rows / seconds if seconds else 0.0
+        print(f"✅ Imported {rows} trades in {seconds:.2f}s ({rate:,.0f} rows/sec).")
+        started = time.perf_counter()
+        _settle_ledger()
+        print(f"🔄 Ledger recomputed in {time.perf_counter() - started:.2f}s.")
+
+    def _settle_ledger():
+        """CLI: run the pending recomputes now; exit 1 if any failed (they stay queued)."""
+        failed = recompute_scheduler.flush()
+        if failed:
+            print(f"⚠️ {len(failed)} ledger recompute(s) failed; balances are not up to date. "
+                  "Fix the cause and run `flask --app app rebuild-ledger`.")
+            raise SystemExit(1)
+
+    def _require_account(account_id):
+        if account_id not in _accounts(reload=True):
+            raise click.UsageError(f"Unknown account {account_id} (see `flask --app app create-account`).")
+
+    def _export_filters(start, end, symbol, kind):
+        """Validated (start, end, symbol); raises ValueError with a message for the user."""
+        try:
+            start = date.fromisoformat(start) if start else None
+            end = date.fromisoformat(end) if end else None
+        except ValueError:
+            raise ValueError("start/end must be YYYY-MM-DD")
+        if symbol and kind != "trades":
+            raise ValueError("symbol filters apply to the trades export only")
+        return start, end, (symbol.strip().upper() if symbol else None)
+
+    @app.cli.command("export")
+    @click.argument("kind", type=click.Choice(sorted(_EXPORT_COLUMNS)))
+    @click.option("--out", "path", default="-", show_default=True, help="Output file, '-' for stdout.")
+    @click.option("--format", "fmt", type=click.Choice(["csv", "tcol"]), default=None,
+                  help="Output format (default: from the file extension, else csv).")
+    @click.option("--start", default=None, help="First date (YYYY-MM-DD).")
+    @click.option("--end", default=None, help="Last date (YYYY-MM-DD).")
+    @click.option("--symbol", default=None, help="Only this symbol (trades export).")
+    @click.option("--gzip", "compress", is_flag=True, help="gzip the output (implied by a .gz file name).")
+    @click.option("--account", "account_id", default=DEFAULT_ACCOUNT, show_default=True, help="Account id to export.")
+    def export_command(kind, path, fmt, start, end, symbol, compress, account_id):
+        """Stream all trades or daily ledger rows of one account to a file, without loading them into memory."""
+        _require_account(account_id)
+        try:
+            start, end, symbol = _export_filters(start, end, symbol, kind)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+        name = path.lower()
+        compress = compress or name.endswith(".gz")
+        fmt = fmt or ("tcol" if name.removesuffix(".gz").endswith(".tcol") else "csv")
+        if kind == "days":
+            _settle_ledger()  # export the settled ledger
+        started = time.perf_counter()
+        written = 0
+        out = sys.stdout.buffer if path == "-" else open(path, "wb")
+        try:
+            for chunk in _stream_export(kind, fmt, account_id, start, end, symbol, compress):
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+        print(f"✅ Exported {kind} ({fmt}{', gzip' if compress else ''}): {written:,} bytes "
+              f"in {time.perf_counter() - started:.2f}s.", file=sys.stderr)
+
+    @app.cli.command("check-ledger")
+    @click.option("--fix", is_flag=True, help="Rebuild the ledger of any account that is off.")
+    @click.option("--account", "account_id", type=int, default=None, help="Only this account (default: all).")
+    def check_ledger(fix, account_id):
+        """Verify stored day/week balances against a full recompute from trades."""
+        if account_id is not None:
+            _require_account(account_id)
+        broken = []
+        for acc in [account_id] if account_id is not None else list(_accounts()):
+            day_updates, week_updates = _ledger_mismatches(acc)
+            if not day_updates and not week_updates:
+                print(f"✅ Account {acc}: ledger is consistent.")
+                continue
+            print(f"⚠️ Account {acc}: {len(day_updates)} day(s) and {len(week_updates)} week(s) differ from a full recompute.")
+            for day_id, entry_balance, day_pl, current_balance, risk10 in day_updates[:20]:
+                print(f"  day {day_id}: expected entry={entry_balance} pl={day_pl} current={current_balance} risk10={risk10}")
+            for week_id, starting_balance, week_pl in week_updates[:20]:
+                print(f"  week {week_id}: expected starting={starting_balance} pl={week_pl}")
+            broken.append(acc)
+        if not broken:
+            return
+        if not fix:
+            raise SystemExit(1)
+        # so a pending recompute doesn't run over the rebuilt rows; one that fails is superseded by the rebuild
+        recompute_scheduler.flush()
+        for acc in broken:
+            days_changed, weeks_changed, seconds = rebuild_ledger(acc)
+            recompute_scheduler.discard(acc)
+            print(f"🔄 Account {acc}: rebuilt {days_changed} day(s) and {weeks_changed} week(s) in {seconds:.2f}s.")
+
+    @app.cli.command("rebuild-ledger")
+    @click.option("--account", "account_id", type=int, default=None, help="Only this account (default: all).")
+    @click.option("--chunk-weeks", type=click.IntRange(min=0), default=0, show_default=True,
+                  help="Commit every N weeks so the app keeps writing meanwhile (0: one transaction per account).")
+    def rebuild_ledger_command(account_id, chunk_weeks):
+        """Rebuild every day/week balance and the months and symbols rollups from trades, with window-function queries."""
+        if account_id is not None:
+            _require_account(account_id)
+        recompute_scheduler.flush()  # one that fails is superseded by the rebuild below, or reported after it
+        for acc in [account_id] if account_id is not None else list(_accounts()):
+            days_changed, weeks_changed, seconds = rebuild_ledger(acc, chunk_weeks)
+            recompute_scheduler.discard(acc)
+            print(f"✅ Account {acc}: {days_changed} day(s) and {weeks_changed} week(s) changed in {seconds:.2f}s.")
+        _settle_ledger()  # an account left out by --account may still have one failing
+
+    @app.cli.command("create-account")
+    @click.argument("name")
+    @click.option("--starting-balance", default="2000.00", show_default=True)
+    def create_account(name, starting_balance):
+        """Add a trading account with its own ledger; select it in the UI or with ?account=<id>."""
+        try:
+            starting_balance = _to_cents(Decimal(starting_balance))
+        except ArithmeticError:
+            raise click.UsageError("--starting-balance must be a number")
+        conn = get_db()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("INSERT INTO TraderInfo (name, starting_balance) VALUES (%s, %s)",
+                            (name.strip()[:64], starting_balance))
+                account_id = cur.lastrowid
+        finally:
+            conn.close()
+        ledger_version.bump()  # refresh the account list
+        print(f"✅ Created account {account_id} ({name}) with starting balance {starting_balance}.")
+
+    def _explain_hot_queries(cur, account_id):
+        """EXPLAIN each of _hot_queries() around the account's latest day; returns how many have problems."""
+        cur.execute("SELECT `date` AS d FROM days WHERE account_id = %s ORDER BY `date` DESC LIMIT 1", (account_id,))
+        row = cur.fetchone()
+        day = row["d"] if row else date.today()
+        failing = 0
+        for name, sql, args in _hot_queries(account_id, day):
+            access, problems = db_backend.explain(cur, sql, args)
+            if problems:
+                failing += 1
+                print(f"⚠️ {name}: {'; '.join(problems)} ({access})")
+            else:
+                print(f"✅ {name}: {access}")
+        return failing
+
+    @app.cli.command("migrate")
+    @click.option("--status", is_flag=True, help="List the migrations and which are applied, then exit.")
+    @click.option("--explain", is_flag=True, help="Then EXPLAIN the hot queries; exit 1 on full scans or filesorts.")
+    @click.option("--account", "account_id", type=int, default=DEFAULT_ACCOUNT, show_default=True,
+                  help="Account whose rows --explain plans against.")
+    def migrate(status, explain, account_id):
+        """
+        Bring the schema up to date by applying the pending migrations/NNNN_name.sql in order.
+        Applied versions are recorded in schema_migrations; nothing is dropped or re-created.
+        """
+        migrations = _migrations()
+        failing = 0
+        conn = get_db()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(_SCHEMA_MIGRATIONS_SQL)
+                cur.execute("SELECT version, checksum FROM schema_migrations")
+                applied = {r["version"]: r["checksum"] for r in cur.fetchall()}
+
+                baseline = legacy = None
+                if not applied and db_backend.table_exists(cur, "trades"):
+                    # built by an old tradingview_structure.sql: the multi-account one is the 0001
+                    # schema, the single-account one (no account_id) needs the ALTER TABLE upgrade
+                    baseline = migrations[0]
+                    legacy = not db_backend.column_exists(cur, "trades", "account_id")
+                    if legacy and not db_backend.legacy_upgrade:
+                        print(f"⚠️ trades has no account_id and {db_backend.name} has no upgrade path; "
+                              "rebuild the database with `flask migrate` on an empty file.")
+                        raise SystemExit(1)
+                    missing = [] if legacy else _missing_baseline_parts(cur)
+                    if missing:
+                        # neither schema we know how to take over: recording 0001 would hide the gap
+                        print(f"⚠️ Existing schema is not the 0001 schema (missing {', '.join(missing)}); "
+                              "not recording it. Bring it to migrations/0001_initial.sql by hand, or migrate "
+                              "a new database and import-trades into it.")
+                        raise SystemExit(1)
+
+                if status:
+                    for version, name, _, checksum in migrations:
+                        if baseline and version == baseline[0]:
+                            state = ("pending (single-account schema, upgraded in place by the next migrate)" if legacy
+                                     else "applied (existing schema, recorded on the next migrate)")
+                        elif version not in applied:
+                            state = "pending"
+                        elif applied[version] != checksum:
+                            state = "applied ⚠️ file changed since"
                         else:
-                            new_sb = running_sb + (float(prev_week_pl) if prev_week_pl is not None else 0.0)
-
-                        if abs(new_sb - float(w["starting_balance"])) > 1e-9:
-                            cur.execute("UPDATE weeks SET starting_balance = %s WHERE id = %s", (new_sb, w["id"]))
-
-                        running_sb = new_sb
-                        prev_week_pl = float(w["week_pl"]) if w.get("week_pl") is not None else 0.0
-
-                # autocommit is on in get_db()
+                            state = "applied"
+                        print(f"{version:04d}_{name}: {state}")
+                    return
+
+                def run(label, statements):
+                    if app.config["LEDGER_MODE"] == "app":
+                        # app-maintained ledger: the Python layer does what the triggers would
+                        statements = [st for st in statements if not st.upper().startswith("CREATE TRIGGER")]
+                    started = time.perf_counter()
+                    for stmt in statements:
+                        try:
+                            cur.execute(stmt)
+                        except Exception as e:
+                            # MySQL commits DDL as it goes: the statements before this one are in place
+                            print(f"⚠️ {label} failed: {e}\nStatement: {stmt[:120]}...")
+                            raise SystemExit(1)
+                    print(f"✅ Applied {label} ({len(statements)} statements, {time.perf_counter() - started:.2f}s)")
+
+                if baseline:
+                    version, name, path, checksum = baseline
+                    if legacy:
+                        with open(db_backend.legacy_upgrade, encoding="utf-8") as f:
+                            statements = _split_sql_statements(f.read())
+                        with open(path, encoding="utf-8") as f:
+                            # the upgrade drops the account-unaware triggers; put 0001's in their place
+                            statements += [st for st in _split_sql_statements(f.read())
+                                           if st.upper().startswith("CREATE TRIGGER")]
+                        run(f"{version:04d}_{name} as an upgrade of the single-account schema", statements)
+                        missing = _missing_baseline_parts(cur)
+                        if missing:
+                            print(f"⚠️ Upgrade left the schema short of 0001 (missing {', '.join(missing)}); "
+                                  "not recording it.")
+                            raise SystemExit(1)
+                    else:
+                        print(f"ℹ️ Existing schema found; recorded {version:04d}_{name} as applied.")
+                    cur.execute("INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                                (version, name, checksum))
+                    applied[version] = checksum
+
+                pending = [m for m in migrations if m[0] not in applied]
+                for version, name, path, checksum in pending:
+                    with open(path, encoding="utf-8") as f:
+                        run(f"{version:04d}_{name}", _split_sql_statements(f.read()))
+                    cur.execute("INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                                (version, name, checksum))
+                if not pending:
+                    print("✅ Schema is up to date.")
+
+                if explain:
+                    failing = _explain_hot_queries(cur, account_id)
         finally:
             conn.close()
+        if failing:
+            raise SystemExit(1)
+
+    def _build_calendar_cells(account_id, year, month):
+        """Compute the 6x7 grid (Sunday first) for one account's month from days/weeks."""
+        first_day = date(year, month, 1)
+        # next_month: jump to day 28, add 4 days (guaranteed next month), then set to 1st
+        next_month = (first_day.replace(day=28) + timedelta(days=4)).replace(day=1)
+        last_day = next_month - timedelta(days=1)
+        start_grid, end_grid = _grid_range(year, month)
 
-    @app.cli.command("init-db")
-    def init_db():
-        """Initialize the MySQL schema/triggers/views from ./tradingview_structure.sql"""
-        sql_path = os.path.join(os.path.dirname(__file__), "tradingview_structure.sql")
-        if not os.path.exists(sql_path):
-            print("tradingview_structure.sql not found next to app.py")
-            raise SystemExit(2)
-        with open(sql_path, "r", encoding="utf-8") as f:
-            sql = f.read()
         conn = get_db()
         try:
             with conn.cursor() as cur:
-                # Handle DELIMITER blocks for triggers/routines
-                statements = []
-                delimiter = '$$'
-                buffer = ''
-                for line in sql.splitlines():
-                    lstripped = line.strip()
-                    if lstripped.upper().startswith('DELIMITER'):
-                        delimiter = lstripped.split()[1]
-                        continue
-                    buffer += line + '\n'
-                    if buffer.rstrip().endswith(delimiter):
-                        # Remove delimiter from end
-                        statement = buffer.rstrip()[:-len(delimiter)].strip()
-                        if statement:
-                            statements.append(statement)
-                        buffer = ''
-                # Add any trailing statement
-                if buffer.strip():
-                    statements.append(buffer.strip())
-                for stmt in statements:
-                    try:
-                        cur.execute(stmt)
-                    except Exception as e:
-                        print(f"Error executing SQL: {e}\nStatement: {stmt[:120]}...")
-                        raise
-            print("✅ Database initialized successfully.")
+                # day P/L only for the actual month
+                cur.execute(_CALENDAR_DAYS_SQL, (account_id, first_day, last_day))
+                day_rows = cur.fetchall()
+                # weeks that overlap the VISIBLE GRID, not just the month, so spillover
+                # weekends (e.g., Nov 1/2 showing in the Oct view) get a week total
+                cur.execute(_CALENDAR_WEEKS_SQL, (account_id, start_grid, end_grid))
+                weeks = cur.fetchall()
         finally:
             conn.close()
+        return _calendar_cells_from_rows(year, month, day_rows, weeks)
+
+    def _get_calendar_cells(account_id, year, month):
+        cells = calendar_cache.get(year, month, account_id)
+        if cells is None:
+            token = calendar_cache.token(account_id)
+            index = _balance_index(account_id)
+            if index is not None:
+                cells = _build_calendar_cells_from_index(index, year, month)
+            else:
+                cells = _build_calendar_cells(account_id, year, month)
+            calendar_cache.put(year, month, cells, account_id, token)
+        return cells
+
+    def _cached_page(view):
+        """
+        Serve a GET page from page_cache while the account's ledger ETag is unchanged: no template
+        rendering, precompressed bytes, and a 304 when the browser already has it. Requests with
+        pending flash messages (or ?profile=1) always render, and their output is not cached.
+        """
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not page_cache.max_size or session.get("_flashes") or g.get("profiler") is not None:
+                return view(*args, **kwargs)
+            account_id = _current_account()
+            today = datetime.now(ZoneInfo(app.config["TZ"])).date()
+            key = _page_key(request, account_id, today, recompute_scheduler.settling(account_id))
+            etag = _ledger_etag(account_id, "page", *key)
+            page = page_cache.get(key, etag)
+            if page is None:
+                html = view(*args, **kwargs)
+                if not isinstance(html, str):  # redirects and error responses pass through
+                    return html
+                page = page_cache.put(key, etag, html)
+            return page.response(Response, request)
+        return wrapper
 
     @app.route("/", methods=["GET"])
+    @_cached_page
     def calendar_view():
         # Determine month to display
         tz = ZoneInfo(app.config["TZ"])
@@ -304,92 +2883,13 @@ def create_app():
         year = int(request.args.get("year", today.year))
         month = int(request.args.get("month", today.month))
         first_day = date(year, month, 1)
-        default_risk = 10
 
         # next_month: jump to day 28, add 4 days (guaranteed next month), then set to 1st
         next_month = (first_day.replace(day=28) + timedelta(days=4)).replace(day=1)
         last_day = next_month - timedelta(days=1)
 
-        # --- CHANGES START: compute the 6x7 GRID RANGE first (start on Sunday)
-        # Python weekday(): Monday=0..Sunday=6. To get Sunday as start, compute days to subtract
-        days_to_sunday = (first_day.weekday() + 1) % 7
-        start_grid = first_day - timedelta(days=days_to_sunday)  # Sunday of the grid
-        end_grid = start_grid + timedelta(days=41)  # inclusive last cell (6*7 - 1)
-        # --- CHANGES END
-
-        # Fetch day P/L only for the actual month (as before)
-        conn = get_db()
-        try:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT date, day_pl, risk10, entry_balance, current_balance
-                    FROM days
-                    WHERE date BETWEEN %s AND %s
-                """, (first_day, last_day))
-                day_rows = cur.fetchall()
-
-                # --- CHANGES START:
-                # Fetch weeks that overlap the VISIBLE GRID, not just the month.
-                # This ensures spillover weekends (e.g., Nov 1/2 showing in the Oct view) get a week total.
-                cur.execute("""
-                    SELECT id, start_date, end_date, week_pl, starting_balance
-                    FROM weeks
-                    WHERE NOT (end_date < %s OR start_date > %s)
-                """, (start_grid, end_grid))
-                weeks = cur.fetchall()
-                # --- CHANGES END
-        finally:
-            conn.close()
-
-        day_pl_map = { 
-            r["date"]: {
-                "day_pl": float(r["day_pl"]),
-                "risk10": r["risk10"],
-                "entry_balance": float(r["entry_balance"]),
-                "current_balance": r["current_balance"],
-            } for r in day_rows
-        }
-
-        # Map each date in the visible grid to its week data (starting_balance and week_pl)
-        week_date_map = {}
-        saturday_weekpl = {}
-        for w in weeks:
-            w_start = w["start_date"]
-            w_end = w["end_date"]
-            # overlap with visible grid
-            start = max(w_start, start_grid)
-            end = min(w_end, end_grid)
-            sb = float(w["starting_balance"])
-            wp = float(w["week_pl"])
-            # assign week data to each date in this week's overlap with the grid
-            d_iter = start
-            while d_iter <= end:
-                week_date_map[d_iter] = {"starting_balance": sb, "week_pl": wp}
-                d_iter += timedelta(days=1)
-            # compute saturday for display of week total on Saturday cell
-            # w_start is the week's start_date (now Sunday); Saturday is +6 days
-            saturday = w_start + timedelta(days=6)
-            if start_grid <= saturday <= end_grid:
-                saturday_weekpl[saturday] = wp
-
-        # Build the 6x7 grid
-        cells = []
-        d = start_grid
-        for _ in range(6*7):
-            day_pl = day_pl_map.get(d)
-            weekinfo = week_date_map.get(d)
-
-            cells.append({
-                "date": d,
-                "in_month": d.month == month,
-                "day_pl": day_pl["day_pl"] if day_pl else None,
-                # show week total only on Saturday cell when available
-                "week_pl": saturday_weekpl.get(d) if d.weekday() == 5 else None,
-                "risk10": day_pl["risk10"] if day_pl else None,
-                # calculate daily risk from the week data: ((starting_balance + week_pl) * default_risk) / 100
-                "daily_risk": ((weekinfo["starting_balance"] + weekinfo["week_pl"]) * default_risk) / 100 if weekinfo else None,
-            })
-            d += timedelta(days=1)
+        account_id = _current_account()
+        cells = _get_calendar_cells(account_id, year, month)
 
         # Prev/next links
         prev_month = (first_day - timedelta(days=1)).replace(day=1)
@@ -401,7 +2901,7 @@ def create_app():
                                first_day=first_day,
                                prev_year=prev_month.year, prev_month=prev_month.month,
                                next_year=next_month_x.year, next_month=next_month_x.month,
-                               starting_balance=_get_current_balance(starting_balance=True))
+                               starting_balance=_get_current_balance(account_id, starting_balance=True))
 
     @app.route("/trades/new", methods=["POST"])
     def create_trade():
@@ -411,37 +2911,56 @@ def create_app():
         entry_price = request.form.get("entry_price")
         exit_price = request.form.get("exit_price")
         trade_date = request.form.get("trade_date")
-        current_balance = _get_current_balance()
+        account_id = _current_account()
 
         if not (symbol and position_size and entry_price and exit_price and trade_date):
             flash("All fields are required.", "error")
             return redirect(request.referrer or url_for("calendar_view"))
-
-        conn = get_db()
         try:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO trades (symbol, position_size, entry_price, exit_price, trade_date)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (symbol, float(position_size), float(entry_price), float(exit_price), trade_date))
-
-                # Update weeks.starting_balance only if weeks table has exactly one entry
-                cur.execute("SELECT COUNT(*) AS cnt FROM weeks")
-                row = cur.fetchone()
-                if row and int(row["cnt"]) == 1:
-                    cur.execute("UPDATE weeks SET starting_balance = %s", (current_balance,))
-                    print(f"✅ Updated only week starting_balance to {current_balance}")
+            stop_loss, take_profit = _optional_prices(request.form)
+        except ValueError:
+            flash("Stop loss and take profit must be numbers.", "error")
+            return redirect(request.referrer or url_for("calendar_view"))
 
+        app_ledger = app.config["LEDGER_MODE"] == "app"
+        try:
+            with _index_writes(account_id), _unit_of_work() as uow:
+                cur = uow.cur
+                _lock_ledger(cur, account_id, trade_date)
+                symbol_id = _symbol_id(cur, account_id, symbol)
+                if app_ledger:
+                    day_id = _ensure_day(cur, account_id, trade_date)
+                    cur.execute("""
+                        INSERT INTO trades (account_id, day_id, symbol_id, symbol, position_size, entry_price,
+                                            exit_price, stop_loss, take_profit, trade_date)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    """, (account_id, day_id, symbol_id, symbol, float(position_size), float(entry_price),
+                          float(exit_price), stop_loss, take_profit, trade_date))
+                    trade_id = cur.lastrowid
+                    cur.execute("SELECT profit FROM trades WHERE id = %s", (trade_id,))
+                    profit = cur.fetchone()["profit"]
+                    _apply_pl_delta(uow, account_id, day_id, profit, trade_id=trade_id)
+                else:
+                    cur.execute("""
+                        INSERT INTO trades (account_id, symbol_id, symbol, position_size, entry_price, exit_price,
+                                            stop_loss, take_profit, trade_date)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    """, (account_id, symbol_id, symbol, float(position_size), float(entry_price), float(exit_price),
+                          stop_loss, take_profit, trade_date))
+                    trade_id = cur.lastrowid
+                    cur.execute("SELECT profit FROM trades WHERE id = %s", (trade_id,))
+                    profit = cur.fetchone()["profit"]
+                cur.execute(_SYMBOL_ADD_SQL, _symbol_add_args(symbol_id, profit, trade_date))
+                _snapshot_trade_write(uow, account_id, trade_id)
+                uow.after_commit(_index_trade_change, account_id, trade_date, profit, 1)
+                uow.after_commit(ledger_version.bump, account_id)
+
+                # Recompute balances from the trade date (in the background) so subsequent days are updated
+                if not app_ledger:
+                    uow.after_commit(recompute_scheduler.schedule, trade_date, key=account_id)
             flash(f"Trade {symbol} added for {trade_date}.", "ok")
         except Exception as e:
             flash(f"DB error: {e}", "error")
-        finally:
-            conn.close()
-        # Recompute balances from the trade date so subsequent days are updated
-        try:
-            recompute_from_date(trade_date)
-        except Exception:
-            print("Failed to recompute after creating trade")
 
         # If request came from trades page, redirect back there
         if request.referrer and '/trades' in request.referrer:
@@ -449,134 +2968,196 @@ def create_app():
         # Otherwise redirect to calendar view (legacy behavior)
         return redirect(url_for("calendar_view", year=trade_date[:4], month=int(trade_date[5:7])))
 
+    @app.route("/trades/import", methods=["POST"])
+    def import_trades_view():
+        """
+        Bulk import. Accepts a multipart upload in field 'file' (from the trades page) or a raw
+        text/csv or application/json body (for scripts, answered with JSON).
+        """
+        upload = request.files.get("file")
+        if upload is not None:
+            fmt = _format_from_name(upload.filename)
+            raw = upload.stream
+        else:
+            fmt = {"text/csv": "csv", "application/x-tcol": "tcol"}.get(request.mimetype, "json")
+            raw = request.stream
+        stream = raw if fmt == "tcol" else io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+
+        try:
+            rows, seconds = import_trades(_records_from(stream, fmt), _current_account())
+            error = None
+        except ValueError as e:
+            rows, seconds, error = 0, 0.0, str(e)
+        except Exception as e:
+            rows, seconds, error = 0, 0.0, f"DB error: {e}"
+        rate = rows / seconds if seconds else 0.0
+
+        if upload is None:
+            if error:
+                return jsonify({"error": error}), 400
+            return jsonify({"rows": rows, "seconds": round(seconds, 3), "rows_per_sec": round(rate)})
+
+        if error:
+            flash(f"Import aborted, nothing was written: {error}", "error")
+        else:
+            flash(f"Imported {rows} trades in {seconds:.2f}s ({rate:,.0f} rows/sec).", "ok")
+        return redirect(url_for("trades_view"))
+
     @app.route("/trades", methods=["GET"])
+    @_cached_page
     def trades_view():
         """Display list of trades with computed profit."""
         # pagination
-        try:
-            page = int(request.args.get("page", "1"))
-        except ValueError:
-            page = 1
         try:
             per_page = int(request.args.get("per_page", "10"))
         except ValueError:
             per_page = 20
         if per_page <= 0:
             per_page = 20
-        if page <= 0:
-            page = 1
 
-        offset = (page - 1) * per_page
+        account_id = _current_account()
+        symbol = (request.args.get("symbol") or "").strip().upper() or None
+        listing = _fetch_trades_page(account_id, per_page, request.args.get("after"), request.args.get("before"), symbol)
+        return render_template("trades.html", per_page=per_page, symbol=symbol,
+                               symbols=sorted(_symbol_stats(account_id)), **listing)
 
+    def _trades_total(account_id):
+        """
+        (total, exact) for the account's trades, cached per ledger version. The BalanceIndex already
+        holds the count; without it, counting stops at TRADES_EXACT_COUNT_LIMIT rows of the
+        (account_id, trade_date, id) index, since the table-wide InnoDB estimate can't be split by account.
+        """
+        index = _balance_index(account_id)
+        if index is not None:
+            return index.trade_count(), True
+
+        def load():
+            limit = app.config["TRADES_EXACT_COUNT_LIMIT"]
+            conn = get_db()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(_TRADES_COUNT_SQL, (account_id, limit + 1))
+                    cnt_row = cur.fetchone()
+                    cnt = int(cnt_row["cnt"]) if cnt_row and cnt_row.get("cnt") is not None else 0
+                    return (limit, False) if cnt > limit else (cnt, True)
+            finally:
+                conn.close()
+        return count_cache.get("trades", load, scope=account_id)
+
+    def _symbol_stats(account_id):
+        """{symbol: symbols row} for the account's traded symbols, from the rollup, cached per ledger version."""
+        def load():
+            conn = get_db()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(_SYMBOL_STATS_SQL, (account_id,))
+                    return {r["symbol"]: r for r in cur.fetchall()}
+            finally:
+                conn.close()
+        return count_cache.get("symbols", load, scope=account_id)
+
+    def _fetch_trades_page(account_id, per_page, after=None, before=None, symbol=None):
+        """
+        One page of the account's trades, newest first, using keyset pagination on (trade_date, id)
+        so any page costs one index range scan. `after`/`before` are cursor tokens from a previous page.
+        With the JournalSnapshot the page is read from memory instead. A symbol's trades are paged on
+        (symbol_id, trade_date, id), with the total taken from its symbols row.
+        """
+        after_key = _decode_cursor(after)
+        before_key = _decode_cursor(before) if not after_key else None
+        if symbol is not None:
+            stats = _symbol_stats(account_id).get(symbol)
+            if stats is None:
+                return _trades_listing([], per_page, after_key, before_key, 0, True)
+            conn = get_db()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(*_trades_page_query(account_id, per_page, after_key, before_key, stats["id"]))
+                    rows = cur.fetchall()
+            finally:
+                conn.close()
+            return _trades_listing(rows, per_page, after_key, before_key, stats["trades"], True)
+        snapshot = _journal_snapshot(account_id)
+        if snapshot is not None:
+            return _trades_listing(snapshot.page(per_page, after_key, before_key), per_page, after_key, before_key,
+                                   len(snapshot), True)
         conn = get_db()
-        trades = []
-        total = 0
         try:
             with conn.cursor() as cur:
-                # total count for pagination
-                cur.execute("SELECT COUNT(*) as cnt FROM trades")
-                cnt_row = cur.fetchone()
-                total = int(cnt_row["cnt"]) if cnt_row and cnt_row.get("cnt") is not None else 0
-
-                # fetch page of trades
-                cur.execute("SELECT id, trade_date, symbol, position_size, entry_price, exit_price FROM trades ORDER BY trade_date DESC, id DESC LIMIT %s OFFSET %s", (per_page, offset))
+                cur.execute(*_trades_page_query(account_id, per_page, after_key, before_key))
                 rows = cur.fetchall()
-                for r in rows:
-                    # ensure floats
-                    ps = float(r["position_size"]) if r.get("position_size") is not None else 0.0
-                    ep = float(r["entry_price"]) if r.get("entry_price") is not None else 0.0
-                    xp = float(r["exit_price"]) if r.get("exit_price") is not None else 0.0
-                    # profit calculation: (exit_price - entry_price) * position_size
-                    profit = (xp - ep) * ps
-                    trades.append({
-                        "id": r["id"],
-                        "trade_date": r["trade_date"],
-                        "symbol": r["symbol"],
-                        "position_size": ps,
-                        "entry_price": ep,
-                        "exit_price": xp,
-                        "profit": profit,
-                    })
         finally:
             conn.close()
-
-        # pagination metadata
-        total_pages = (total + per_page - 1) // per_page if per_page else 1
-
-        return render_template("trades.html", trades=trades, page=page,
-                               per_page=per_page, total=total, total_pages=total_pages)
+        return _trades_listing(rows, per_page, after_key, before_key, *_trades_total(account_id))
 
     @app.route("/trades/<int:trade_id>", methods=["GET"])
     def trade_detail(trade_id):
         """Display detailed view of a trade and its linked day data."""
-        conn = get_db()
-        trade = None
+        account_id = _current_account()
+        snapshot = _journal_snapshot(account_id)
+        trade = snapshot.get(trade_id) if snapshot is not None else None
+        if trade is None:
+            conn = get_db()
+            try:
+                with conn.cursor() as cur:
+                    # the trade with its stored profit and risk metrics
+                    cur.execute(f"SELECT {_TRADES_COLUMNS} FROM trades WHERE id = %s AND account_id = %s",
+                                (trade_id, account_id))
+                    trade = cur.fetchone()
+            finally:
+                conn.close()
+            if not trade:
+                flash("Trade not found.", "error")
+                return redirect(url_for("trades_view"))
+
+        # the trade's day, from the balance index when it holds it
+        d = trade["trade_date"]
         day = None
-        try:
-            with conn.cursor() as cur:
-                # get trade with all fields including stop_loss and take_profit
-                cur.execute("""
-                    SELECT id, trade_date, symbol, position_size, entry_price, exit_price, 
-                           stop_loss, take_profit, day_id
-                    FROM trades 
-                    WHERE id = %s
-                """, (trade_id,))
-                row = cur.fetchone()
-                if not row:
-                    flash("Trade not found.", "error")
-                    return redirect(url_for("trades_view"))
-                
-                # compute profit
-                ps = float(row["position_size"]) if row.get("position_size") is not None else 0.0
-                ep = float(row["entry_price"]) if row.get("entry_price") is not None else 0.0
-                xp = float(row["exit_price"]) if row.get("exit_price") is not None else 0.0
-                sl = float(row["stop_loss"]) if row.get("stop_loss") is not None else None
-                tp = float(row["take_profit"]) if row.get("take_profit") is not None else None
-                profit = (xp - ep) * ps
-                
-                trade = {
-                    "id": row["id"],
-                    "trade_date": row["trade_date"],
-                    "symbol": row["symbol"],
-                    "position_size": ps,
-                    "entry_price": ep,
-                    "exit_price": xp,
-                    "stop_loss": sl,
-                    "take_profit": tp,
-                    "profit": profit,
-                }
-                
-                # get linked day data if day_id exists
-                if row.get("day_id"):
+        index = _balance_index(account_id)
+        if d is not None and index is not None and index.has_day(d):
+            day = {
+                "date": d,
+                "entry_balance": index.balance_before(d),
+                "day_pl": index.day_pl(d),
+                "current_balance": index.balance_at(d),
+                "risk10": index.risk10_at(d),
+            }
+        elif d is not None:
+            conn = get_db()
+            try:
+                with conn.cursor() as cur:
                     cur.execute("""
                         SELECT date, entry_balance, day_pl, current_balance, risk10
                         FROM days
-                        WHERE id = %s
-                    """, (row["day_id"],))
+                        WHERE account_id = %s AND `date` = %s
+                    """, (account_id, d))
                     day_row = cur.fetchone()
-                    if day_row:
-                        day = {
-                            "date": day_row["date"],
-                            "entry_balance": float(day_row["entry_balance"]),
-                            "day_pl": float(day_row["day_pl"]),
-                            "current_balance": float(day_row["current_balance"]),
-                            "risk10": day_row["risk10"],
-                        }
-        finally:
-            conn.close()
-            
+            finally:
+                conn.close()
+            if day_row:
+                day = {
+                    "date": day_row["date"],
+                    "entry_balance": float(day_row["entry_balance"]),
+                    "day_pl": float(day_row["day_pl"]),
+                    "current_balance": float(day_row["current_balance"]),
+                    "risk10": day_row["risk10"],
+                }
+
         return render_template("trade_detail.html", trade=trade, day=day)
 
     @app.route("/trades/<int:trade_id>/delete", methods=["POST"])
     def delete_trade(trade_id):
         """Delete a trade by id and redirect back to the trades list or referrer."""
-        conn = get_db()
-        deleted_trade_date = None
+        app_ledger = app.config["LEDGER_MODE"] == "app"
+        account_id = _current_account()
         affected_week_ids = set()
         try:
-            with conn.cursor() as cur:
-                # fetch trade with day_id and trade_date
-                cur.execute("SELECT trade_date, day_id FROM trades WHERE id = %s", (trade_id,))
+            with _index_writes(account_id), _unit_of_work() as uow:
+                cur = uow.cur
+                # fetch (and lock) the trade with day_id and trade_date
+                cur.execute("""
+                    SELECT trade_date, day_id, symbol_id, profit FROM trades WHERE id = %s AND account_id = %s FOR UPDATE
+                """, (trade_id, account_id))
                 row = cur.fetchone()
                 if not row:
                     flash("Trade not found.", "error")
@@ -584,6 +3165,8 @@ def create_app():
 
                 deleted_trade_date = row.get("trade_date")
                 day_id = row.get("day_id")
+                if deleted_trade_date:
+                    _lock_ledger(cur, account_id, deleted_trade_date)
 
                 # capture the week's id for the day (if any) so we can check later
                 if day_id is not None:
@@ -598,6 +3181,14 @@ def create_app():
                     flash("Trade not found.", "error")
                     # nothing deleted, nothing to do
                     return redirect(request.referrer or url_for('trades_view'))
+                if row["symbol_id"] is not None:
+                    cur.execute(_SYMBOL_REMOVE_SQL, _symbol_remove_args(row["symbol_id"], row["profit"]))
+                if app_ledger and day_id is not None:
+                    _apply_pl_delta(uow, account_id, day_id, -row["profit"])
+                if deleted_trade_date:
+                    uow.after_commit(_index_trade_change, account_id, deleted_trade_date, -row["profit"], -1)
+                _snapshot_trade_write(uow, account_id, trade_id, deleted=True)
+                uow.after_commit(ledger_version.bump, account_id)
 
                 # Now check if the day still has any trades attached. Only delete day when no trades remain for that day.
                 if day_id is not None:
@@ -606,13 +3197,8 @@ def create_app():
                     remaining = int(cnt_row["cnt"]) if cnt_row and cnt_row.get("cnt") is not None else 0
                     if remaining == 0:
                         # no trades remain for the day -> delete the day
+                        # (if it had a week, we check below whether that week became empty)
                         cur.execute("DELETE FROM days WHERE id = %s", (day_id,))
-                        # if day had a week, we'll check below whether that week became empty
-                        # capture week id again (in case it changed)
-                        cur.execute("SELECT week_id FROM days WHERE id = %s", (day_id,))
-                        # the row will be gone, so nothing to fetch here; we use affected_week_ids captured earlier
-
-                flash("Trade deleted.", "ok")
 
                 # for each affected week, if it now has no days, delete the week
                 for w_id in list(affected_week_ids):
@@ -621,18 +3207,13 @@ def create_app():
                     cnt = int(cnt_row["cnt"]) if cnt_row and cnt_row.get("cnt") is not None else 0
                     if cnt == 0:
                         cur.execute("DELETE FROM weeks WHERE id = %s", (w_id,))
+
+                # If we deleted a trade from a past date, recompute subsequent days so entry_balance reflects the removal
+                if deleted_trade_date and not app_ledger:
+                    uow.after_commit(recompute_scheduler.schedule, deleted_trade_date, key=account_id)
+            flash("Trade deleted.", "ok")
         except Exception as e:
             flash(f"DB error: {e}", "error")
-        finally:
-            conn.close()
-
-        # If we deleted a trade from a past date, recompute subsequent days so entry_balance reflects the removal
-        try:
-            if deleted_trade_date:
-                recompute_from_date(deleted_trade_date)
-        except Exception:
-            # don't prevent user flow on recompute errors; just log to console
-            print("Failed to recompute days after deleting trade", trade_id)
 
         # Redirect back to where the request came from, or to the trades listing
         return redirect(request.referrer or url_for('trades_view'))
@@ -640,182 +3221,502 @@ def create_app():
     @app.route("/trades/<int:trade_id>/edit", methods=["GET", "POST"])
     def edit_trade(trade_id):
         """Show edit form (GET) and apply updates (POST) for a trade."""
-        conn = get_db()
-        trade_date = None
-        try:
-            with conn.cursor() as cur:
-                # GET: render form with current values
-                if request.method == "GET":
-                    cur.execute("SELECT id, trade_date, symbol, position_size, entry_price, exit_price, stop_loss, take_profit FROM trades WHERE id = %s", (trade_id,))
-                    row = cur.fetchone()
-                    if not row:
-                        flash("Trade not found.", "error")
-                        return redirect(url_for('trades_view'))
-                    ps_val = float(row["position_size"]) if row.get("position_size") is not None else 0.0
-                    ep_val = float(row["entry_price"]) if row.get("entry_price") is not None else 0.0
-                    xp_val = float(row["exit_price"]) if row.get("exit_price") is not None else 0.0
-                    profit_val = (xp_val - ep_val) * ps_val
-
-                    trade = {
-                        "id": row["id"],
-                        "trade_date": row["trade_date"],
-                        "symbol": row["symbol"],
-                        "position_size": ps_val,
-                        "entry_price": ep_val,
-                        "exit_price": xp_val,
-                        "profit": profit_val,
-                    }
-                    return render_template('trade_edit.html', trade=trade)
-
-                # POST: apply changes (support moving trade to a different date)
-                symbol = request.form.get("symbol", "").strip().upper()
-                position_size = request.form.get("position_size")
-                entry_price = request.form.get("entry_price")
-                exit_price = request.form.get("exit_price")
-                trade_date = request.form.get("trade_date")
-                # require exit_price explicitly (profit is not editable)
-                if not (symbol and position_size and entry_price and exit_price and trade_date):
-                    flash("All required fields are required.", "error")
-                    return redirect(request.referrer or url_for('edit_trade', trade_id=trade_id))
+        app_ledger = app.config["LEDGER_MODE"] == "app"
+        account_id = _current_account()
 
-                try:
-                    ps_f = float(position_size)
-                    ep_f = float(entry_price)
-                    xp_f = float(exit_price)
+        # GET: render form with current values
+        if request.method == "GET":
+            conn = get_db()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(f"SELECT {_TRADES_COLUMNS} FROM trades WHERE id = %s AND account_id = %s",
+                                (trade_id, account_id))
+                    trade = cur.fetchone()
+            finally:
+                conn.close()
+            if not trade:
+                flash("Trade not found.", "error")
+                return redirect(url_for('trades_view'))
+            return render_template('trade_edit.html', trade=trade)
+
+        # POST: apply changes (support moving trade to a different date)
+        symbol = request.form.get("symbol", "").strip().upper()
+        position_size = request.form.get("position_size")
+        entry_price = request.form.get("entry_price")
+        exit_price = request.form.get("exit_price")
+        trade_date = request.form.get("trade_date")
+        # require exit_price explicitly (profit is not editable)
+        if not (symbol and position_size and entry_price and exit_price and trade_date):
+            flash("All required fields are required.", "error")
+            return redirect(request.referrer or url_for('edit_trade', trade_id=trade_id))
 
-                    # fetch existing trade to know its current day_id/trade_date
-                    cur.execute("SELECT day_id, trade_date FROM trades WHERE id = %s", (trade_id,))
-                    old = cur.fetchone()
-                    if not old:
-                        flash("Trade not found.", "error")
-                        return redirect(request.referrer or url_for('trades_view'))
+        try:
+            ps_f = float(position_size)
+            ep_f = float(entry_price)
+            xp_f = float(exit_price)
+            stop_loss, take_profit = _optional_prices(request.form)
+
+            with _index_writes(account_id), _unit_of_work() as uow:
+                cur = uow.cur
+                # fetch (and lock) the existing trade to know its current day_id/trade_date
+                cur.execute("""
+                    SELECT day_id, trade_date, symbol_id, profit FROM trades WHERE id = %s AND account_id = %s FOR UPDATE
+                """, (trade_id, account_id))
+                old = cur.fetchone()
+                if not old:
+                    flash("Trade not found.", "error")
+                    return redirect(request.referrer or url_for('trades_view'))
 
-                    old_day_id = old.get("day_id")
+                old_day_id = old.get("day_id")
+                # moving a trade affects both its old and new date; lock and recompute from the earlier one
+                recompute_start = date.fromisoformat(trade_date)
+                if old.get("trade_date"):
+                    recompute_start = min(recompute_start, old["trade_date"])
+                _lock_ledger(cur, account_id, recompute_start)
 
-                    # ensure a day exists for the new trade_date (trigger will create week if needed)
-                    cur.execute("SELECT id FROM days WHERE `date` = %s LIMIT 1", (trade_date,))
+                # ensure a day exists for the new trade_date (trigger will create week if needed)
+                if app_ledger:
+                    new_day_id = _ensure_day(cur, account_id, trade_date)
+                else:
+                    cur.execute("SELECT id FROM days WHERE account_id = %s AND `date` = %s LIMIT 1",
+                                (account_id, trade_date))
                     nd = cur.fetchone()
                     if nd:
                         new_day_id = nd.get("id")
                     else:
-                        cur.execute("INSERT INTO days(`date`) VALUES (%s)", (trade_date,))
+                        cur.execute("INSERT INTO days(account_id, `date`) VALUES (%s, %s)", (account_id, trade_date))
                         new_day_id = cur.lastrowid
 
-                    # perform the trade update including moving to new day_id
-                    cur.execute("""
-                        UPDATE trades
-                        SET symbol = %s, position_size = %s, entry_price = %s, exit_price = %s, trade_date = %s, day_id = %s
-                        WHERE id = %s
-                    """, (
-                        symbol,
-                        ps_f,
-                        ep_f,
-                        xp_f,
-                        trade_date,
-                        new_day_id,
-                        trade_id
-                    ))
-
-                    # If we moved the trade to another day, consider cleaning the old day/week
-                    if old_day_id is not None and old_day_id != new_day_id:
-                        # capture old week's id before possibly deleting the day
-                        cur.execute("SELECT week_id FROM days WHERE id = %s", (old_day_id,))
-                        old_drow = cur.fetchone()
-                        old_week_id = old_drow.get("week_id") if old_drow else None
-
-                        # are there any trades left for the old day?
-                        cur.execute("SELECT COUNT(*) as cnt FROM trades WHERE day_id = %s", (old_day_id,))
-                        cnt_row = cur.fetchone()
-                        remaining = int(cnt_row["cnt"]) if cnt_row and cnt_row.get("cnt") is not None else 0
-                        if remaining == 0:
-                            cur.execute("DELETE FROM days WHERE id = %s", (old_day_id,))
-                            # if the old week now has no days, delete it
-                            if old_week_id is not None:
-                                cur.execute("SELECT COUNT(*) as cnt FROM days WHERE week_id = %s", (old_week_id,))
-                                wcnt = cur.fetchone()
-                                wcnt_i = int(wcnt["cnt"]) if wcnt and wcnt.get("cnt") is not None else 0
-                                if wcnt_i == 0:
-                                    cur.execute("DELETE FROM weeks WHERE id = %s", (old_week_id,))
-
-                    flash("Trade updated.", "ok")
-                except Exception as e:
-                    flash(f"DB error: {e}", "error")
-        finally:
-            conn.close()
-
-        # Only after a POST do we recompute and redirect. GET already returned above.
-        if request.method == "POST":
-            # Recompute balances from the trade date so subsequent days are updated
-            try:
-                if trade_date:
-                    recompute_from_date(trade_date)
-            except Exception:
-                print("Failed to recompute after editing trade")
-
-            return redirect(url_for('trades_view'))
+                # perform the trade update including moving to new day_id
+                symbol_id = _symbol_id(cur, account_id, symbol)
+                cur.execute("""
+                    UPDATE trades
+                    SET symbol_id = %s, symbol = %s, position_size = %s, entry_price = %s, exit_price = %s,
+                        stop_loss = %s, take_profit = %s, trade_date = %s, day_id = %s
+                    WHERE id = %s
+                """, (
+                    symbol_id,
+                    symbol,
+                    ps_f,
+                    ep_f,
+                    xp_f,
+                    stop_loss,
+                    take_profit,
+                    trade_date,
+                    new_day_id,
+                    trade_id
+                ))
+                cur.execute("SELECT profit FROM trades WHERE id = %s", (trade_id,))
+                new_profit = cur.fetchone()["profit"]
+                # out of the old symbol's aggregates (now that the trade has left it), into the new one's
+                if old["symbol_id"] is not None:
+                    cur.execute(_SYMBOL_REMOVE_SQL, _symbol_remove_args(old["symbol_id"], old["profit"]))
+                cur.execute(_SYMBOL_ADD_SQL, _symbol_add_args(symbol_id, new_profit, trade_date))
+                if app_ledger:
+                    # take the old profit out of the old day, put the new one into the new day
+                    if old_day_id is not None:
+                        _apply_pl_delta(uow, account_id, old_day_id, -old["profit"])
+                    _apply_pl_delta(uow, account_id, new_day_id, new_profit)
+                if old.get("trade_date"):
+                    uow.after_commit(_index_trade_change, account_id, old["trade_date"], -old["profit"], -1)
+                uow.after_commit(_index_trade_change, account_id, trade_date, new_profit, 1)
+                _snapshot_trade_write(uow, account_id, trade_id)
+                uow.after_commit(ledger_version.bump, account_id)
+
+                # If we moved the trade to another day, consider cleaning the old day/week
+                if old_day_id is not None and old_day_id != new_day_id:
+                    # capture old week's id before possibly deleting the day
+                    cur.execute("SELECT week_id FROM days WHERE id = %s", (old_day_id,))
+                    old_drow = cur.fetchone()
+                    old_week_id = old_drow.get("week_id") if old_drow else None
+
+                    # are there any trades left for the old day?
+                    cur.execute("SELECT COUNT(*) as cnt FROM trades WHERE day_id = %s", (old_day_id,))
+                    cnt_row = cur.fetchone()
+                    remaining = int(cnt_row["cnt"]) if cnt_row and cnt_row.get("cnt") is not None else 0
+                    if remaining == 0:
+                        cur.execute("DELETE FROM days WHERE id = %s", (old_day_id,))
+                        # if the old week now has no days, delete it
+                        if old_week_id is not None:
+                            cur.execute("SELECT COUNT(*) as cnt FROM days WHERE week_id = %s", (old_week_id,))
+                            wcnt = cur.fetchone()
+                            wcnt_i = int(wcnt["cnt"]) if wcnt and wcnt.get("cnt") is not None else 0
+                            if wcnt_i == 0:
+                                cur.execute("DELETE FROM weeks WHERE id = %s", (old_week_id,))
+
+                # Recompute balances (in the background) so subsequent days are updated
+                if not app_ledger:
+                    uow.after_commit(recompute_scheduler.schedule, recompute_start, key=account_id)
+            flash("Trade updated.", "ok")
+        except Exception as e:
+            flash(f"DB error: {e}", "error")
 
-        return app
+        return redirect(url_for('trades_view'))
 
     @app.route("/balance/edit", methods=["POST"])
     def update_starting_balance():
         """Update the TraderInfo starting balance and apply it to the oldest week."""
-        conn = get_db()
-        oldest_week_date = None  # will store the oldest week's start_date
+        app_ledger = app.config["LEDGER_MODE"] == "app"
+        account_id = _current_account()
 
+        # 1️ - Parse the new starting balance from the form
+        starting_balance_str = request.form.get("starting_balance", "2000").strip()
         try:
-            with conn.cursor() as cur:
-                # 1️ - Parse the new starting balance from the form
-                starting_balance_str = request.form.get("starting_balance", "2000").strip()
-                try:
-                    starting_balance = float(starting_balance_str)
-                except ValueError:
-                    flash("Invalid starting balance value.", "error")
-                    return redirect(url_for("calendar_view"))
-
-                # 2️ - Update TraderInfo
-                cur.execute("UPDATE TraderInfo SET starting_balance = %s", (starting_balance,))
+            starting_balance = float(starting_balance_str)
+        except ValueError:
+            flash("Invalid starting balance value.", "error")
+            return redirect(url_for("calendar_view"))
 
-                # 3️ - Get the oldest week's id and start_date
-                cur.execute("""
-                    SELECT id, start_date
-                    FROM weeks
-                    ORDER BY start_date ASC
-                    LIMIT 1
-                """)
-                oldest = cur.fetchone()
-
-                if oldest:
-                    oldest_week_id = oldest["id"]
-                    oldest_week_date = oldest["start_date"]
-
-                    # 4️⃣ Update that oldest week's starting_balance
-                    cur.execute("""
-                        UPDATE weeks
-                        SET starting_balance = %s
-                        WHERE id = %s
-                    """, (starting_balance, oldest_week_id))
+        try:
+            with _unit_of_work() as uow:
+                cur = uow.cur
+                # every balance of the account depends on this one: lock all of its days first
+                _lock_ledger(cur, account_id, date.min)
+                cur.execute("SELECT starting_balance FROM TraderInfo WHERE id = %s", (account_id,))
+                trow = cur.fetchone()
 
-                    print(f"✅ Updated oldest week {oldest_week_id} starting_balance to {starting_balance}")
+                # 2️ - Update TraderInfo
+                cur.execute("UPDATE TraderInfo SET starting_balance = %s WHERE id = %s", (starting_balance, account_id))
+                uow.after_commit(calendar_cache.clear_scope, account_id)
+                uow.after_commit(ledger_version.bump, account_id)
+                if account_id in balance_indexes:
+                    uow.after_commit(balance_indexes[account_id].set_base, starting_balance)
+
+                if app_ledger:
+                    # every balance moves by the same amount: one range UPDATE per table
+                    delta = _to_cents(starting_balance) - _to_cents(trow["starting_balance"] if trow else 0)
+                    if delta:
+                        _shift_balances(cur, account_id, delta)
                 else:
-                    print("ℹ️ No week entries found; only TraderInfo was updated.")
-
-                flash("Starting balance updated.", "ok")
-
+                    # 3️ - Get the oldest week's id and start_date
+                    cur.execute("""
+                        SELECT id, start_date
+                        FROM weeks
+                        WHERE account_id = %s
+                        ORDER BY start_date ASC
+                        LIMIT 1
+                    """, (account_id,))
+                    oldest = cur.fetchone()
+
+                    if oldest:
+                        # 4️⃣ Update that oldest week's starting_balance
+                        cur.execute("""
+                            UPDATE weeks
+                            SET starting_balance = %s
+                            WHERE id = %s
+                        """, (starting_balance, oldest["id"]))
+                        print(f"✅ Updated oldest week {oldest['id']} starting_balance to {starting_balance}")
+
+                        # 5️⃣ Recompute from the oldest week’s start date
+                        uow.after_commit(recompute_scheduler.schedule, oldest["start_date"], key=account_id)
+                    else:
+                        print("ℹ️ No week entries found; only TraderInfo was updated.")
+            flash("Starting balance updated.", "ok")
         except Exception as e:
             flash(f"DB error: {e}", "error")
 
+        return redirect(url_for("calendar_view"))
+
+    # ETags are only meaningful within this process's ledger history
+    etag_boot_id = os.urandom(4).hex()
+
+    def _ledger_etag(account_id, *parts):
+        """
+        Strong ETag for a view of one account's ledger: changes whenever that account's ledger
+        version (or the TTL window) does, so writes to other accounts leave it valid.
+        """
+        ttl = balance_cache.ttl
+        window = int(time.time() // ttl) if ttl else 0
+        key = "|".join(str(p) for p in (account_id, *parts))
+        digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+        return f"{etag_boot_id}-{ledger_version.get(account_id)}-{window}-{digest}"
+
+    def _conditional_json(etag, build):
+        """304 when the client already has this ETag (no DB access); otherwise JSON from build()."""
+        if request.if_none_match.contains(etag):
+            resp = Response(status=304)
+        else:
+            resp = jsonify(build())
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp
+
+    @app.route("/api/calendar", methods=["GET"])
+    def api_calendar():
+        """calendar_view's grid as JSON. ?format=columns returns column arrays instead of cell objects."""
+        tz = ZoneInfo(app.config["TZ"])
+        today = datetime.now(tz).date()
+        year = int(request.args.get("year", today.year))
+        month = int(request.args.get("month", today.month))
+        fmt = request.args.get("format", "rows")
+        account_id = _current_account()
+
+        def build():
+            cells = _get_calendar_cells(account_id, year, month)
+            columns = ("date", "in_month", "day_pl", "week_pl", "risk10", "daily_risk")
+            return {
+                "account_id": account_id,
+                "year": year,
+                "month": month,
+                "starting_balance": _get_current_balance(account_id, starting_balance=True),
+                "current_balance": _get_current_balance(account_id),
+                "settling": recompute_scheduler.settling(account_id),
+                "cells": (_columnar(cells, columns) if fmt == "columns"
+                          else [{c: _json_value(cell[c]) for c in columns} for cell in cells]),
+            }
+
+        return _conditional_json(_ledger_etag(account_id, "calendar", year, month, fmt), build)
+
+    @app.route("/api/trades", methods=["GET"])
+    def api_trades():
+        """trades_view's page as JSON, with the same after/before cursors and ?symbol=. ?format=columns as above."""
+        try:
+            per_page = int(request.args.get("per_page", "10"))
+        except ValueError:
+            per_page = 20
+        if per_page <= 0:
+            per_page = 20
+        after = request.args.get("after")
+        before = request.args.get("before")
+        symbol = (request.args.get("symbol") or "").strip().upper() or None
+        fmt = request.args.get("format", "rows")
+        account_id = _current_account()
+
+        def build():
+            listing = _fetch_trades_page(account_id, per_page, after, before, symbol)
+            columns = ("id", "trade_date", "symbol", "position_size", "entry_price", "exit_price", "stop_loss",
+                       "take_profit", "profit", "risk_at_entry", "r_multiple", "reward_risk")
+            trades = listing.pop("trades")
+            listing["trades"] = (_columnar(trades, columns) if fmt == "columns"
+                                 else [{c: _json_value(t[c]) for c in columns} for t in trades])
+            return listing
+
+        return _conditional_json(_ledger_etag(account_id, "trades", per_page, after, before, symbol, fmt), build)
+
+    def _load_journal(account_id):
+        """Every dated trade of the account as column arrays, in one tuple-cursor read (no dict per row)."""
+        conn = get_db()
+        try:
+            with conn.cursor(InstrumentedTupleCursor) as cur:
+                cur.execute("SELECT starting_balance FROM TraderInfo WHERE id = %s", (account_id,))
+                row = cur.fetchone()
+                base = row[0] if row and row[0] is not None else 0
+                # TO_DAYS('1970-01-01') = 719528, so this is the NumPy datetime64[D] epoch day
+                cur.execute("""
+                    SELECT TO_DAYS(trade_date) - 719528, COALESCE(profit, 0), symbol, r_multiple
+                    FROM trades
+                    WHERE account_id = %s AND trade_date IS NOT NULL
+                    ORDER BY trade_date, id
+                """, (account_id,))
+                rows = cur.fetchall()
         finally:
             conn.close()
+        return analytics.Journal.from_rows(base, rows)
 
-        # 5️⃣ Recompute from the oldest week’s start date if we have it
-        if oldest_week_date:
+    @app.route("/analytics", methods=["GET"])
+    def analytics_view():
+        try:
+            window = max(int(request.args.get("window", "20")), 2)
+        except ValueError:
+            window = 20
+        account_id = _current_account()
+        journal = analytics_cache.get("journal", lambda: _load_journal(account_id), scope=account_id)
+        report = analytics_cache.get(("report", window), lambda: analytics.analyze(journal, sharpe_window=window),
+                                     scope=account_id)
+        equity_line = drawdown_line = sharpe_line = ""
+        if report:
+            equity_line = analytics.sparkline(report["equity_curve"]["equity"])
+            drawdown_line = analytics.sparkline(report["equity_curve"]["drawdown"], height=80)
+            sharpe_line = analytics.sparkline(report["rolling_sharpe_curve"]["sharpe"], height=80)
+        return render_template(
+            "analytics.html",
+            report=report,
+            window=window,
+            equity_line=equity_line,
+            drawdown_line=drawdown_line,
+            sharpe_line=sharpe_line,
+        )
+
+    def _month_rollup(account_id):
+        """{(year, month): P/L} from the months rollup table: at most 12 rows per year of history."""
+        def load():
+            conn = get_db()
             try:
-                recompute_from_date(oldest_week_date)
-                print(f"🔄 Recomputed balances from {oldest_week_date}")
-            except Exception as e:
-                print(f"⚠️ Failed to recompute from {oldest_week_date}: {e}")
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT `year`, `month`, month_pl FROM months
+                        WHERE account_id = %s
+                        ORDER BY `year`, `month`
+                    """, (account_id,))
+                    return {(r["year"], r["month"]): float(r["month_pl"]) for r in cur.fetchall()}
+            finally:
+                conn.close()
+        return heatmap_cache.get("months", load, scope=account_id)
+
+    def _daily_pl(account_id, first, last):
+        """{date: day_pl} for the account's trading days in first..last (BalanceIndex when enabled)."""
+        index = _balance_index(account_id)
+        if index is not None:
+            days = (first + timedelta(days=i) for i in range((last - first).days + 1))
+            return {d: index.day_pl(d) for d in days if index.has_day(d)}
+        conn = get_db()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT `date`, day_pl FROM days
+                    WHERE account_id = %s AND `date` BETWEEN %s AND %s
+                """, (account_id, first, last))
+                return {r["date"]: float(r["day_pl"]) for r in cur.fetchall()}
+        finally:
+            conn.close()
 
-        return redirect(url_for("calendar_view"))
+    @app.route("/symbols", methods=["GET"])
+    def symbols_view():
+        """
+        Per-symbol trade count, P/L, win rate and last trade, straight from the symbols rollup (one row per
+        symbol, whatever the size of the journal). ?sort=pl|trades|win_rate|last|symbol.
+        """
+        sort = request.args.get("sort", "pl")
+        rows = []
+        for r in _symbol_stats(_current_account()).values():
+            pl = float(r["total_pl"])
+            rows.append({
+                "symbol": r["symbol"],
+                "trades": r["trades"],
+                "wins": r["wins"],
+                "losses": r["losses"],
+                "pl": pl,
+                "avg": pl / r["trades"],
+                "win_rate": r["wins"] / r["trades"],
+                "last_trade_date": r["last_trade_date"],
+            })
+        keys = {
+            "pl": lambda r: -r["pl"],
+            "trades": lambda r: -r["trades"],
+            "win_rate": lambda r: -r["win_rate"],
+            "last": lambda r: -r["last_trade_date"].toordinal() if r["last_trade_date"] else 0,
+            "symbol": lambda r: r["symbol"],
+        }
+        if sort not in keys:
+            sort = "pl"
+        rows.sort(key=lambda r: (keys[sort](r), r["symbol"]))
+        return render_template("symbols.html", rows=rows, sort=sort,
+                               total=round(sum(r["pl"] for r in rows), 2))
+
+    @app.route("/heatmap", methods=["GET"])
+    def heatmap_view():
+        """
+        P/L heatmaps. Without ?year: every year x month of history, straight from the months rollup.
+        With ?year= (and optionally ?quarter=1..4): a day-by-day heatmap of that range and its month totals.
+        """
+        account_id = _current_account()
+        months = _month_rollup(account_id)
+        try:
+            year = int(request.args["year"]) if request.args.get("year") else None
+            quarter = int(request.args["quarter"]) if request.args.get("quarter") else None
+        except ValueError:
+            year = quarter = None
+        if quarter is not None and not 1 <= quarter <= 4:
+            quarter = None
+
+        if year is None:
+            scale = max((abs(v) for v in months.values()), default=0)
+            overview = []
+            for y in sorted({y for y, _ in months}, reverse=True):
+                values = [months.get((y, m)) for m in range(1, 13)]
+                overview.append({
+                    "year": y,
+                    "total": round(sum(v for v in values if v is not None), 2),
+                    "months": [{"month": m, "pl": v, "level": _heat_level(v, scale)}
+                               for m, v in enumerate(values, start=1)],
+                })
+            return render_template("heatmap.html", overview=overview, year=None, month_names=MONTH_NAMES)
+
+        first_month = 1 if quarter is None else 3 * quarter - 2
+        last_month = 12 if quarter is None else first_month + 2
+        first = date(year, first_month, 1)
+        last = (date(year, last_month, 28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        weeks = heatmap_cache.get(
+            ("weeks", year, quarter),
+            lambda: _heatmap_weeks(first, last, _daily_pl(account_id, first, last)),
+            scope=account_id,
+        )
+        month_totals = [{"month": m, "name": MONTH_NAMES[m - 1], "pl": months.get((year, m))}
+                        for m in range(first_month, last_month + 1)]
+        return render_template(
+            "heatmap.html",
+            year=year,
+            quarter=quarter,
+            weeks=weeks,
+            month_totals=month_totals,
+            total=round(sum(m["pl"] for m in month_totals if m["pl"] is not None), 2),
+        )
+
+    @app.route("/export/<any(trades, days):kind>.<any(csv, tcol):fmt>", methods=["GET"])
+    def export_view(kind, fmt):
+        """
+        Streamed download of the current account's journal (or ?start=&end=&symbol=). ?gzip=1 compresses on the fly.
+        fmt "tcol" is the packed binary columnar format (about a quarter of the CSV) that import-trades reads back.
+        """
+        try:
+            start, end, symbol = _export_filters(request.args.get("start"), request.args.get("end"),
+                                                 request.args.get("symbol"), kind)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        compress = request.args.get("gzip") == "1"
+        if kind == "days" and recompute_scheduler.flush():
+            return jsonify({"error": "the ledger recompute failed; balances are not up to date"}), 503
+        account_id = _current_account()
+        filename = f"{kind}.{fmt}" + (".gz" if compress else "")
+        mimetype = "application/gzip" if compress else ("text/csv" if fmt == "csv" else "application/x-tcol")
+        resp = Response(_stream_export(kind, fmt, account_id, start, end, symbol, compress), mimetype=mimetype)
+        resp.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        resp.headers["X-Accel-Buffering"] = "no"  # let proxies pass chunks straight through
+        return resp
+
+    @app.route("/debug/metrics", methods=["GET"])
+    def debug_metrics():
+        """Prometheus text exposition of the per-endpoint SQL counters plus a few live gauges."""
+        pool = get_pool().stats()
+        gauges = {
+            "db_pool_open_connections": ("Connections currently open by the pool", pool["open"]),
+            "db_pool_idle_connections": ("Open connections waiting in the pool", pool["idle"]),
+            "ledger_version": ("Ledger writes seen by this process", ledger_version.value),
+            "ledger_recompute_pending": ("1 while a ledger recompute is pending or running",
+                                         int(recompute_scheduler.settling())),
+            "balance_index_days": ("Days held in the in-memory balance indexes",
+                                   sum(index.memory_days() for index in list(balance_indexes.values()))),
+            "journal_snapshot_bytes": ("Bytes held in the in-memory journal snapshots",
+                                       sum(snapshot.nbytes for snapshot in list(journal_snapshots.values()))),
+            "page_cache_entries": ("Rendered pages held in the page cache", len(page_cache)),
+            "page_cache_bytes": ("Bytes held in the page cache (all encodings)", page_cache.nbytes),
+            "page_cache_hits": ("Page requests served without rendering", page_cache.hits),
+            "page_cache_misses": ("Page requests that rendered their template", page_cache.misses),
+        }
+        return Response(metrics.render(gauges), mimetype="text/plain; version=0.0.4")
+
+    # the in-process ledger state, for the async entry point in asgi.py to share
+    app.extensions["ledger"] = SimpleNamespace(
+        accounts=_accounts,
+        balance_index=_balance_index,
+        balance_indexes=balance_indexes,
+        balance_ttl=balance_cache.ttl,
+        index_trade_change=_index_trade_change,
+        index_writes=_index_writes,
+        journal_snapshot=_journal_snapshot,
+        journal_snapshots=journal_snapshots,
+        snapshot_apply=_snapshot_apply,
+        calendar_cache=calendar_cache,
+        page_cache=page_cache,
+        ledger_etag=_ledger_etag,
+        report_queries=_report_queries,
+    )
+
+    if app.config["JOURNAL_SNAPSHOT"]:
+        try:
+            _warm_journal_snapshots()
+        except db_backend.Error as e:
+            print(f"⚠️ Journal snapshot not warmed ({e}); each account loads on its first read.")
 
     return app
 
@@ -0,0 +1,706 @@
+"""
+ASGI entry point. The hot routes of app.py (calendar, trades listing and detail, trade writes and
+the JSON API) run here as async Quart views on an aiomysql pool, so a request waiting on MySQL
+holds no thread and independent queries run concurrently. Every other route is passed to the
+Flask app through a WSGI bridge in the same process, sharing its caches and ledger state.
+
+    hypercorn asgi:application --bind 127.0.0.1:5000
+"""
+import asyncio
+import functools
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import aiomysql
+from asgiref.wsgi import WsgiToAsgi
+from quart import Quart, Response, flash, g, jsonify, redirect, render_template, request, session, url_for
+from werkzeug.exceptions import HTTPException
+
+from app import (
+    DEFAULT_ACCOUNT,
+    QueryStats,
+    _CALENDAR_DAYS_SQL,
+    _LOCK_DAYS_SQL,
+    _SNAPSHOT_TRADE_SQL,
+    _CALENDAR_WEEKS_SQL,
+    _SYMBOL_ADD_SQL,
+    _SYMBOL_ID_SQL,
+    _SYMBOL_INSERT_SQL,
+    _SYMBOL_REMOVE_SQL,
+    _SYMBOL_STATS_SQL,
+    _TRADES_COLUMNS,
+    _TRADES_COUNT_SQL,
+    _build_calendar_cells_from_index,
+    _calendar_cells_from_rows,
+    _columnar,
+    _decode_cursor,
+    _grid_range,
+    _json_value,
+    _optional_prices,
+    _page_key,
+    _query_stats,
+    _symbol_add_args,
+    _symbol_remove_args,
+    _trades_listing,
+    _trades_page_query,
+    _week_start,
+    app as wsgi_app,
+    db_backend,
+    ledger_version,
+    query_listeners,
+)
+
+if db_backend.name != "mysql":
+    raise RuntimeError(f"asgi.py runs its hot routes on aiomysql and needs DB_BACKEND=mysql, not {db_backend.name!r}; "
+                       "serve the Flask app (app:app) for the embedded SQLite backend.")
+
+quart_app = Quart(__name__)
+quart_app.secret_key = wsgi_app.secret_key  # same signed session cookie (account, flashes) as the Flask app
+for key in ("TZ", "LEDGER_MODE", "BALANCE_INDEX", "JOURNAL_SNAPSHOT", "TRADES_EXACT_COUNT_LIMIT", "LEDGER_ROW_LOCKS"):
+    quart_app.config[key] = wsgi_app.config[key]
+
+ledger = wsgi_app.extensions["ledger"]
+recompute_scheduler = wsgi_app.extensions["recompute_scheduler"]
+_pool = None
+
+class AsyncLedgerCache:
+    """
+    LedgerCache for coroutine loaders: an entry is valid while its scope's ledger version is unchanged
+    and it is younger than ttl seconds (0 = no expiry), so writes from other processes still show up.
+    """
+
+    def __init__(self, version, ttl=0):
+        self._version = version
+        self.ttl = ttl
+        self._entries = {}  # (scope, key) -> (version, stored_at, value)
+
+    async def get(self, key, loader, scope=None):
+        key = (scope, key)
+        current = self._version.get(scope)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == current and not (self.ttl and time.monotonic() - entry[1] > self.ttl):
+            return entry[2]
+        value = await loader()
+        self._entries[key] = (current, time.monotonic(), value)
+        return value
+
+    def forget(self, key, scope=None):
+        self._entries.pop((scope, key), None)
+
+cache = AsyncLedgerCache(ledger_version, ttl=ledger.balance_ttl)
+
+@quart_app.before_serving
+async def open_pool():
+    global _pool
+    _pool = await aiomysql.create_pool(
+        host=os.getenv("MYSQL_HOST", "127.0.0.1"),
+        port=int(os.getenv("MYSQL_PORT", "3306")),
+        user=os.getenv("MYSQL_USER", "root"),
+        password=os.getenv("MYSQL_PASSWORD", ""),
+        db=os.getenv("MYSQL_DB", "tradingview"),
+        autocommit=True,
+        charset="utf8mb4",
+        cursorclass=aiomysql.DictCursor,
+        minsize=1,
+        maxsize=int(os.getenv("ASYNC_POOL_SIZE", "20")),
+        pool_recycle=int(os.getenv("MYSQL_POOL_RECYCLE", "3600")),
+    )
+
+@quart_app.after_serving
+async def close_pool():
+    _pool.close()
+    await _pool.wait_closed()
+
+async def _execute(cur, sql, args=()):
+    """cur.execute, reported to the request's QueryStats and to query_listeners like the sync cursors."""
+    started = time.perf_counter()
+    try:
+        return await cur.execute(sql, args)
+    finally:
+        seconds = time.perf_counter() - started
+        rows = len(cur._rows) if cur._rows else 0
+        stats = _query_stats.get()
+        if stats is not None:
+            stats.record(sql, seconds, rows)
+        for listener in query_listeners:
+            listener(sql, seconds, rows)
+
+async def _fetchall(sql, args=()):
+    """One statement on its own pooled connection, so independent reads can be gathered."""
+    async with _pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await _execute(cur, sql, args)
+            return await cur.fetchall()
+
+async def _fetchone(sql, args=()):
+    rows = await _fetchall(sql, args)
+    return rows[0] if rows else None
+
+@asynccontextmanager
+async def _transaction():
+    """A cursor whose statements commit together, or not at all if the block raises."""
+    async with _pool.acquire() as conn:
+        await conn.begin()
+        try:
+            async with conn.cursor() as cur:
+                yield cur
+            await conn.commit()
+        except BaseException:
+            await conn.rollback()
+            raise
+
+async def _lock_ledger(cur, account_id, since):
+    """app._lock_ledger: lock the account's days from the week of `since` onwards (LEDGER_ROW_LOCKS)."""
+    if quart_app.config["LEDGER_ROW_LOCKS"]:
+        if isinstance(since, str):
+            since = date.fromisoformat(since[:10])
+        await _execute(cur, _LOCK_DAYS_SQL, (account_id, _week_start(since)))
+
+async def _symbol_id(cur, account_id, symbol):
+    """app._symbol_id: the account's symbols.id for symbol, adding the row on first use."""
+    await _execute(cur, _SYMBOL_ID_SQL, (account_id, symbol))
+    row = await cur.fetchone()
+    if row is None:
+        await _execute(cur, _SYMBOL_INSERT_SQL, (account_id, symbol))
+        await _execute(cur, _SYMBOL_ID_SQL, (account_id, symbol))
+        row = await cur.fetchone()
+    return row["id"]
+
+@quart_app.before_request
+async def start_request_stats():
+    # each ASGI request runs in its own task, so the ContextVar needs no reset afterwards
+    g.request_started = time.perf_counter()
+    g.query_stats = QueryStats()
+    _query_stats.set(g.query_stats)
+
+@quart_app.after_request
+async def add_server_timing(response):
+    stats = g.get("query_stats")
+    if stats is not None:
+        response.headers["Server-Timing"] = stats.server_timing(time.perf_counter() - g.request_started)
+    return response
+
+@quart_app.teardown_request
+async def finish_request_stats(exc):
+    stats = g.get("query_stats")
+    if stats is not None:
+        ledger.report_queries(request.endpoint or "unmatched", stats,
+                              time.perf_counter() - g.request_started, failed=exc is not None)
+
+async def _accounts(reload=False):
+    if reload:
+        cache.forget("accounts")
+    async def load():
+        rows = await _fetchall("SELECT id, name FROM TraderInfo ORDER BY id")
+        return {r["id"]: r["name"] for r in rows}
+    return await cache.get("accounts", load)
+
+@quart_app.before_request
+async def select_account():
+    """Same rules as app.select_account: ?account=<id>, else the session's, else DEFAULT_ACCOUNT."""
+    accounts = await _accounts()
+    requested = request.args.get("account")
+    account_id = session.get("account_id", DEFAULT_ACCOUNT)
+    if requested:
+        try:
+            account_id = int(requested)
+        except ValueError:
+            account_id = None
+    if account_id not in accounts and (account_id is None or account_id not in await _accounts(reload=True)):
+        if requested:
+            if request.path.startswith("/api/"):
+                return jsonify({"error": f"unknown account {requested}"}), 404
+            await flash(f"Unknown account {requested}.", "error")
+        account_id = DEFAULT_ACCOUNT
+        session.pop("account_id", None)
+    elif requested:
+        session["account_id"] = account_id
+    g.account_id = account_id
+    g.accounts = accounts
+
+async def _index(account_id):
+    """The account's BalanceIndex (None if disabled). A cold load runs in a worker thread."""
+    if not quart_app.config["BALANCE_INDEX"]:
+        return None
+    index = ledger.balance_indexes.get(account_id)
+    if index is not None and index.fresh(ledger.balance_ttl):
+        return index
+    return await asyncio.to_thread(ledger.balance_index, account_id)
+
+async def _snapshot(account_id):
+    """The account's JournalSnapshot (None if disabled). A cold load runs in a worker thread."""
+    if not quart_app.config["JOURNAL_SNAPSHOT"]:
+        return None
+    snapshot = ledger.journal_snapshots.get(account_id)
+    if snapshot is not None and snapshot.fresh(ledger.balance_ttl):
+        return snapshot
+    return await asyncio.to_thread(ledger.journal_snapshot, account_id)
+
+async def _snapshot_row(cur, account_id, trade_id):
+    """A written trade's JournalSnapshot row, read inside its transaction; None without a loaded snapshot."""
+    snapshot = ledger.journal_snapshots.get(account_id)
+    if snapshot is None or not snapshot.loaded:
+        return None
+    await _execute(cur, _SNAPSHOT_TRADE_SQL, (trade_id,))
+    row = await cur.fetchone()
+    return tuple(row.values()) if row else None
+
+async def _balance(account_id, starting_balance=False):
+    """Latest balance (or the starting balance); without the index both lookups run concurrently."""
+    index = await _index(account_id)
+    if index is not None:
+        if starting_balance:
+            return index.base
+        latest = index.latest_balance()
+        return index.base if latest is None else latest
+
+    async def load():
+        latest, trader = await asyncio.gather(
+            _fetchone("SELECT current_balance FROM days WHERE account_id = %s ORDER BY date DESC LIMIT 1",
+                      (account_id,)),
+            _fetchone("SELECT starting_balance FROM TraderInfo WHERE id = %s", (account_id,)),
+        )
+        base = float(trader["starting_balance"]) if trader and trader["starting_balance"] is not None else None
+        if latest and latest["current_balance"] is not None:
+            return float(latest["current_balance"]), base
+        return base, base
+
+    current, base = await cache.get("balances", load, scope=account_id)
+    return base if starting_balance else current
+
+@quart_app.context_processor
+async def inject_ledger():
+    account_id = g.get("account_id", DEFAULT_ACCOUNT)
+    return {
+        "current_balance": await _balance(account_id),
+        "ledger_settling": recompute_scheduler.settling(account_id),
+        "accounts": g.get("accounts", {}),
+        "account_id": account_id,
+    }
+
+async def _schedule_recompute(start_date, account_id):
+    if recompute_scheduler.deferred:
+        recompute_scheduler.schedule(start_date, key=account_id)
+    else:
+        await asyncio.to_thread(recompute_scheduler.schedule, start_date, account_id)
+
+async def _calendar_cells(account_id, year, month):
+    cells = ledger.calendar_cache.get(year, month, account_id)
+    if cells is None:
+        token = ledger.calendar_cache.token(account_id)
+        index = await _index(account_id)
+        if index is not None:
+            cells = _build_calendar_cells_from_index(index, year, month)
+        else:
+            first_day = date(year, month, 1)
+            last_day = (date(year, month, 28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+            start_grid, end_grid = _grid_range(year, month)
+            day_rows, weeks = await asyncio.gather(
+                _fetchall(_CALENDAR_DAYS_SQL, (account_id, first_day, last_day)),
+                _fetchall(_CALENDAR_WEEKS_SQL, (account_id, start_grid, end_grid)),
+            )
+            cells = _calendar_cells_from_rows(year, month, day_rows, weeks)
+        ledger.calendar_cache.put(year, month, cells, account_id, token)
+    return cells
+
+def _requested_month():
+    today = datetime.now(ZoneInfo(quart_app.config["TZ"])).date()
+    return int(request.args.get("year", today.year)), int(request.args.get("month", today.month))
+
+def _cached_page(view):
+    """app's page cache decorator for the async views, on the same PageCache."""
+    @functools.wraps(view)
+    async def wrapper(*args, **kwargs):
+        page_cache = ledger.page_cache
+        if not page_cache.max_size or session.get("_flashes"):
+            return await view(*args, **kwargs)
+        account_id = g.account_id
+        today = datetime.now(ZoneInfo(quart_app.config["TZ"])).date()
+        key = _page_key(request, account_id, today, recompute_scheduler.settling(account_id))
+        etag = ledger.ledger_etag(account_id, "page", *key)
+        page = page_cache.get(key, etag)
+        if page is None:
+            html = await view(*args, **kwargs)
+            if not isinstance(html, str):
+                return html
+            # compressing a large page would stall every other request on the loop
+            page = await asyncio.to_thread(page_cache.put, key, etag, html)
+        return page.response(Response, request)
+    return wrapper
+
+@quart_app.route("/", methods=["GET"])
+@_cached_page
+async def calendar_view():
+    year, month = _requested_month()
+    account_id = g.account_id
+    first_day = date(year, month, 1)
+    last_day = (first_day.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    # the header balance is read by the context processor; warm it alongside the grid
+    cells, starting_balance, _ = await asyncio.gather(
+        _calendar_cells(account_id, year, month),
+        _balance(account_id, starting_balance=True),
+        _balance(account_id),
+    )
+    prev_month = (first_day - timedelta(days=1)).replace(day=1)
+    next_month = last_day + timedelta(days=1)
+    return await render_template("calendar.html",
+                                 year=year, month=month,
+                                 cells=cells,
+                                 first_day=first_day,
+                                 prev_year=prev_month.year, prev_month=prev_month.month,
+                                 next_year=next_month.year, next_month=next_month.month,
+                                 starting_balance=starting_balance)
+
+async def _trades_total(account_id):
+    index = await _index(account_id)
+    if index is not None:
+        return index.trade_count(), True
+
+    async def load():
+        limit = quart_app.config["TRADES_EXACT_COUNT_LIMIT"]
+        row = await _fetchone(_TRADES_COUNT_SQL, (account_id, limit + 1))
+        cnt = int(row["cnt"]) if row and row.get("cnt") is not None else 0
+        return (limit, False) if cnt > limit else (cnt, True)
+    return await cache.get("trades_total", load, scope=account_id)
+
+async def _symbol_stats(account_id):
+    """app._symbol_stats: {symbol: symbols row} from the rollup."""
+    async def load():
+        return {r["symbol"]: r for r in await _fetchall(_SYMBOL_STATS_SQL, (account_id,))}
+    return await cache.get("symbols", load, scope=account_id)
+
+async def _trades_page(account_id, per_page, after=None, before=None, symbol=None):
+    """app._fetch_trades_page, with the page and the total fetched concurrently."""
+    after_key = _decode_cursor(after)
+    before_key = _decode_cursor(before) if not after_key else None
+    if symbol is not None:
+        stats = (await _symbol_stats(account_id)).get(symbol)
+        if stats is None:
+            return _trades_listing([], per_page, after_key, before_key, 0, True)
+        rows = await _fetchall(*_trades_page_query(account_id, per_page, after_key, before_key, stats["id"]))
+        return _trades_listing(rows, per_page, after_key, before_key, stats["trades"], True)
+    snapshot = await _snapshot(account_id)
+    if snapshot is not None:
+        return _trades_listing(snapshot.page(per_page, after_key, before_key), per_page, after_key, before_key,
+                               len(snapshot), True)
+    rows, (total, total_exact) = await asyncio.gather(
+        _fetchall(*_trades_page_query(account_id, per_page, after_key, before_key)),
+        _trades_total(account_id),
+    )
+    return _trades_listing(rows, per_page, after_key, before_key, total, total_exact)
+
+def _symbol_arg():
+    return (request.args.get("symbol") or "").strip().upper() or None
+
+def _per_page():
+    try:
+        per_page = int(request.args.get("per_page", "10"))
+    except ValueError:
+        per_page = 20
+    return per_page if per_page > 0 else 20
+
+@quart_app.route("/trades", methods=["GET"])
+@_cached_page
+async def trades_view():
+    per_page = _per_page()
+    symbol = _symbol_arg()
+    listing, symbols = await asyncio.gather(
+        _trades_page(g.account_id, per_page, request.args.get("after"), request.args.get("before"), symbol),
+        _symbol_stats(g.account_id),
+    )
+    return await render_template("trades.html", per_page=per_page, symbol=symbol, symbols=sorted(symbols), **listing)
+
+@quart_app.route("/trades/<int:trade_id>", methods=["GET"])
+async def trade_detail(trade_id):
+    """The trade from the journal snapshot and its day from the balance index, else both in one joined read."""
+    account_id = g.account_id
+    snapshot, index = await asyncio.gather(_snapshot(account_id), _index(account_id))
+    row = snapshot.get(trade_id) if snapshot is not None else None
+    if row is None or index is None or not index.has_day(row["trade_date"]):
+        row = await _fetchone("""
+            SELECT t.id, t.trade_date, t.symbol, t.position_size, t.entry_price, t.exit_price,
+                   t.stop_loss, t.take_profit, t.profit, t.risk_at_entry, t.r_multiple, t.reward_risk,
+                   d.`date`, d.entry_balance, d.day_pl, d.current_balance, d.risk10
+            FROM trades t
+            LEFT JOIN days d ON d.id = t.day_id
+            WHERE t.id = %s AND t.account_id = %s
+        """, (trade_id, account_id))
+    if not row:
+        await flash("Trade not found.", "error")
+        return redirect(url_for("trades_view"))
+
+    trade = row
+    day = None
+    if row["trade_date"] is not None and index is not None and index.has_day(row["trade_date"]):
+        d = row["trade_date"]
+        day = {
+            "date": d,
+            "entry_balance": index.balance_before(d),
+            "day_pl": index.day_pl(d),
+            "current_balance": index.balance_at(d),
+            "risk10": index.risk10_at(d),
+        }
+    elif row.get("date") is not None:
+        day = {
+            "date": row["date"],
+            "entry_balance": float(row["entry_balance"]),
+            "day_pl": float(row["day_pl"]),
+            "current_balance": float(row["current_balance"]),
+            "risk10": row["risk10"],
+        }
+    return await render_template("trade_detail.html", trade=trade, day=day)
+
+async def create_trade():
+    """app.create_trade for the trigger-maintained ledger, in one transaction."""
+    form = await request.form
+    symbol = form.get("symbol", "").strip().upper()
+    position_size = form.get("position_size")
+    entry_price = form.get("entry_price")
+    exit_price = form.get("exit_price")
+    trade_date = form.get("trade_date")
+    account_id = g.account_id
+
+    if not (symbol and position_size and entry_price and exit_price and trade_date):
+        await flash("All fields are required.", "error")
+        return redirect(request.referrer or url_for("calendar_view"))
+    try:
+        stop_loss, take_profit = _optional_prices(form)
+    except ValueError:
+        await flash("Stop loss and take profit must be numbers.", "error")
+        return redirect(request.referrer or url_for("calendar_view"))
+
+    try:
+        with ledger.index_writes(account_id):
+            async with _transaction() as cur:
+                await _lock_ledger(cur, account_id, trade_date)
+                symbol_id = await _symbol_id(cur, account_id, symbol)
+                await _execute(cur, """
+                    INSERT INTO trades (account_id, symbol_id, symbol, position_size, entry_price, exit_price,
+                                        stop_loss, take_profit, trade_date)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, (account_id, symbol_id, symbol, float(position_size), float(entry_price), float(exit_price),
+                      stop_loss, take_profit, trade_date))
+                trade_id = cur.lastrowid
+                await _execute(cur, "SELECT profit FROM trades WHERE id = %s", (trade_id,))
+                profit = (await cur.fetchone())["profit"]
+                await _execute(cur, _SYMBOL_ADD_SQL, _symbol_add_args(symbol_id, profit, trade_date))
+                snapshot_row = await _snapshot_row(cur, account_id, trade_id)
+            ledger.index_trade_change(account_id, trade_date, profit, 1)
+        ledger.snapshot_apply(account_id, trade_id, snapshot_row)
+        ledger_version.bump(account_id)
+        await flash(f"Trade {symbol} added for {trade_date}.", "ok")
+        await _schedule_recompute(trade_date, account_id)
+    except Exception as e:
+        await flash(f"DB error: {e}", "error")
+
+    if request.referrer and "/trades" in request.referrer:
+        return redirect(url_for("trades_view"))
+    return redirect(url_for("calendar_view", year=trade_date[:4], month=int(trade_date[5:7])))
+
+# drop a day once its last trade is gone, then its week once its last day is
+_DELETE_EMPTY_DAY = "DELETE FROM days WHERE id = %s AND NOT EXISTS (SELECT 1 FROM trades WHERE day_id = %s)"
+_DELETE_EMPTY_WEEK = "DELETE FROM weeks WHERE id = %s AND NOT EXISTS (SELECT 1 FROM days WHERE week_id = %s)"
+
+async def _drop_if_empty(cur, day_id, week_id):
+    await _execute(cur, _DELETE_EMPTY_DAY, (day_id, day_id))
+    if cur.rowcount and week_id is not None:
+        await _execute(cur, _DELETE_EMPTY_WEEK, (week_id, week_id))
+
+_TRADE_WITH_WEEK_SQL = """
+    SELECT t.trade_date, t.day_id, t.symbol_id, t.profit, d.week_id
+    FROM trades t
+    LEFT JOIN days d ON d.id = t.day_id
+    WHERE t.id = %s AND t.account_id = %s
+    FOR UPDATE OF t
+"""
+
+async def delete_trade(trade_id):
+    """app.delete_trade with fewer statements: the trade and its week in one read, conditional cleanups."""
+    account_id = g.account_id
+    row = None
+    try:
+        with ledger.index_writes(account_id):
+            async with _transaction() as cur:
+                await _execute(cur, _TRADE_WITH_WEEK_SQL, (trade_id, account_id))
+                row = await cur.fetchone()
+                if row:
+                    if row["trade_date"]:
+                        await _lock_ledger(cur, account_id, row["trade_date"])
+                    await _execute(cur, "DELETE FROM trades WHERE id = %s", (trade_id,))
+                    if row["symbol_id"] is not None:
+                        await _execute(cur, _SYMBOL_REMOVE_SQL, _symbol_remove_args(row["symbol_id"], row["profit"]))
+                    if row["day_id"] is not None:
+                        await _drop_if_empty(cur, row["day_id"], row["week_id"])
+            if not row:
+                await flash("Trade not found.", "error")
+                return redirect(request.referrer or url_for("trades_view"))
+            if row["trade_date"]:
+                ledger.index_trade_change(account_id, row["trade_date"], -row["profit"], -1)
+        if row["trade_date"]:
+            await _schedule_recompute(row["trade_date"], account_id)
+        ledger.snapshot_apply(account_id, trade_id, None)
+        ledger_version.bump(account_id)
+        await flash("Trade deleted.", "ok")
+    except Exception as e:
+        await flash(f"DB error: {e}", "error")
+    return redirect(request.referrer or url_for("trades_view"))
+
+async def edit_trade(trade_id):
+    account_id = g.account_id
+    if request.method == "GET":
+        trade = await _fetchone(f"SELECT {_TRADES_COLUMNS} FROM trades WHERE id = %s AND account_id = %s",
+                                (trade_id, account_id))
+        if not trade:
+            await flash("Trade not found.", "error")
+            return redirect(url_for("trades_view"))
+        return await render_template("trade_edit.html", trade=trade)
+
+    form = await request.form
+    symbol = form.get("symbol", "").strip().upper()
+    position_size = form.get("position_size")
+    entry_price = form.get("entry_price")
+    exit_price = form.get("exit_price")
+    trade_date = form.get("trade_date")
+    if not (symbol and position_size and entry_price and exit_price and trade_date):
+        await flash("All required fields are required.", "error")
+        return redirect(request.referrer or url_for("edit_trade", trade_id=trade_id))
+
+    try:
+        stop_loss, take_profit = _optional_prices(form)
+        with ledger.index_writes(account_id):
+            async with _transaction() as cur:
+                await _execute(cur, _TRADE_WITH_WEEK_SQL, (trade_id, account_id))
+                old = await cur.fetchone()
+                if old:
+                    # moving a trade affects both its old and new date; lock and recompute from the earlier one
+                    recompute_start = date.fromisoformat(trade_date)
+                    if old["trade_date"]:
+                        recompute_start = min(recompute_start, old["trade_date"])
+                    await _lock_ledger(cur, account_id, recompute_start)
+                    # the trigger creates the week (and balances) of a new day
+                    await _execute(cur, "SELECT id FROM days WHERE account_id = %s AND `date` = %s LIMIT 1",
+                                   (account_id, trade_date))
+                    nd = await cur.fetchone()
+                    if nd:
+                        new_day_id = nd["id"]
+                    else:
+                        await _execute(cur, "INSERT INTO days(account_id, `date`) VALUES (%s, %s)",
+                                       (account_id, trade_date))
+                        new_day_id = cur.lastrowid
+                    symbol_id = await _symbol_id(cur, account_id, symbol)
+                    await _execute(cur, """
+                        UPDATE trades
+                        SET symbol_id = %s, symbol = %s, position_size = %s, entry_price = %s, exit_price = %s,
+                            stop_loss = %s, take_profit = %s, trade_date = %s, day_id = %s
+                        WHERE id = %s
+                    """, (symbol_id, symbol, float(position_size), float(entry_price), float(exit_price), stop_loss,
+                          take_profit, trade_date, new_day_id, trade_id))
+                    await _execute(cur, "SELECT profit FROM trades WHERE id = %s", (trade_id,))
+                    new_profit = (await cur.fetchone())["profit"]
+                    if old["symbol_id"] is not None:
+                        await _execute(cur, _SYMBOL_REMOVE_SQL, _symbol_remove_args(old["symbol_id"], old["profit"]))
+                    await _execute(cur, _SYMBOL_ADD_SQL, _symbol_add_args(symbol_id, new_profit, trade_date))
+                    snapshot_row = await _snapshot_row(cur, account_id, trade_id)
+                    if old["day_id"] is not None and old["day_id"] != new_day_id:
+                        await _drop_if_empty(cur, old["day_id"], old["week_id"])
+            if not old:
+                await flash("Trade not found.", "error")
+                return redirect(request.referrer or url_for("trades_view"))
+
+            if old["trade_date"]:
+                ledger.index_trade_change(account_id, old["trade_date"], -old["profit"], -1)
+            ledger.index_trade_change(account_id, trade_date, new_profit, 1)
+        ledger.snapshot_apply(account_id, trade_id, snapshot_row)
+        ledger_version.bump(account_id)
+        await flash("Trade updated.", "ok")
+        await _schedule_recompute(recompute_start, account_id)
+    except Exception as e:
+        await flash(f"DB error: {e}", "error")
+    return redirect(url_for("trades_view"))
+
+# With LEDGER_MODE=app the writes also maintain days/weeks in Python; those stay on the Flask views.
+if quart_app.config["LEDGER_MODE"] != "app":
+    quart_app.add_url_rule("/trades/new", "create_trade", create_trade, methods=["POST"])
+    quart_app.add_url_rule("/trades/<int:trade_id>/delete", "delete_trade", delete_trade, methods=["POST"])
+    quart_app.add_url_rule("/trades/<int:trade_id>/edit", "edit_trade", edit_trade, methods=["GET", "POST"])
+
+async def _conditional_json(etag, build):
+    """app._conditional_json with an async build()."""
+    if request.if_none_match.contains(etag):
+        resp = Response("", status=304)
+    else:
+        resp = jsonify(await build())
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+@quart_app.route("/api/calendar", methods=["GET"])
+async def api_calendar():
+    year, month = _requested_month()
+    fmt = request.args.get("format", "rows")
+    account_id = g.account_id
+
+    async def build():
+        cells, starting_balance, current_balance = await asyncio.gather(
+            _calendar_cells(account_id, year, month),
+            _balance(account_id, starting_balance=True),
+            _balance(account_id),
+        )
+        columns = ("date", "in_month", "day_pl", "week_pl", "risk10", "daily_risk")
+        return {
+            "account_id": account_id,
+            "year": year,
+            "month": month,
+            "starting_balance": starting_balance,
+            "current_balance": current_balance,
+            "settling": recompute_scheduler.settling(account_id),
+            "cells": (_columnar(cells, columns) if fmt == "columns"
+                      else [{c: _json_value(cell[c]) for c in columns} for cell in cells]),
+        }
+
+    return await _conditional_json(ledger.ledger_etag(account_id, "calendar", year, month, fmt), build)
+
+@quart_app.route("/api/trades", methods=["GET"])
+async def api_trades():
+    per_page = _per_page()
+    after = request.args.get("after")
+    before = request.args.get("before")
+    symbol = _symbol_arg()
+    fmt = request.args.get("format", "rows")
+    account_id = g.account_id
+
+    async def build():
+        listing = await _trades_page(account_id, per_page, after, before, symbol)
+        columns = ("id", "trade_date", "symbol", "position_size", "entry_price", "exit_price", "stop_loss",
+                   "take_profit", "profit", "risk_at_entry", "r_multiple", "reward_risk")
+        trades = listing.pop("trades")
+        listing["trades"] = (_columnar(trades, columns) if fmt == "columns"
+                             else [{c: _json_value(t[c]) for c in columns} for t in trades])
+        return listing
+
+    return await _conditional_json(ledger.ledger_etag(account_id, "trades", per_page, after, before, symbol, fmt), build)
+
+# Register the Flask app's remaining rules without views, so url_for() in the shared templates
+# can build them; requests for them are dispatched to the Flask app below.
+for rule in wsgi_app.url_map.iter_rules():
+    if rule.endpoint != "static" and rule.endpoint not in quart_app.view_functions:
+        quart_app.add_url_rule(rule.rule, rule.endpoint, methods=rule.methods)
+
+_wsgi = WsgiToAsgi(wsgi_app)
+
+def _is_async_route(scope):
+    try:
+        endpoint, _ = quart_app.url_map.bind("").match(scope["path"], method=scope["method"])
+    except HTTPException:
+        return False
+    return quart_app.view_functions.get(endpoint) is not None
+
+async def application(scope, receive, send):
+    """Async views where asgi.py has one; everything else (and 404s) is served by the Flask app."""
+    if scope["type"] == "http" and not _is_async_route(scope):
+        await _wsgi(scope, receive, send)
+    else:
+        await quart_app(scope, receive, send)
@@ -0,0 +1,10 @@
+"""
+Reproducible benchmarks for the ledger, calendar and trade-write paths.
+
+    python -m benchmarks run --sizes 1000,100000 --out results.json
+    python -m benchmarks compare before.json after.json
+
+Each run rebuilds a throwaway MySQL database (MYSQL_DB with a "_bench" suffix by default),
+fills it with a deterministic synthetic journal and times the hot paths through the real
+Flask routes, counting SQL round trips per request.
+"""
@@ -0,0 +1,56 @@
+import os
+
+import click
+from dotenv import load_dotenv
+
+from . import runner
+
+@click.group()
+def cli():
+    """Trading calendar benchmarks."""
+
+@cli.command()
+@click.option("--sizes", default="1000,100000", show_default=True,
+              help="Comma-separated journal sizes (number of trades).")
+@click.option("--backend", type=click.Choice(["mysql", "sqlite"]), default="mysql", show_default=True)
+@click.option("--database", default=None,
+              help="Throwaway database (SQLite: file) to (re)build. Default: MYSQL_DB / SQLITE_PATH + '_bench'.")
+@click.option("--ledger-mode", type=click.Choice(["triggers", "app"]), default=None,
+              help="Default: triggers on MySQL; SQLite always runs the app-maintained ledger.")
+@click.option("--recompute", type=click.Choice(["sync", "deferred"]), default="sync", show_default=True,
+              help="sync includes the ledger recompute in the write timings.")
+@click.option("--repeat", default=20, show_default=True, help="Warm iterations per scenario.")
+@click.option("--writers", default="1,4,8", show_default=True,
+              help="Comma-separated thread counts for the concurrent-writers scenario.")
+@click.option("--out", default=None, help="Write JSON results to this file.")
+def run(sizes, backend, database, ledger_mode, recompute, repeat, writers, out):
+    """Build synthetic journals and time the hot paths."""
+    load_dotenv()
+    if backend == "sqlite":
+        if ledger_mode == "triggers":
+            raise click.UsageError("The SQLite backend has no ledger triggers; use --ledger-mode app.")
+        ledger_mode = "app"
+        live = os.getenv("SQLITE_PATH", "tradingview.sqlite3")
+        stem, ext = os.path.splitext(live)
+        database = database or stem + "_bench" + ext
+        if os.path.abspath(database) == os.path.abspath(live):
+            raise click.UsageError("Refusing to benchmark against SQLITE_PATH itself; every run drops and recreates the schema.")
+    else:
+        ledger_mode = ledger_mode or "triggers"
+        database = database or os.getenv("MYSQL_DB", "tradingview") + "_bench"
+        if database == os.getenv("MYSQL_DB", "tradingview"):
+            raise click.UsageError("Refusing to benchmark against MYSQL_DB itself; every run drops and recreates the schema.")
+    runner.run([int(s) for s in sizes.split(",")], database, ledger_mode, recompute, repeat, out,
+               tuple(int(w) for w in writers.split(",")), backend)
+
+@cli.command()
+@click.argument("before", type=click.Path(exists=True, dir_okay=False))
+@click.argument("after", type=click.Path(exists=True, dir_okay=False))
+@click.option("--threshold", default=0.10, show_default=True, help="Slowdown ratio reported as a regression.")
+def compare(before, after, threshold):
+    """Compare two result files; exits 1 if anything regressed."""
+    if runner.compare(before, after, threshold):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    cli()
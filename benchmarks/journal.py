@@ -0,0 +1,44 @@
+import csv
+import random
+from datetime import date, timedelta
+
+SYMBOLS = ("AAPL", "MSFT", "NVDA", "TSLA", "AMZN", "META", "GOOG", "AMD", "SPY", "QQQ")
+
+def years_for(trades):
+    """Spread larger journals over more history: 1k -> 1y, 100k -> 5y, 1M -> 10y."""
+    if trades <= 10_000:
+        return 1
+    if trades <= 100_000:
+        return 5
+    return 10
+
+def synthetic_trades(count, years=None, end=date(2025, 12, 31), seed=42):
+    """
+    Yield `count` trade dicts on weekdays over the last `years` years, in date order.
+    The same arguments always produce the same journal.
+    """
+    rng = random.Random(seed)
+    years = years or years_for(count)
+    start = end - timedelta(days=365 * years)
+    weekdays = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    weekdays = [d for d in weekdays if d.weekday() < 5]
+
+    per_day, extra = divmod(count, len(weekdays))
+    for i, d in enumerate(weekdays):
+        for _ in range(per_day + (1 if i < extra else 0)):
+            entry = round(rng.uniform(20, 500), 2)
+            yield {
+                "symbol": rng.choice(SYMBOLS),
+                "position_size": rng.randint(1, 20),
+                "entry_price": entry,
+                "exit_price": round(entry * rng.uniform(0.97, 1.03), 2),
+                "trade_date": d.isoformat(),
+            }
+
+def write_csv(path, trades):
+    fields = ("symbol", "position_size", "entry_price", "exit_price", "trade_date")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for t in trades:
+            writer.writerow(t)
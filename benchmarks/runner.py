@@ -0,0 +1,288 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from .journal import synthetic_trades, write_csv
+
+class Queries:
+    """Round trips seen by the app's query listener since the last reset."""
+    count = 0
+
+    @classmethod
+    def listener(cls, sql, seconds, rows):
+        cls.count += 1
+
+def _timed(call):
+    Queries.count = 0
+    started = time.perf_counter()
+    call()
+    return (time.perf_counter() - started) * 1000, Queries.count
+
+def _summary(name, size, cold, warm):
+    warm_ms = sorted(ms for ms, _ in warm)
+    return {
+        "scenario": name,
+        "size": size,
+        "cold_ms": round(cold[0], 3),
+        "cold_queries": cold[1],
+        "warm_ms_median": round(statistics.median(warm_ms), 3) if warm_ms else None,
+        "warm_ms_p95": round(warm_ms[max(0, int(len(warm_ms) * 0.95) - 1)], 3) if warm_ms else None,
+        "warm_queries": warm[-1][1] if warm else None,
+    }
+
+def _git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class BenchRun:
+    """
+    One benchmark session against a throwaway database. The app module is imported only
+    after the environment points it at that database.
+    """
+
+    def __init__(self, database, ledger_mode, recompute, repeat, writers=(1,), backend="mysql"):
+        os.environ["DB_BACKEND"] = backend
+        # the throwaway database is a MySQL schema, or an SQLite file
+        os.environ["SQLITE_PATH" if backend == "sqlite" else "MYSQL_DB"] = database
+        # every concurrent writer holds a pooled connection, plus the harness's own queries
+        os.environ["MYSQL_POOL_SIZE"] = str(max(int(os.getenv("MYSQL_POOL_SIZE", "10")), max(writers) + 2))
+        os.environ["LEDGER_MODE"] = ledger_mode
+        os.environ["LEDGER_RECOMPUTE"] = recompute
+        os.environ["SQL_INSTRUMENTATION"] = "1"
+        os.environ.setdefault("SLOW_REQUEST_MS", "60000")
+        import app as appmod
+
+        self.appmod = appmod
+        self.database = database
+        self.repeat = repeat
+        self.writers = writers
+        self.server_version = appmod.db_backend.create_database(database)
+        appmod.query_listeners.append(Queries.listener)
+
+    def fresh_app(self):
+        """A new app instance: empty balance/calendar/count caches, i.e. a cold process."""
+        return self.appmod.create_app()
+
+    def query(self, sql, args=()):
+        conn = self.appmod.get_db()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql, args)
+                return cur.fetchall()
+        finally:
+            conn.close()
+
+    def reset_schema(self):
+        """Drop every table (and with them the triggers) of the throwaway database."""
+        conn = self.appmod._connect()
+        try:
+            with conn.cursor() as cur:
+                self.appmod.db_backend.drop_all_tables(cur)
+        finally:
+            conn.close()
+
+    def load_journal(self, size):
+        self.reset_schema()
+        application = self.fresh_app()
+        runner = application.test_cli_runner()
+        result = runner.invoke(args=["migrate"])
+        if result.exit_code != 0:
+            raise RuntimeError(f"migrate failed: {result.output}")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "journal.csv")
+            write_csv(path, synthetic_trades(size))
+            cold = _timed(lambda: runner.invoke(args=["import-trades", path], catch_exceptions=False))
+        return _summary("import_trades", size, cold, [])
+
+    def scenario(self, name, size, make_call):
+        """Time make_call(app)() once on a fresh app (cold), then `repeat` more times (warm)."""
+        call = make_call(self.fresh_app())
+        cold = _timed(call)
+        warm = [_timed(call) for _ in range(self.repeat)]
+        return _summary(name, size, cold, warm)
+
+    def run_size(self, size):
+        results = [self.load_journal(size)]
+        bounds = self.query("SELECT MIN(`date`) AS first, MAX(`date`) AS last FROM days")[0]
+        # str() first: SQLite returns MIN/MAX over a DATE column as ISO text
+        first, last = (date.fromisoformat(str(bounds[k])) for k in ("first", "last"))
+        middle = date.fromordinal((first.toordinal() + last.toordinal()) // 2)
+        deep = self.query("""
+            SELECT trade_date, id FROM trades ORDER BY trade_date ASC, id ASC LIMIT 1 OFFSET %s
+        """, (size // 10,))[0]
+        deep_cursor = self.appmod._encode_cursor(deep)
+
+        def get(path, status=200, **kwargs):
+            def make(application):
+                client = application.test_client()
+                def call():
+                    resp = client.get(path, **kwargs)
+                    assert resp.status_code == status, (path, resp.status_code)
+                return call
+            return make
+
+        def recompute(application):
+            scheduler = application.extensions["recompute_scheduler"]
+            def call():
+                scheduler.schedule(first)
+                assert not scheduler.flush(), "ledger recompute failed"
+            return call
+
+        def conditional_calendar(application):
+            client = application.test_client()
+            etag = client.get(f"/api/calendar?year={middle.year}&month={middle.month}").headers["ETag"]
+            def call():
+                resp = client.get(f"/api/calendar?year={middle.year}&month={middle.month}",
+                                  headers={"If-None-Match": etag})
+                assert resp.status_code == 304
+            return call
+
+        results.append(self.scenario("calendar_view", size, get(f"/?year={middle.year}&month={middle.month}")))
+        results.append(self.scenario("api_calendar_304", size, conditional_calendar))
+        results.append(self.scenario("trades_view_first_page", size, get("/trades?per_page=50")))
+        results.append(self.scenario("trades_view_deep_page", size, get(f"/trades?per_page=50&after={deep_cursor}")))
+        results.append(self.scenario("recompute_full_history", size, recompute))
+        results.extend(self.backdated_writes(size, first))
+        for n in self.writers:
+            results.append(self.concurrent_writes(size, first, n))
+        return results
+
+    def backdated_writes(self, size, first):
+        """create_trade then delete_trade on the oldest day, so each pair leaves the journal unchanged."""
+        client = self.fresh_app().test_client()
+        creates, deletes = [], []
+        for _ in range(self.repeat + 1):
+            creates.append(_timed(lambda: client.post("/trades/new", data={
+                "symbol": "BENCH", "position_size": "1", "entry_price": "100", "exit_price": "101",
+                "trade_date": first.isoformat(),
+            })))
+            trade_id = self.query("SELECT MAX(id) AS id FROM trades")[0]["id"]
+            deletes.append(_timed(lambda: client.post(f"/trades/{trade_id}/delete")))
+        return [
+            _summary("create_trade_backdated", size, creates[0], creates[1:]),
+            _summary("delete_trade_backdated", size, deletes[0], deletes[1:]),
+        ]
+
+    def concurrent_writes(self, size, first, writers):
+        """
+        `writers` threads, each running `repeat` create/delete pairs in the oldest week at once, so
+        every write locks (and recomputes) the whole history. Reports writes/sec, per-write latency
+        and whether the ledger is still consistent afterwards.
+        """
+        application = self.fresh_app()
+        latencies = []
+        errors = []
+        start = threading.Barrier(writers)
+
+        def writer(n):
+            client = application.test_client()
+            symbol = f"BENCH{n}"
+            try:
+                start.wait()
+                for i in range(self.repeat):
+                    day = first + timedelta(days=(n + i) % 7)
+                    started = time.perf_counter()
+                    resp = client.post("/trades/new", data={
+                        "symbol": symbol, "position_size": "1", "entry_price": "100", "exit_price": "101",
+                        "trade_date": day.isoformat(),
+                    })
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    assert resp.status_code == 302, resp.status_code
+                    trade_id = self.query("SELECT MAX(id) AS id FROM trades WHERE symbol = %s", (symbol,))[0]["id"]
+                    started = time.perf_counter()
+                    resp = client.post(f"/trades/{trade_id}/delete")
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    assert resp.status_code == 302, resp.status_code
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+        Queries.count = 0
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert not application.extensions["recompute_scheduler"].flush(), "ledger recompute failed"
+        seconds = time.perf_counter() - started
+        if errors:
+            raise errors[0]
+
+        check = application.test_cli_runner().invoke(args=["check-ledger"])
+        latencies.sort()
+        return {
+            "scenario": f"concurrent_writes_x{writers}",
+            "size": size,
+            "cold_ms": round(seconds * 1000, 3),
+            "cold_queries": Queries.count,
+            "warm_ms_median": round(statistics.median(latencies), 3),
+            "warm_ms_p95": round(latencies[max(0, int(len(latencies) * 0.95) - 1)], 3),
+            "warm_queries": round(Queries.count / len(latencies)),
+            "writes_per_sec": round(len(latencies) / seconds, 1),
+            "consistent": check.exit_code == 0,
+        }
+
+def run(sizes, database, ledger_mode="triggers", recompute="sync", repeat=20, out=None, writers=(1,), backend="mysql"):
+    bench = BenchRun(database, ledger_mode, recompute, repeat, writers, backend)
+    results = []
+    for size in sizes:
+        print(f"▶ {size:,} trades")
+        for r in bench.run_size(size):
+            print(f"  {r['scenario']:<26} cold {r['cold_ms']:>10.1f} ms / {r['cold_queries']:>5} q"
+                  + (f"   warm {r['warm_ms_median']:>9.1f} ms / {r['warm_queries']:>5} q"
+                     if r["warm_ms_median"] is not None else "")
+                  + (f"   {r['writes_per_sec']:>7.1f} writes/s" + ("" if r["consistent"] else "  ⚠️ ledger inconsistent")
+                     if "writes_per_sec" in r else ""))
+            results.append(r)
+    report = {
+        "meta": {
+            "revision": _git_revision(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "backend": backend,
+            "server": bench.server_version,
+            "ledger_mode": ledger_mode,
+            "recompute": recompute,
+            "repeat": repeat,
+            "row_locks": os.getenv("LEDGER_ROW_LOCKS", "1") == "1",
+        },
+        "results": results,
+    }
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results written to {out}")
+    return report
+
+def compare(before_path, after_path, threshold=0.10):
+    """Print per-scenario deltas; returns the number of regressions beyond threshold."""
+    with open(before_path, encoding="utf-8") as f:
+        before = {(r["scenario"], r["size"]): r for r in json.load(f)["results"]}
+    with open(after_path, encoding="utf-8") as f:
+        after = json.load(f)["results"]
+
+    regressions = 0
+    for r in after:
+        old = before.get((r["scenario"], r["size"]))
+        if old is None:
+            continue
+        metric = "warm_ms_median" if r["warm_ms_median"] is not None else "cold_ms"
+        was, now = old[metric], r[metric]
+        change = (now - was) / was if was else 0.0
+        query_key = "warm_queries" if metric == "warm_ms_median" else "cold_queries"
+        flag = ""
+        if change > threshold or r[query_key] > old[query_key]:
+            flag = "  ⚠️ regression"
+            regressions += 1
+        print(f"{r['scenario']:<26} {r['size']:>9,}  {was:>10.1f} -> {now:>10.1f} ms ({change:+.0%})"
+              f"  queries {old[query_key]} -> {r[query_key]}{flag}")
+    return regressions
@@ -1,59 +1,46 @@
 -- ========================================
--- 🧠 TRADING JOURNAL (MySQL 8) — CLEAN BUILD
--- ========================================
-
-CREATE DATABASE IF NOT EXISTS tradingview CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
-
--- 🧱 1️⃣ RESET STRUCTURE
-DROP TRIGGER IF EXISTS trg_bi_days_fill_week_and_balances;
-
-DROP TRIGGER IF EXISTS trg_bi_trades_attach_day;
-
-DROP TRIGGER IF EXISTS trg_ai_trades_recalc_day;
-
-DROP TRIGGER IF EXISTS trg_au_trades_recalc_day;
-
-DROP TRIGGER IF EXISTS trg_ad_trades_recalc_day;
-
-DROP TABLE IF EXISTS TraderInfo;
-
-DROP TABLE IF EXISTS trades;
-
-DROP TABLE IF EXISTS days;
-
-DROP TABLE IF EXISTS weeks;
-
--- ========================================
--- 📆 TABLES
+-- 0001 — initial schema (MySQL 8): accounts, weeks/days/trades ledger, months rollup, triggers
 -- ========================================
+-- An existing database built from the old tradingview_structure.sql is recorded as being at this
+-- version by `flask migrate` without running it. With LEDGER_MODE=app the CREATE TRIGGER
+-- statements are skipped.
 
+-- one row per trading account; every ledger row below belongs to one of them
 CREATE TABLE TraderInfo (
     id INT PRIMARY KEY AUTO_INCREMENT,
+    name VARCHAR(64) NOT NULL DEFAULT 'Main',
     starting_balance DECIMAL(12, 2) NOT NULL DEFAULT 2000.00
 ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
 
 CREATE TABLE weeks (
     id INT PRIMARY KEY AUTO_INCREMENT,
+    account_id INT NOT NULL DEFAULT 1,
     start_date DATE NOT NULL,
     end_date DATE NOT NULL,
     starting_balance DECIMAL(12, 2) NOT NULL DEFAULT 2000.00,
-    week_pl DECIMAL(12, 2) NOT NULL DEFAULT 0.00
+    week_pl DECIMAL(12, 2) NOT NULL DEFAULT 0.00,
+    UNIQUE KEY uq_weeks_account_start (account_id, start_date),
+    CONSTRAINT fk_weeks_account FOREIGN KEY (account_id) REFERENCES TraderInfo (id) ON DELETE CASCADE
 ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
 
 CREATE TABLE days (
     id INT PRIMARY KEY AUTO_INCREMENT,
-    `date` DATE NOT NULL UNIQUE,
+    account_id INT NOT NULL DEFAULT 1,
+    `date` DATE NOT NULL,
     week_id INT NULL,
     entry_balance DECIMAL(12, 2) NOT NULL DEFAULT 0.00,
     day_pl DECIMAL(12, 2) NOT NULL DEFAULT 0.00,
     current_balance DECIMAL(12, 2) NOT NULL DEFAULT 0.00,
     risk10 DECIMAL(12, 2) NOT NULL DEFAULT 0.00,
     trade_id INT NULL,
+    UNIQUE KEY uq_days_account_date (account_id, `date`),
+    CONSTRAINT fk_days_account FOREIGN KEY (account_id) REFERENCES TraderInfo (id) ON DELETE CASCADE,
     CONSTRAINT fk_days_week FOREIGN KEY (week_id) REFERENCES weeks (id) ON DELETE SET null
 ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
 
 CREATE TABLE trades (
     id INT PRIMARY KEY AUTO_INCREMENT,
+    account_id INT NOT NULL DEFAULT 1,
     day_id INT NULL,
     symbol VARCHAR(64) NOT NULL,
     position_size DECIMAL(16, 4) NOT NULL,
@@ -65,19 +52,33 @@ CREATE TABLE trades (
     profit DECIMAL(18, 2) GENERATED ALWAYS AS (
         (exit_price - entry_price) * position_size
     ) STORED,
+    CONSTRAINT fk_trades_account FOREIGN KEY (account_id) REFERENCES TraderInfo (id) ON DELETE CASCADE,
     CONSTRAINT fk_trades_day FOREIGN KEY (day_id) REFERENCES days (id) ON DELETE CASCADE
 ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
 
+-- P/L per calendar month, kept in step with days.day_pl so year/quarter/multi-year views read
+-- at most 12 rows per year instead of every day
+CREATE TABLE months (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    account_id INT NOT NULL DEFAULT 1,
+    `year` SMALLINT NOT NULL,
+    `month` TINYINT NOT NULL,
+    month_pl DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    UNIQUE KEY uq_months_account_month (account_id, `year`, `month`),
+    CONSTRAINT fk_months_account FOREIGN KEY (account_id) REFERENCES TraderInfo (id) ON DELETE CASCADE
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
+
 CREATE INDEX idx_trades_day ON trades (day_id);
 
+-- keyset pagination of an account's trades listing: WHERE account_id = ? ORDER BY trade_date DESC, id DESC
+CREATE INDEX idx_trades_account_date_id ON trades (account_id, trade_date, id);
+
 CREATE INDEX idx_days_week ON days (week_id);
 
--- ========================================
--- ⚙️ 2️⃣ TRIGGERS (MySQL)
--- ========================================
+DELIMITER $$
 
 -- BEFORE INSERT on days:
---   • ensure week exists for NEW.date (Mon..Sun)
+--   • ensure week exists for NEW.date (Sun..Sat)
 --   • set NEW.week_id
 --   • set entry_balance from previous day.current_balance or week's starting_balance
 --   • set risk10/current_balance defaults
@@ -90,40 +91,41 @@ BEGIN
   DECLARE v_saturday DATE;
   DECLARE v_prev_bal DECIMAL(12,2);
 
-  -- week bounds (Sun..Sat)
-  -- DAYOFWEEK returns 1=Sunday..7=Saturday, so subtract (DAYOFWEEK-1) days to get Sunday
+  -- Sunday..Saturday window for NEW.date
   SET v_sunday = DATE_SUB(NEW.`date`, INTERVAL (DAYOFWEEK(NEW.`date`) - 1) DAY);
   SET v_saturday = DATE_ADD(v_sunday, INTERVAL 6 DAY);
 
+  -- find or create week
   SELECT id INTO v_week_id
   FROM weeks
-  WHERE NEW.`date` BETWEEN start_date AND end_date
+  WHERE account_id = NEW.account_id AND NEW.`date` BETWEEN start_date AND end_date
   LIMIT 1;
 
   IF v_week_id IS NULL THEN
-  INSERT INTO weeks (start_date, end_date, starting_balance)
-  VALUES (v_sunday, v_saturday, 2000.00);
+  INSERT INTO weeks (account_id, start_date, end_date, starting_balance, week_pl)
+  VALUES (NEW.account_id, v_sunday, v_saturday, 2000.00, 0.00);
     SET v_week_id = LAST_INSERT_ID();
   END IF;
 
+  -- attach the day to its week
   SET NEW.week_id = v_week_id;
 
+  -- entry balance = previous day's current_balance, else week's starting_balance
   SELECT d.current_balance
     INTO v_prev_bal
   FROM days d
-  WHERE d.`date` < NEW.`date`
+  WHERE d.account_id = NEW.account_id AND d.`date` < NEW.`date`
   ORDER BY d.`date` DESC
   LIMIT 1;
 
   IF v_prev_bal IS NULL THEN
     SELECT starting_balance INTO v_prev_bal
-    FROM weeks
-    WHERE id = v_week_id;
+    FROM weeks WHERE id = v_week_id;
   END IF;
 
   SET NEW.entry_balance   = v_prev_bal;
-  SET NEW.risk10          = ROUND(NEW.entry_balance * 0.10, 2);
-  SET NEW.current_balance = NEW.entry_balance;
+  SET NEW.current_balance = v_prev_bal;
+  SET NEW.risk10          = ROUND(v_prev_bal * 0.10, 2);
 END$$
 
 -- BEFORE INSERT on trades:
@@ -136,10 +138,10 @@ BEGIN
   DECLARE v_day_id INT;
 
   IF NEW.trade_date IS NOT NULL AND NEW.day_id IS NULL THEN
-    SELECT id INTO v_day_id FROM days WHERE `date` = NEW.trade_date LIMIT 1;
+    SELECT id INTO v_day_id FROM days WHERE account_id = NEW.account_id AND `date` = NEW.trade_date LIMIT 1;
 
     IF v_day_id IS NULL THEN
-      INSERT INTO days(`date`) VALUES (NEW.trade_date);
+      INSERT INTO days(account_id, `date`) VALUES (NEW.account_id, NEW.trade_date);
       SET v_day_id = LAST_INSERT_ID();
     END IF;
 
@@ -167,6 +169,13 @@ BEGIN
   JOIN days d ON d.week_id = w.id
   SET w.week_pl = COALESCE((SELECT SUM(d2.day_pl) FROM days d2 WHERE d2.week_id = w.id), 0)
   WHERE d.id = NEW.day_id;
+
+  -- and the month rollup, by delta
+  IF NEW.trade_date IS NOT NULL THEN
+    INSERT INTO months (account_id, `year`, `month`, month_pl)
+    VALUES (NEW.account_id, YEAR(NEW.trade_date), MONTH(NEW.trade_date), COALESCE(NEW.profit, 0))
+    ON DUPLICATE KEY UPDATE month_pl = month_pl + COALESCE(NEW.profit, 0);
+  END IF;
 END$$
 
 CREATE TRIGGER trg_au_trades_recalc_day
@@ -187,6 +196,18 @@ BEGIN
   WHERE w.id IN (
     SELECT week_id FROM days WHERE id IN (OLD.day_id, NEW.day_id)
   );
+
+  -- move the trade's profit out of its old month and into its new one
+  IF OLD.trade_date IS NOT NULL THEN
+    UPDATE months
+    SET month_pl = month_pl - COALESCE(OLD.profit, 0)
+    WHERE account_id = OLD.account_id AND `year` = YEAR(OLD.trade_date) AND `month` = MONTH(OLD.trade_date);
+  END IF;
+  IF NEW.trade_date IS NOT NULL THEN
+    INSERT INTO months (account_id, `year`, `month`, month_pl)
+    VALUES (NEW.account_id, YEAR(NEW.trade_date), MONTH(NEW.trade_date), COALESCE(NEW.profit, 0))
+    ON DUPLICATE KEY UPDATE month_pl = month_pl + COALESCE(NEW.profit, 0);
+  END IF;
 END$$
 
 CREATE TRIGGER trg_ad_trades_recalc_day
@@ -205,57 +226,13 @@ BEGIN
   JOIN days d ON d.week_id = w.id
   SET w.week_pl = COALESCE((SELECT SUM(d2.day_pl) FROM days d2 WHERE d2.week_id = w.id), 0)
   WHERE d.id = OLD.day_id;
-END$$
 
-DROP TRIGGER IF EXISTS trg_bi_days_fill_week_and_balances $$
-
-CREATE TRIGGER trg_bi_days_fill_week_and_balances
-BEFORE INSERT ON days
-FOR EACH ROW
-BEGIN
-  DECLARE v_week_id INT;
-  DECLARE v_sunday  DATE;
-  DECLARE v_saturday DATE;
-  DECLARE v_prev_bal DECIMAL(12,2);
-
-  -- Sunday..Saturday window for NEW.date
-  SET v_sunday = DATE_SUB(NEW.`date`, INTERVAL (DAYOFWEEK(NEW.`date`) - 1) DAY);
-  SET v_saturday = DATE_ADD(v_sunday, INTERVAL 6 DAY);
-
-  -- find or create week
-  SELECT id INTO v_week_id
-  FROM weeks
-  WHERE NEW.`date` BETWEEN start_date AND end_date
-  LIMIT 1;
-
-  IF v_week_id IS NULL THEN
-  INSERT INTO weeks (start_date, end_date, starting_balance, week_pl)
-  VALUES (v_sunday, v_saturday, 2000.00, 0.00);
-    SET v_week_id = LAST_INSERT_ID();
+  IF OLD.trade_date IS NOT NULL THEN
+    UPDATE months
+    SET month_pl = month_pl - COALESCE(OLD.profit, 0)
+    WHERE account_id = OLD.account_id AND `year` = YEAR(OLD.trade_date) AND `month` = MONTH(OLD.trade_date);
   END IF;
-
-  -- attach the day to its week
-  SET NEW.week_id = v_week_id;
-
-  -- entry balance = previous day's current_balance, else week's starting_balance
-  SELECT d.current_balance
-    INTO v_prev_bal
-  FROM days d
-  WHERE d.`date` < NEW.`date`
-  ORDER BY d.`date` DESC
-  LIMIT 1;
-
-  IF v_prev_bal IS NULL THEN
-    SELECT starting_balance INTO v_prev_bal
-    FROM weeks WHERE id = v_week_id;
-  END IF;
-
-  SET NEW.entry_balance   = v_prev_bal;
-  SET NEW.current_balance = v_prev_bal;
-  SET NEW.risk10          = ROUND(v_prev_bal * 0.10, 2);
-END $$
-
-DROP TRIGGER IF EXISTS trg_ai_trades_set_day_trade;
+END$$
 
 CREATE TRIGGER trg_ai_trades_set_day_trade
 AFTER INSERT ON trades
@@ -268,4 +245,6 @@ BEGIN
   END IF;
 END$$
 
-INSERT INTO TraderInfo (starting_balance) VALUES (2000.00);
\ No newline at end of file
+DELIMITER ;
+
+INSERT INTO TraderInfo (id, name, starting_balance) VALUES (1, 'Main', 2000.00);
@@ -0,0 +1,65 @@
+-- ========================================
+-- 0002 — indexes for the hot queries (verify with `flask migrate --explain`)
+-- ========================================
+
+-- per-day profit sums (trade triggers, ledger recompute) and per-day trade counts (balance index load)
+-- are answered from the index alone; replaces idx_trades_day, which only located the rows
+CREATE INDEX idx_trades_day_profit ON trades (day_id, profit);
+DROP INDEX idx_trades_day ON trades;
+
+-- per-week day_pl sums in the trade triggers, likewise covered; replaces idx_days_week
+CREATE INDEX idx_days_week_pl ON days (week_id, day_pl);
+DROP INDEX idx_days_week ON days;
+
+-- the new day's week is looked up by its Sunday (a point read on uq_weeks_account_start)
+-- instead of `NEW.date BETWEEN start_date AND end_date`, which ranged over every earlier week
+DROP TRIGGER IF EXISTS trg_bi_days_fill_week_and_balances;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_bi_days_fill_week_and_balances
+BEFORE INSERT ON days
+FOR EACH ROW
+BEGIN
+  DECLARE v_week_id INT;
+  DECLARE v_sunday  DATE;
+  DECLARE v_saturday DATE;
+  DECLARE v_prev_bal DECIMAL(12,2);
+
+  -- Sunday..Saturday window for NEW.date
+  SET v_sunday = DATE_SUB(NEW.`date`, INTERVAL (DAYOFWEEK(NEW.`date`) - 1) DAY);
+  SET v_saturday = DATE_ADD(v_sunday, INTERVAL 6 DAY);
+
+  -- find or create week
+  SELECT id INTO v_week_id
+  FROM weeks
+  WHERE account_id = NEW.account_id AND start_date = v_sunday;
+
+  IF v_week_id IS NULL THEN
+  INSERT INTO weeks (account_id, start_date, end_date, starting_balance, week_pl)
+  VALUES (NEW.account_id, v_sunday, v_saturday, 2000.00, 0.00);
+    SET v_week_id = LAST_INSERT_ID();
+  END IF;
+
+  -- attach the day to its week
+  SET NEW.week_id = v_week_id;
+
+  -- entry balance = previous day's current_balance, else week's starting_balance
+  SELECT d.current_balance
+    INTO v_prev_bal
+  FROM days d
+  WHERE d.account_id = NEW.account_id AND d.`date` < NEW.`date`
+  ORDER BY d.`date` DESC
+  LIMIT 1;
+
+  IF v_prev_bal IS NULL THEN
+    SELECT starting_balance INTO v_prev_bal
+    FROM weeks WHERE id = v_week_id;
+  END IF;
+
+  SET NEW.entry_balance   = v_prev_bal;
+  SET NEW.current_balance = v_prev_bal;
+  SET NEW.risk10          = ROUND(v_prev_bal * 0.10, 2);
+END$$
+
+DELIMITER ;
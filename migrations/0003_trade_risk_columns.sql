@@ -0,0 +1,18 @@
+-- ========================================
+-- 0003 — per-trade risk metrics, computed by MySQL on every write like `profit`
+-- ========================================
+--   risk_at_entry  what hitting the stop would have cost: |entry - stop| * |size|
+--   r_multiple     the result in units of that risk: profit / risk_at_entry
+--   reward_risk    the planned reward:risk: |take_profit - entry| / |entry - stop|
+-- NULL when stop_loss (for reward_risk also take_profit) is missing or equal to the entry price.
+
+ALTER TABLE trades
+    ADD COLUMN risk_at_entry DECIMAL(18, 2) GENERATED ALWAYS AS (
+        ABS(entry_price - stop_loss) * ABS(position_size)
+    ) STORED,
+    ADD COLUMN r_multiple DECIMAL(14, 2) GENERATED ALWAYS AS (
+        (exit_price - entry_price) * position_size / NULLIF(ABS(entry_price - stop_loss) * ABS(position_size), 0)
+    ) STORED,
+    ADD COLUMN reward_risk DECIMAL(14, 2) GENERATED ALWAYS AS (
+        ABS(take_profit - entry_price) / NULLIF(ABS(entry_price - stop_loss), 0)
+    ) STORED;
@@ -0,0 +1,72 @@
+-- ========================================
+-- 0004 — a new week starts from the balance the previous week closed at
+-- ========================================
+-- The days trigger used to create every week with starting_balance 2000.00, whatever the account's
+-- starting balance or the weeks before it; it now carries the previous week's closing balance forward
+-- (the account's starting balance for its first week). Weeks created by the old trigger are repaired
+-- by `flask rebuild-ledger`.
+DROP TRIGGER IF EXISTS trg_bi_days_fill_week_and_balances;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_bi_days_fill_week_and_balances
+BEFORE INSERT ON days
+FOR EACH ROW
+BEGIN
+  DECLARE v_week_id INT;
+  DECLARE v_sunday  DATE;
+  DECLARE v_saturday DATE;
+  DECLARE v_prev_bal DECIMAL(12,2);
+
+  -- Sunday..Saturday window for NEW.date
+  SET v_sunday = DATE_SUB(NEW.`date`, INTERVAL (DAYOFWEEK(NEW.`date`) - 1) DAY);
+  SET v_saturday = DATE_ADD(v_sunday, INTERVAL 6 DAY);
+
+  -- find or create week
+  SELECT id INTO v_week_id
+  FROM weeks
+  WHERE account_id = NEW.account_id AND start_date = v_sunday;
+
+  IF v_week_id IS NULL THEN
+    -- closing balance of the latest earlier week (a backward range read on uq_weeks_account_start),
+    -- else the account's starting balance
+    SELECT w.starting_balance + w.week_pl
+      INTO v_prev_bal
+    FROM weeks w
+    WHERE w.account_id = NEW.account_id AND w.start_date < v_sunday
+    ORDER BY w.start_date DESC
+    LIMIT 1;
+
+    IF v_prev_bal IS NULL THEN
+      SELECT starting_balance INTO v_prev_bal
+      FROM TraderInfo WHERE id = NEW.account_id;
+    END IF;
+
+    INSERT INTO weeks (account_id, start_date, end_date, starting_balance, week_pl)
+    VALUES (NEW.account_id, v_sunday, v_saturday, v_prev_bal, 0.00);
+    SET v_week_id = LAST_INSERT_ID();
+  END IF;
+
+  -- attach the day to its week
+  SET NEW.week_id = v_week_id;
+
+  -- entry balance = previous day's current_balance, else week's starting_balance
+  SET v_prev_bal = NULL;
+  SELECT d.current_balance
+    INTO v_prev_bal
+  FROM days d
+  WHERE d.account_id = NEW.account_id AND d.`date` < NEW.`date`
+  ORDER BY d.`date` DESC
+  LIMIT 1;
+
+  IF v_prev_bal IS NULL THEN
+    SELECT starting_balance INTO v_prev_bal
+    FROM weeks WHERE id = v_week_id;
+  END IF;
+
+  SET NEW.entry_balance   = v_prev_bal;
+  SET NEW.current_balance = v_prev_bal;
+  SET NEW.risk10          = ROUND(v_prev_bal * 0.10, 2);
+END$$
+
+DELIMITER ;
@@ -0,0 +1,36 @@
+-- ========================================
+-- 0005 — symbols: one row per account and symbol, holding that symbol's running aggregates
+-- ========================================
+-- trades.symbol stays (exports, the journal snapshot and analytics read it); trades.symbol_id points at
+-- the symbols row. The app adjusts trades/total_pl/wins/losses/last_trade_date by delta on every trade
+-- write, like the months rollup, and `flask rebuild-ledger` resyncs them from trades.
+
+CREATE TABLE symbols (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    account_id INT NOT NULL,
+    symbol VARCHAR(64) NOT NULL,
+    trades INT NOT NULL DEFAULT 0,
+    total_pl DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    wins INT NOT NULL DEFAULT 0,
+    losses INT NOT NULL DEFAULT 0,
+    last_trade_date DATE NULL,
+    UNIQUE KEY uq_symbols_account_symbol (account_id, symbol),
+    CONSTRAINT fk_symbols_account FOREIGN KEY (account_id) REFERENCES TraderInfo (id) ON DELETE CASCADE
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
+
+-- keyset pagination of one symbol's trades: WHERE symbol_id = ? ORDER BY trade_date DESC, id DESC,
+-- and the symbol's latest trade_date after a delete is one backward dive. RESTRICT: deleting a symbols
+-- row must never take trades (and their P/L) with it behind the ledger's back.
+ALTER TABLE trades
+    ADD COLUMN symbol_id INT NULL AFTER symbol,
+    ADD INDEX idx_trades_symbol_date_id (symbol_id, trade_date, id),
+    ADD CONSTRAINT fk_trades_symbol FOREIGN KEY (symbol_id) REFERENCES symbols (id) ON DELETE RESTRICT;
+
+INSERT INTO symbols (account_id, symbol, trades, total_pl, wins, losses, last_trade_date)
+SELECT account_id, symbol, COUNT(*), SUM(profit), SUM(profit > 0), SUM(profit < 0), MAX(trade_date)
+FROM trades
+GROUP BY account_id, symbol;
+
+UPDATE trades t
+JOIN symbols s ON s.account_id = t.account_id AND s.symbol = t.symbol
+SET t.symbol_id = s.id;
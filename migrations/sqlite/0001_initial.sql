@@ -0,0 +1,82 @@
+-- ========================================
+-- 0001 — the schema of migrations/0001..0003 for the embedded SQLite backend (DB_BACKEND=sqlite)
+-- ========================================
+-- Same tables, keys and generated columns; no triggers (the ledger runs with LEDGER_MODE=app).
+-- MONEY / PRICE / DATE are the declared types storage.py reads back as Decimal(2) / Decimal(4) / date.
+-- Later migrations keep the MySQL version numbers, so both directories apply the same versions.
+
+CREATE TABLE TraderInfo (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(64) NOT NULL DEFAULT 'Main',
+    starting_balance MONEY NOT NULL DEFAULT 2000.00
+);
+
+CREATE TABLE weeks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INT NOT NULL DEFAULT 1 REFERENCES TraderInfo (id) ON DELETE CASCADE,
+    start_date DATE NOT NULL,
+    end_date DATE NOT NULL,
+    starting_balance MONEY NOT NULL DEFAULT 2000.00,
+    week_pl MONEY NOT NULL DEFAULT 0.00
+);
+
+CREATE TABLE days (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INT NOT NULL DEFAULT 1 REFERENCES TraderInfo (id) ON DELETE CASCADE,
+    `date` DATE NOT NULL,
+    week_id INT NULL REFERENCES weeks (id) ON DELETE SET NULL,
+    entry_balance MONEY NOT NULL DEFAULT 0.00,
+    day_pl MONEY NOT NULL DEFAULT 0.00,
+    current_balance MONEY NOT NULL DEFAULT 0.00,
+    risk10 MONEY NOT NULL DEFAULT 0.00,
+    trade_id INT NULL
+);
+
+-- generated columns round like MySQL's DECIMAL(x, 2) storage does
+CREATE TABLE trades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INT NOT NULL DEFAULT 1 REFERENCES TraderInfo (id) ON DELETE CASCADE,
+    day_id INT NULL REFERENCES days (id) ON DELETE CASCADE,
+    symbol VARCHAR(64) NOT NULL,
+    position_size PRICE NOT NULL,
+    entry_price PRICE NOT NULL,
+    exit_price PRICE NOT NULL,
+    stop_loss PRICE NULL,
+    take_profit PRICE NULL,
+    trade_date DATE NULL,
+    profit MONEY GENERATED ALWAYS AS (
+        ROUND((exit_price - entry_price) * position_size, 2)
+    ) STORED,
+    risk_at_entry MONEY GENERATED ALWAYS AS (
+        ROUND(ABS(entry_price - stop_loss) * ABS(position_size), 2)
+    ) STORED,
+    r_multiple MONEY GENERATED ALWAYS AS (
+        ROUND((exit_price - entry_price) * position_size / NULLIF(ABS(entry_price - stop_loss) * ABS(position_size), 0), 2)
+    ) STORED,
+    reward_risk MONEY GENERATED ALWAYS AS (
+        ROUND(ABS(take_profit - entry_price) / NULLIF(ABS(entry_price - stop_loss), 0), 2)
+    ) STORED
+);
+
+CREATE TABLE months (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INT NOT NULL DEFAULT 1 REFERENCES TraderInfo (id) ON DELETE CASCADE,
+    `year` SMALLINT NOT NULL,
+    `month` TINYINT NOT NULL,
+    month_pl MONEY NOT NULL DEFAULT 0.00
+);
+
+-- named like the MySQL keys, so `flask migrate --explain` reads the same on both engines
+CREATE UNIQUE INDEX uq_weeks_account_start ON weeks (account_id, start_date);
+
+CREATE UNIQUE INDEX uq_days_account_date ON days (account_id, `date`);
+
+CREATE UNIQUE INDEX uq_months_account_month ON months (account_id, `year`, `month`);
+
+CREATE INDEX idx_trades_day_profit ON trades (day_id, profit);
+
+CREATE INDEX idx_trades_account_date_id ON trades (account_id, trade_date, id);
+
+CREATE INDEX idx_days_week_pl ON days (week_id, day_pl);
+
+INSERT INTO TraderInfo (id, name, starting_balance) VALUES (1, 'Main', 2000.00);
@@ -0,0 +1,28 @@
+-- ========================================
+-- 0005 — symbols table and trades.symbol_id (see migrations/0005_symbols.sql)
+-- ========================================
+
+CREATE TABLE symbols (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INT NOT NULL REFERENCES TraderInfo (id) ON DELETE CASCADE,
+    symbol VARCHAR(64) NOT NULL,
+    trades INT NOT NULL DEFAULT 0,
+    total_pl MONEY NOT NULL DEFAULT 0.00,
+    wins INT NOT NULL DEFAULT 0,
+    losses INT NOT NULL DEFAULT 0,
+    last_trade_date DATE NULL
+);
+
+CREATE UNIQUE INDEX uq_symbols_account_symbol ON symbols (account_id, symbol);
+
+ALTER TABLE trades ADD COLUMN symbol_id INT NULL REFERENCES symbols (id) ON DELETE RESTRICT;
+
+CREATE INDEX idx_trades_symbol_date_id ON trades (symbol_id, trade_date, id);
+
+INSERT INTO symbols (account_id, symbol, trades, total_pl, wins, losses, last_trade_date)
+SELECT account_id, symbol, COUNT(*), ROUND(SUM(profit), 2), SUM(profit > 0), SUM(profit < 0), MAX(trade_date)
+FROM trades
+GROUP BY account_id, symbol;
+
+UPDATE trades
+SET symbol_id = (SELECT s.id FROM symbols s WHERE s.account_id = trades.account_id AND s.symbol = trades.symbol);
@@ -0,0 +1,60 @@
+-- ========================================
+-- Upgrade to the 0001 schema from the single-account tradingview_structure.sql (MySQL 8)
+-- ========================================
+-- `flask migrate` runs this instead of 0001_initial when it finds that older schema (trades
+-- without account_id), then recreates the 0001 triggers and records 0001 as applied. Every
+-- existing row becomes part of account 1 (DEFAULT_ACCOUNT). Run it on a backup first: MySQL
+-- commits each ALTER TABLE as it goes.
+
+-- the old app read the first TraderInfo row; make that row account 1
+ALTER TABLE TraderInfo ADD COLUMN name VARCHAR(64) NOT NULL DEFAULT 'Main' AFTER id;
+
+UPDATE TraderInfo SET id = 1 WHERE id = (SELECT first_id FROM (SELECT MIN(id) AS first_id FROM TraderInfo) AS first_row);
+
+INSERT IGNORE INTO TraderInfo (id, name, starting_balance) VALUES (1, 'Main', 2000.00);
+
+-- the old triggers ignore accounts; 0001's are recreated after this script
+DROP TRIGGER IF EXISTS trg_bi_days_fill_week_and_balances;
+
+DROP TRIGGER IF EXISTS trg_bi_trades_attach_day;
+
+DROP TRIGGER IF EXISTS trg_ai_trades_recalc_day;
+
+DROP TRIGGER IF EXISTS trg_au_trades_recalc_day;
+
+DROP TRIGGER IF EXISTS trg_ad_trades_recalc_day;
+
+DROP TRIGGER IF EXISTS trg_ai_trades_set_day_trade;
+
+-- NOT NULL DEFAULT 1 fills account_id on every existing row
+ALTER TABLE weeks
+    ADD COLUMN account_id INT NOT NULL DEFAULT 1 AFTER id,
+    ADD UNIQUE KEY uq_weeks_account_start (account_id, start_date),
+    ADD CONSTRAINT fk_weeks_account FOREIGN KEY (account_id) REFERENCES TraderInfo (id) ON DELETE CASCADE;
+
+-- a date is unique per account now, not across the whole table
+ALTER TABLE days
+    ADD COLUMN account_id INT NOT NULL DEFAULT 1 AFTER id,
+    DROP INDEX `date`,
+    ADD UNIQUE KEY uq_days_account_date (account_id, `date`),
+    ADD CONSTRAINT fk_days_account FOREIGN KEY (account_id) REFERENCES TraderInfo (id) ON DELETE CASCADE;
+
+ALTER TABLE trades
+    ADD COLUMN account_id INT NOT NULL DEFAULT 1 AFTER id,
+    ADD INDEX idx_trades_account_date_id (account_id, trade_date, id),
+    ADD CONSTRAINT fk_trades_account FOREIGN KEY (account_id) REFERENCES TraderInfo (id) ON DELETE CASCADE;
+
+CREATE TABLE months (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    account_id INT NOT NULL DEFAULT 1,
+    `year` SMALLINT NOT NULL,
+    `month` TINYINT NOT NULL,
+    month_pl DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    UNIQUE KEY uq_months_account_month (account_id, `year`, `month`),
+    CONSTRAINT fk_months_account FOREIGN KEY (account_id) REFERENCES TraderInfo (id) ON DELETE CASCADE
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
+
+INSERT INTO months (account_id, `year`, `month`, month_pl)
+SELECT account_id, YEAR(`date`), MONTH(`date`), SUM(day_pl)
+FROM days
+GROUP BY account_id, YEAR(`date`), MONTH(`date`);
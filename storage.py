@@ -0,0 +1,415 @@
+"""
+Storage backends. The app talks DB-API through pymysql-shaped connections, so a backend is
+a connect() for that plus the few things that differ between engines: where its migrations
+live, how to tell whether a table exists, how to read a query plan and how to wipe a schema.
+
+    DB_BACKEND=mysql   MySQL/MariaDB through pymysql (the default; triggers, row locks, asgi.py)
+    DB_BACKEND=sqlite  an embedded SQLite file (SQLITE_PATH) in WAL mode, for local/offline runs
+
+SQLite has no triggers in this schema: the ledger always runs app-maintained (LEDGER_MODE=app).
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+import pymysql
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+class MySQLBackend:
+    name = "mysql"
+    supports_triggers = True
+    Error = pymysql.MySQLError
+    migrations_dir = os.path.join(HERE, "migrations")
+    # ALTER TABLE path to 0001 for a database built by the single-account tradingview_structure.sql
+    legacy_upgrade = os.path.join(HERE, "migrations", "upgrade", "0001_multi_account.sql")
+
+    def connect(self, **overrides):
+        params = dict(
+            host=os.getenv("MYSQL_HOST", "127.0.0.1"),
+            port=int(os.getenv("MYSQL_PORT", "3306")),
+            user=os.getenv("MYSQL_USER", "root"),
+            password=os.getenv("MYSQL_PASSWORD", ""),
+            database=os.getenv("MYSQL_DB", "tradingview"),
+            autocommit=True,
+            client_flag=pymysql.constants.CLIENT.MULTI_STATEMENTS,
+            charset="utf8mb4",
+            cursorclass=pymysql.cursors.DictCursor,
+        )
+        params.update(overrides)
+        return pymysql.connect(**params)
+
+    def describe(self):
+        return f"MySQL database {os.getenv('MYSQL_DB', 'tradingview')}"
+
+    def create_database(self, database):
+        """Create `database` if missing; returns the server version."""
+        conn = self.connect(database=None)
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"CREATE DATABASE IF NOT EXISTS `{database}` CHARACTER SET utf8mb4")
+                cur.execute("SELECT VERSION() AS v")
+                return cur.fetchone()["v"]
+        finally:
+            conn.close()
+
+    def table_exists(self, cur, table):
+        cur.execute("""
+            SELECT COUNT(*) AS n FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """, (table,))
+        return bool(cur.fetchone()["n"])
+
+    def column_exists(self, cur, table, column):
+        cur.execute("""
+            SELECT COUNT(*) AS n FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """, (table, column))
+        return bool(cur.fetchone()["n"])
+
+    def drop_all_tables(self, cur):
+        """Drop every table (and with them the triggers) of the current database."""
+        cur.execute("SELECT TABLE_NAME AS t FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()")
+        tables = [r["t"] for r in cur.fetchall()]
+        cur.execute("SET FOREIGN_KEY_CHECKS = 0")
+        for table in tables:
+            cur.execute(f"DROP TABLE `{table}`")
+        cur.execute("SET FOREIGN_KEY_CHECKS = 1")
+
+    def prepare_unbuffered(self, conn):
+        # a slow client must not make MySQL give up on the unbuffered result
+        conn.query("SET SESSION net_write_timeout = 600")
+
+    def explain(self, cur, sql, args):
+        """(access, problems) for one statement: how each real table is read, and full scans or filesorts."""
+        cur.execute("EXPLAIN " + sql, args)
+        plan = [row for row in cur.fetchall()
+                if row.get("table") and not row["table"].startswith("<")]  # skip derived tables and unions
+        problems = []
+        for row in plan:
+            table, extra = row["table"], row.get("Extra") or ""
+            if row.get("type") == "ALL":
+                problems.append(f"full scan of {table}")
+            elif row.get("type") == "index":
+                problems.append(f"full index scan of {table}")
+            if "Using filesort" in extra:
+                problems.append(f"filesort on {table}")
+        access = ", ".join(f"{r['table']} via {r['key'] or r['type']}" for r in plan)
+        return access, problems
+
+# --- SQLite ---------------------------------------------------------------------------------------
+# Columns are declared with the type names below so that reads come back as the same Python
+# types pymysql returns for the MySQL schema; values are written as ISO dates and decimal strings.
+#   DATE      date, stored as 'YYYY-MM-DD' text (sorts and compares like the MySQL DATE)
+#   MONEY     Decimal with 2 places, like DECIMAL(x, 2)
+#   PRICE     Decimal with 4 places, like DECIMAL(x, 4)
+#   DATETIME  datetime, stored as 'YYYY-MM-DD HH:MM:SS' text
+# Computed values without a declared type (SUM, COALESCE, ...) come back as float; the ledger
+# code already rounds those through _to_cents, as it does for MySQL's DECIMAL sums.
+
+def _decimal_converter(places):
+    quantum = Decimal(1).scaleb(-places)
+    return lambda raw: Decimal(raw.decode()).quantize(quantum, rounding=ROUND_HALF_UP)
+
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("DATE", lambda raw: date.fromisoformat(raw.decode()))
+sqlite3.register_converter("DATETIME", lambda raw: datetime.fromisoformat(raw.decode()))
+sqlite3.register_converter("MONEY", _decimal_converter(2))
+sqlite3.register_converter("PRICE", _decimal_converter(4))
+
+def _round(value, places=0):
+    """
+    MySQL's ROUND() on DECIMAL: half away from zero on the decimal value. Floats (SUMs, products)
+    are read at 15 significant digits first, so 8319.55 * 0.10 rounds as 831.955, not 831.9549999999999.
+    """
+    if value is None:
+        return None
+    text = format(value, ".15g") if isinstance(value, float) else str(value)
+    return float(Decimal(text).quantize(Decimal(1).scaleb(-int(places)), rounding=ROUND_HALF_UP))
+
+def _to_days(value):
+    """MySQL's TO_DAYS(): days since year 0, i.e. date.toordinal() + 365."""
+    return None if value is None else date.fromisoformat(str(value)[:10]).toordinal() + 365
+
+# (pattern, replacement) rewrites from the MySQL dialect the app's statements are written in
+_DIALECT = [
+    (re.compile(r"%s"), "?"),
+    # writers are serialized by BEGIN IMMEDIATE, which is what the row locks are for on MySQL
+    (re.compile(r"\s+FOR\s+UPDATE(\s+OF\s+\w+)?", re.I), ""),
+    (re.compile(r"ON\s+DUPLICATE\s+KEY\s+UPDATE", re.I), "ON CONFLICT DO UPDATE SET"),
+    (re.compile(r"AS\s+SIGNED\s*\)", re.I), "AS INTEGER)"),
+    (re.compile(r"\bGREATEST\(", re.I), "MAX("),  # SQLite's multi-argument MAX() is scalar
+    (re.compile(r"\)\s*ENGINE\s*=.*\Z", re.I | re.S), ")"),
+]
+# UPDATE t JOIN (derived) v ON v.id = t.id SET t.a = v.a [WHERE cond]
+#   ->  UPDATE t SET a = v.a FROM (derived) v WHERE v.id = t.id [AND (cond)]
+_UPDATE_JOIN = re.compile(
+    r"^\s*UPDATE\s+(?P<table>\w+)\s+(?P<alias>\w+)\s+JOIN\s+(?P<derived>\(.*\))\s+(?P<dalias>\w+)\s+"
+    r"ON\s+(?P<on>.+?)\s+SET\s+(?P<set>.+?)(?:\s+WHERE\s+(?P<where>.+))?\Z", re.I | re.S)
+
+@lru_cache(maxsize=512)
+def _translate(sql):
+    """The app's MySQL statement rewritten for SQLite (cached: statements come from a few templates)."""
+    m = _UPDATE_JOIN.match(sql)
+    if m:
+        alias = m["alias"]
+        assignments = re.sub(rf"\b{alias}\.(\w+)\s*=", r"\1 =", m["set"])
+        where = f"{m['on']} AND ({m['where']})" if m["where"] else m["on"]
+        sql = (f"UPDATE {m['table']} AS {alias} SET {assignments} "
+               f"FROM {m['derived']} AS {m['dalias']} WHERE {where}")
+    for pattern, replacement in _DIALECT:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+class SQLiteCursor:
+    """
+    pymysql-style cursor over sqlite3: rows as dicts or tuples, buffered unless unbuffered=True
+    (streamed exports), and every statement reported to `record` when the connection is instrumented.
+    """
+
+    def __init__(self, conn, as_dict=True, unbuffered=False, record=None):
+        self._cur = conn.cursor()
+        self._as_dict = as_dict
+        self._unbuffered = unbuffered
+        self._record = record
+        self._rows = None
+        self._pos = 0
+        self.rowcount = -1
+        self.lastrowid = None
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._cur.close()
+
+    def _shape(self, row):
+        if row is None or not self._as_dict:
+            return row
+        return {column[0]: value for column, value in zip(self.description, row)}
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            self._cur.execute(_translate(query), tuple(args) if args is not None else ())
+            self.description = self._cur.description
+            self.rowcount = self._cur.rowcount
+            self.lastrowid = self._cur.lastrowid
+            self._rows = None if self._unbuffered or self.description is None else self._cur.fetchall()
+            self._pos = 0
+            return self.rowcount
+        finally:
+            if self._record is not None:
+                self._record(query, time.perf_counter() - started, len(self._rows) if self._rows else 0)
+
+    def fetchone(self):
+        if self._rows is None:
+            return self._shape(self._cur.fetchone()) if self._unbuffered else None
+        if self._pos >= len(self._rows):
+            return None
+        self._pos += 1
+        return self._shape(self._rows[self._pos - 1])
+
+    def fetchmany(self, size=None):
+        size = size or self._cur.arraysize
+        if self._rows is None:
+            return [self._shape(row) for row in self._cur.fetchmany(size)] if self._unbuffered else []
+        rows = self._rows[self._pos:self._pos + size]
+        self._pos += len(rows)
+        return [self._shape(row) for row in rows]
+
+    def fetchall(self):
+        if self._rows is None:
+            return [self._shape(row) for row in self._cur.fetchall()] if self._unbuffered else []
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return [self._shape(row) for row in rows]
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+class SQLiteConnection:
+    """The part of a pymysql connection the app uses, on one sqlite3 connection in autocommit mode."""
+
+    def __init__(self, raw, cursorclass, write_lock=None, busy_timeout=10000):
+        self._raw = raw
+        self._cursorclass = cursorclass
+        self._write_lock = write_lock
+        self._busy_timeout = busy_timeout
+        self._holds_write_lock = False
+        self.open = True
+
+    def cursor(self, cursorclass=None):
+        cursorclass = cursorclass or self._cursorclass
+        return SQLiteCursor(
+            self._raw,
+            as_dict=issubclass(cursorclass, pymysql.cursors.DictCursorMixin),
+            unbuffered=issubclass(cursorclass, pymysql.cursors.SSCursor),
+            # the app's instrumented cursor classes carry the hook that reports each statement
+            record=getattr(cursorclass, "record", None),
+        )
+
+    def begin(self):
+        # Writers of this process queue on a lock first: SQLite's busy handler only sleeps and
+        # retries, so with many writers one can lose every retry until busy_timeout runs out.
+        # BEGIN IMMEDIATE then takes the write lock up front, so writers in other processes
+        # queue on busy_timeout instead of deadlocking.
+        if self._write_lock is not None and not self._holds_write_lock:
+            if not self._write_lock.acquire(timeout=self._busy_timeout / 1000):
+                raise sqlite3.OperationalError("database is locked")
+            self._holds_write_lock = True
+        try:
+            self._raw.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self._release_write_lock()
+            raise
+
+    def _release_write_lock(self):
+        if self._holds_write_lock:
+            self._holds_write_lock = False
+            self._write_lock.release()
+
+    def commit(self):
+        try:
+            if self._raw.in_transaction:
+                self._raw.execute("COMMIT")
+        finally:
+            self._release_write_lock()
+
+    def rollback(self):
+        try:
+            if self._raw.in_transaction:
+                self._raw.execute("ROLLBACK")
+        finally:
+            self._release_write_lock()
+
+    def get_autocommit(self):
+        return not self._raw.in_transaction
+
+    @property
+    def server_status(self):
+        """pymysql's status flags, of which only IN_TRANS applies."""
+        return pymysql.constants.SERVER_STATUS.SERVER_STATUS_IN_TRANS if self._raw.in_transaction else 0
+
+    def autocommit(self, value):
+        if value:
+            self.commit()
+
+    def ping(self, reconnect=False):
+        self._raw.execute("SELECT 1")
+
+    def close(self):
+        if self.open:
+            self.open = False
+            self._raw.close()
+            self._release_write_lock()
+
+class SQLiteBackend:
+    name = "sqlite"
+    supports_triggers = False
+    Error = sqlite3.Error
+    migrations_dir = os.path.join(HERE, "migrations", "sqlite")
+    legacy_upgrade = None  # SQLite databases were always built by the migrations
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("SQLITE_PATH", "tradingview.sqlite3")
+        self.busy_timeout = int(os.getenv("SQLITE_BUSY_TIMEOUT", "10000"))
+        self._write_locks = {}  # absolute file path -> threading.Lock shared by that file's connections
+        self._write_locks_lock = threading.Lock()
+
+    def connect(self, cursorclass=pymysql.cursors.DictCursor, database=None):
+        """database: another file than SQLITE_PATH (None keeps it)."""
+        raw = sqlite3.connect(database or self.path, detect_types=sqlite3.PARSE_DECLTYPES,
+                              isolation_level=None, check_same_thread=False)
+        # WAL: readers never block the writer or each other; NORMAL syncs at checkpoints, not every commit
+        raw.execute("PRAGMA journal_mode = WAL")
+        raw.execute("PRAGMA synchronous = NORMAL")
+        raw.execute("PRAGMA foreign_keys = ON")
+        raw.execute(f"PRAGMA busy_timeout = {self.busy_timeout}")
+        raw.create_function("ROUND", -1, _round, deterministic=True)
+        raw.create_function("TO_DAYS", 1, _to_days, deterministic=True)
+        raw.create_function("YEAR", 1, lambda d: None if d is None else int(str(d)[:4]), deterministic=True)
+        raw.create_function("MONTH", 1, lambda d: None if d is None else int(str(d)[5:7]), deterministic=True)
+        path = os.path.abspath(database or self.path)
+        with self._write_locks_lock:
+            write_lock = self._write_locks.setdefault(path, threading.Lock())
+        return SQLiteConnection(raw, cursorclass, write_lock, self.busy_timeout)
+
+    def describe(self):
+        return f"SQLite file {os.path.abspath(self.path)}"
+
+    def create_database(self, database):
+        """The file is created on first connect; returns the library version."""
+        return f"SQLite {sqlite3.sqlite_version}"
+
+    def table_exists(self, cur, table):
+        cur.execute("SELECT COUNT(*) AS n FROM sqlite_master WHERE type = 'table' AND name = %s", (table,))
+        return bool(cur.fetchone()["n"])
+
+    def column_exists(self, cur, table, column):
+        cur.execute("SELECT COUNT(*) AS n FROM pragma_table_xinfo(%s) WHERE name = %s", (table, column))
+        return bool(cur.fetchone()["n"])
+
+    def drop_all_tables(self, cur):
+        cur.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+        tables = [r["name"] for r in cur.fetchall()]
+        cur.execute("PRAGMA foreign_keys = OFF")
+        for table in tables:
+            cur.execute(f"DROP TABLE `{table}`")
+        cur.execute("PRAGMA foreign_keys = ON")
+
+    def prepare_unbuffered(self, conn):
+        pass
+
+    def explain(self, cur, sql, args):
+        """
+        (access, problems) from EXPLAIN QUERY PLAN: `SCAN table` is a full (index) scan and
+        `USE TEMP B-TREE FOR ORDER BY` a filesort. The plan names tables by their alias; aliases
+        of derived tables and CTEs are skipped, like MySQL's <derived> rows.
+        """
+        tables = {}
+        for table, alias in _TABLE_REFS.findall(sql):
+            if alias.upper() in _NOT_ALIASES:
+                alias = ""
+            tables[alias or table] = table
+        cur.execute("EXPLAIN QUERY PLAN " + sql, args)
+        access, problems = [], []
+        for row in cur.fetchall():
+            detail = row["detail"]
+            m = _PLAN_STEP.match(detail)
+            if m and m["name"] in tables and self.table_exists(cur, tables[m["name"]]):
+                table = tables[m["name"]]
+                index = m["index"] or ("rowid" if "PRIMARY KEY" in detail else None)
+                access.append(f"{table} via {index or 'scan'}")
+                if m["op"] == "SCAN":
+                    problems.append(f"full {'index ' if index else ''}scan of {table}")
+                elif "AUTOMATIC" in detail:
+                    problems.append(f"no index for {table} (built a temporary one)")
+            elif detail.startswith("USE TEMP B-TREE FOR") and "ORDER BY" in detail:
+                problems.append("filesort (temp b-tree for ORDER BY)")
+        return ", ".join(access), problems
+
+_TABLE_REFS = re.compile(r"\b(?:FROM|JOIN|UPDATE)\s+`?(\w+)`?(?:\s+(?:AS\s+)?(\w+))?", re.I)
+_NOT_ALIASES = {"WHERE", "ON", "JOIN", "LEFT", "INNER", "SET", "GROUP", "ORDER", "LIMIT", "USING", "UNION", "FOR"}
+_PLAN_STEP = re.compile(r"(?P<op>SCAN|SEARCH) (?P<name>\w+)(?: USING (?:AUTOMATIC )?(?:COVERING )?"
+                        r"(?:INDEX (?P<index>\w+)|INTEGER PRIMARY KEY))?")
+
+def backend_from_env():
+    """The backend DB_BACKEND names (mysql by default)."""
+    kind = os.getenv("DB_BACKEND", "mysql").lower()
+    if kind == "mysql":
+        return MySQLBackend()
+    if kind == "sqlite":
+        return SQLiteBackend()
+    raise RuntimeError(f"Unknown DB_BACKEND {kind!r}; use mysql or sqlite.")